@@ -0,0 +1,105 @@
+from typing import Optional
+from datetime import date
+import numpy as np
+from sqlmodel import Session, select
+from sqlalchemy import func, case
+
+from apps.humidor.models import Cigar
+
+# Julian day of date.toordinal() == 0, so ordinal + offset == SQLite julianday()
+JULIAN_OFFSET = 1721424.5
+UNIX_EPOCH_JULIAN = 2440587.5
+
+AGE_BUCKETS = [0, 90, 180, 365, 730, 1825, np.inf]
+AGE_LABELS = ["< 3 mo", "3-6 mo", "6-12 mo", "1-2 yr", "2-5 yr", "5+ yr"]
+
+# Days of rest before a stick is considered "ready", by strength
+REST_DAYS_FULL = 180
+REST_DAYS_MEDIUM = 90
+REST_DAYS_MILD = 45
+REST_DAYS_DEFAULT = 60
+
+
+class AgingService:
+    def __init__(self, session: Session):
+        self.session = session
+
+    def _fetch_columns(self, user_id: int) -> np.ndarray:
+        """
+        One query, one row per cigar: quantity, price, aging start and purchase
+        date (as julian days) and the target rest period. Unknown dates become NaN.
+        """
+        strength = func.lower(func.coalesce(Cigar.strength, ""))
+        rest_days = case(
+            (strength.like("%full%"), REST_DAYS_FULL),
+            (strength.like("%medium%"), REST_DAYS_MEDIUM),
+            (strength.like("%mild%"), REST_DAYS_MILD),
+            else_=REST_DAYS_DEFAULT
+        )
+        stmt = select(
+            Cigar.quantity,
+            func.coalesce(Cigar.price_paid, 0.0),
+            func.julianday(func.coalesce(Cigar.aging_since, Cigar.purchase_date)),
+            func.julianday(Cigar.purchase_date),
+            rest_days
+        ).where(Cigar.user_id == user_id, Cigar.status == "active", Cigar.quantity > 0)
+
+        # Core execution + plain tuples: building ORM rows dominates otherwise
+        rows = self.session.connection().execute(stmt).all()
+        if not rows:
+            return np.empty((0, 5), dtype=float)
+        return np.array(list(map(tuple, rows)), dtype=float)
+
+    def get_aging_report(self, user_id: int, today: Optional[date] = None, horizon_months: int = 12) -> dict:
+        today_jd = (today or date.today()).toordinal() + JULIAN_OFFSET
+        cols = self._fetch_columns(user_id)
+        qty, price, aging_jd, purchase_jd, rest = cols.T
+
+        value = qty * price
+        age = today_jd - aging_jd # NaN when no date is known
+        known = ~np.isnan(age)
+
+        # 1. Age distribution & value by age bucket (quantity weighted)
+        idx = np.digitize(age[known], AGE_BUCKETS[1:-1])
+        sticks_by_age = np.bincount(idx, weights=qty[known], minlength=len(AGE_LABELS))
+        value_by_age = np.bincount(idx, weights=value[known], minlength=len(AGE_LABELS))
+
+        # 2. Ready-to-smoke projection: sticks whose rest period ends within N months
+        ready_in = rest[known] - age[known]
+        order = np.argsort(ready_in)
+        cum_qty = np.concatenate(([0.0], np.cumsum(qty[known][order])))
+        thresholds = np.arange(0, horizon_months + 1) * 30.0
+        ready_by = cum_qty[np.searchsorted(ready_in[order], thresholds, side="right")]
+
+        # 3. Cost basis over time (current holdings, by purchase month)
+        bought = ~np.isnan(purchase_jd)
+        months = (purchase_jd[bought] - UNIX_EPOCH_JULIAN).astype("datetime64[D]").astype("datetime64[M]")
+        month_labels, inverse = np.unique(months, return_inverse=True)
+        cost_by_month = np.bincount(inverse, weights=value[bought], minlength=len(month_labels))
+
+        total_sticks = float(qty.sum())
+        aged_sticks = float(qty[known].sum())
+        return {
+            "summary": {
+                "total_sticks": int(total_sticks),
+                "total_value": round(float(value.sum()), 2),
+                "avg_age_days": round(float(np.average(age[known], weights=qty[known])), 1) if aged_sticks else None,
+                "oldest_age_days": int(age[known].max()) if known.any() else None,
+                "undated_sticks": int(total_sticks - aged_sticks),
+                "ready_now": int(ready_by[0]) if len(ready_by) else 0
+            },
+            "age_distribution": {
+                "labels": AGE_LABELS,
+                "sticks": [int(x) for x in sticks_by_age],
+                "value": [round(float(x), 2) for x in value_by_age]
+            },
+            "ready_projection": {
+                "labels": ["Now"] + [f"+{m} mo" for m in range(1, horizon_months + 1)],
+                "sticks": [int(x) for x in ready_by]
+            },
+            "cost_basis": {
+                "labels": [str(m) for m in month_labels],
+                "monthly": [round(float(x), 2) for x in cost_by_month],
+                "cumulative": [round(float(x), 2) for x in np.cumsum(cost_by_month)]
+            }
+        }
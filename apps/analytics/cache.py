@@ -0,0 +1,7 @@
+from apps.core.cache import TTLCache
+
+# Serialized chart payloads, keyed by (user_id, chart, params)
+chart_cache = TTLCache(maxsize=4096, ttl=300)
+
+def invalidate_user_charts(user_id: int) -> None:
+    chart_cache.delete_where(lambda key: key[0] == user_id)
@@ -0,0 +1,91 @@
+from typing import Dict, Iterable, List, Optional
+
+
+class RatingHistogram:
+    """
+    Exact, mergeable histogram for integer ratings.
+
+    Ratings are small bounded integers, so a sparse value -> count map is
+    exact, cheap to update and trivially mergeable (just add the counts).
+    It is persisted as "value:count" pairs, e.g. "88:2,92:1".
+    """
+
+    def __init__(self, counts: Optional[Dict[int, int]] = None):
+        self.counts: Dict[int, int] = dict(counts or {})
+
+    @classmethod
+    def decode(cls, raw: Optional[str]) -> "RatingHistogram":
+        counts = {}
+        if raw:
+            for pair in raw.split(","):
+                value, count = pair.split(":")
+                counts[int(value)] = int(count)
+        return cls(counts)
+
+    def encode(self) -> str:
+        return ",".join(f"{v}:{c}" for v, c in sorted(self.counts.items()) if c)
+
+    def add(self, value: Optional[int], count: int = 1) -> "RatingHistogram":
+        if value is not None:
+            value = int(value)
+            self.counts[value] = self.counts.get(value, 0) + count
+        return self
+
+    def merge(self, other: "RatingHistogram") -> "RatingHistogram":
+        for value, count in other.counts.items():
+            self.counts[value] = self.counts.get(value, 0) + count
+        return self
+
+    @property
+    def total(self) -> int:
+        return sum(self.counts.values())
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Linear-interpolated quantile (same definition as numpy's default)."""
+        return self.quantiles([q])[0]
+
+    def quantiles(self, qs: Iterable[float]) -> List[Optional[float]]:
+        qs = list(qs)
+        n = self.total
+        if n == 0:
+            return [None for _ in qs]
+
+        items = sorted(self.counts.items())
+
+        def value_at(rank: int) -> int:
+            # rank is a 0-based position in the (virtual) sorted sample
+            seen = 0
+            for value, count in items:
+                seen += count
+                if rank < seen:
+                    return value
+            return items[-1][0]
+
+        results = []
+        for q in qs:
+            pos = min(max(q, 0.0), 1.0) * (n - 1)
+            lo = int(pos)
+            lo_value = value_at(lo)
+            hi_value = value_at(min(lo + 1, n - 1))
+            results.append(round(lo_value + (hi_value - lo_value) * (pos - lo), 2))
+        return results
+
+    def to_buckets(self, width: int = 10, low: int = 0, high: int = 100) -> Dict[str, list]:
+        """Fixed-width buckets for charting (e.g. 0-9, 10-19, ..., 100 on the 0-100 scale)."""
+        edges = list(range(low, high + 1, width))
+        data = [0] * len(edges)
+        for value, count in self.counts.items():
+            idx = min(max((value - low) // width, 0), len(edges) - 1)
+            data[idx] += count
+        labels = [str(e) if width == 1 or e == high else f"{e}-{min(e + width - 1, high)}" for e in edges]
+        return {"labels": labels, "data": data}
+
+    def summary(self) -> dict:
+        n = self.total
+        p10, p50, p90 = self.quantiles([0.1, 0.5, 0.9])
+        mean = sum(v * c for v, c in self.counts.items()) / n if n else None
+        return {
+            "count": n,
+            "mean": round(mean, 1) if mean is not None else None,
+            "p10": p10, "p50": p50, "p90": p90
+        }
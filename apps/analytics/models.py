@@ -0,0 +1,37 @@
+from typing import Optional
+from sqlmodel import SQLModel, Field
+from sqlalchemy import UniqueConstraint
+from datetime import date
+
+# --- Rollup Tables ---
+# Maintained incrementally by HumidorService.add_smoking_session so the
+# time-series charts never have to scan raw SmokingSession rows.
+class DailySessionRollup(SQLModel, table=True):
+    __table_args__ = (UniqueConstraint("user_id", "day"),)
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    user_id: int = Field(foreign_key="user.id", index=True)
+    day: date = Field(index=True)
+
+    session_count: int = Field(default=0)
+    rating_sum: int = Field(default=0) # Sum of rating_overall
+    rating_hist: str = Field(default="") # rating_overall histogram (see RatingHistogram)
+    spend: float = Field(default=0.0) # price_paid of the sticks smoked
+    duration_minutes: int = Field(default=0)
+
+# --- Rating Sketches ---
+# Mergeable rating distributions (see RatingHistogram) per user and per catalog
+# entry, updated in O(1) per session. scope: "user" (key = user id) or
+# "cigar" (key = "brand|line|vitola").
+class RatingSketch(SQLModel, table=True):
+    __table_args__ = (UniqueConstraint("scope", "scope_key"),)
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    scope: str = Field(index=True)
+    scope_key: str
+
+    session_count: int = Field(default=0)
+    overall: str = Field(default="")
+    construction: str = Field(default="")
+    draw: str = Field(default="")
+    flavor: str = Field(default="")
@@ -0,0 +1,155 @@
+from typing import Optional
+from datetime import date, timedelta
+from sqlmodel import Session, select, delete
+
+from apps.analytics.models import DailySessionRollup
+from apps.analytics.histogram import RatingHistogram
+from apps.humidor.models import Cigar, SmokingSession
+
+GRAINS = ("day", "week", "month", "year")
+
+
+def bucket_start(d: date, grain: str) -> date:
+    if grain == "week":
+        return d - timedelta(days=d.weekday())
+    if grain == "month":
+        return d.replace(day=1)
+    if grain == "year":
+        return d.replace(month=1, day=1)
+    return d
+
+
+def next_bucket(d: date, grain: str) -> date:
+    if grain == "week":
+        return d + timedelta(days=7)
+    if grain == "month":
+        return (d.replace(day=28) + timedelta(days=4)).replace(day=1)
+    if grain == "year":
+        return d.replace(year=d.year + 1)
+    return d + timedelta(days=1)
+
+
+class RollupService:
+    def __init__(self, session: Session):
+        self.session = session
+
+    # --- MAINTENANCE ---
+
+    def record_session(self, user_id: int, smoking_session: SmokingSession, spend: float = 0.0) -> DailySessionRollup:
+        """Folds one smoking session into the user's rollup for that day (caller commits)."""
+        rollup = self.session.exec(
+            select(DailySessionRollup).where(
+                DailySessionRollup.user_id == user_id,
+                DailySessionRollup.day == smoking_session.date
+            )
+        ).first()
+        if not rollup:
+            rollup = DailySessionRollup(user_id=user_id, day=smoking_session.date)
+
+        rollup.session_count += 1
+        rollup.rating_sum += smoking_session.rating_overall or 0
+        rollup.rating_hist = RatingHistogram.decode(rollup.rating_hist).add(smoking_session.rating_overall or 0).encode()
+        rollup.spend += spend or 0.0
+        rollup.duration_minutes += smoking_session.duration_minutes or 0
+
+        self.session.add(rollup)
+        return rollup
+
+    def rebuild(self, user_id: int) -> int:
+        """Recomputes every rollup of a user from the raw sessions. Returns the number of days written."""
+        self.session.exec(delete(DailySessionRollup).where(DailySessionRollup.user_id == user_id))
+
+        stmt = select(SmokingSession, Cigar.price_paid)\
+            .join(Cigar)\
+            .where(Cigar.user_id == user_id)\
+            .order_by(SmokingSession.date)
+        days = set()
+        for smoking_session, price_paid in self.session.exec(stmt).all():
+            self.record_session(user_id, smoking_session, price_paid or 0.0)
+            # Flush so the next session of the same day finds the pending row
+            self.session.flush()
+            days.add(smoking_session.date)
+
+        self.session.commit()
+        return len(days)
+
+    # --- QUERIES ---
+
+    def get_series(
+        self,
+        user_id: int,
+        grain: str = "month",
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+        window: int = 0
+    ) -> dict:
+        """
+        Downsamples the daily rollups to day/week/month/year buckets.
+        Empty buckets are filled with zeros so charts get a continuous axis.
+        `window` > 0 adds a rolling average rating over the last N buckets
+        (e.g. grain=day, window=30 for a rolling 30-day average).
+        """
+        if grain not in GRAINS:
+            raise ValueError(f"Invalid grain: {grain}")
+
+        stmt = select(DailySessionRollup).where(DailySessionRollup.user_id == user_id)
+        if start:
+            stmt = stmt.where(DailySessionRollup.day >= start)
+        if end:
+            stmt = stmt.where(DailySessionRollup.day <= end)
+        rows = self.session.exec(stmt.order_by(DailySessionRollup.day)).all()
+
+        series = {
+            "grain": grain,
+            "labels": [], "sessions": [], "avg_rating": [],
+            "p10": [], "p50": [], "p90": [],
+            "spend": [], "duration_minutes": []
+        }
+        if window > 0:
+            series["rolling_avg"] = []
+        if not rows:
+            return series
+
+        buckets = {}
+        for r in rows:
+            key = bucket_start(r.day, grain)
+            b = buckets.setdefault(key, {"count": 0, "rating_sum": 0, "hist": RatingHistogram(), "spend": 0.0, "duration": 0})
+            b["count"] += r.session_count
+            b["rating_sum"] += r.rating_sum
+            b["hist"].merge(RatingHistogram.decode(r.rating_hist))
+            b["spend"] += r.spend
+            b["duration"] += r.duration_minutes
+
+        current = bucket_start(start or rows[0].day, grain)
+        last = bucket_start(end or date.today(), grain)
+        # Running sums for the rolling window
+        window_buckets, window_count, window_sum = [], 0, 0
+
+        while current <= last:
+            b = buckets.get(current)
+            count = b["count"] if b else 0
+            rating_sum = b["rating_sum"] if b else 0
+            p10, p50, p90 = b["hist"].quantiles([0.1, 0.5, 0.9]) if b else (None, None, None)
+
+            series["labels"].append(current.isoformat())
+            series["sessions"].append(count)
+            series["avg_rating"].append(round(rating_sum / count, 1) if count else None)
+            series["p10"].append(p10)
+            series["p50"].append(p50)
+            series["p90"].append(p90)
+            series["spend"].append(round(b["spend"], 2) if b else 0.0)
+            series["duration_minutes"].append(b["duration"] if b else 0)
+
+            if window > 0:
+                window_buckets.append((count, rating_sum))
+                window_count += count
+                window_sum += rating_sum
+                if len(window_buckets) > window:
+                    old_count, old_sum = window_buckets.pop(0)
+                    window_count -= old_count
+                    window_sum -= old_sum
+                series["rolling_avg"].append(round(window_sum / window_count, 1) if window_count else None)
+
+            current = next_bucket(current, grain)
+
+        return series
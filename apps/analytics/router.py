@@ -1,11 +1,18 @@
-from fastapi import APIRouter, Depends, Request
-from fastapi.responses import RedirectResponse
+from typing import Optional, Literal
+from datetime import date
+from fastapi import APIRouter, Depends, Query, Request
 from fastapi.templating import Jinja2Templates
 from sqlmodel import Session
 from database import get_session
-from apps.auth.deps import get_current_user
+from apps.auth.deps import require_premium, require_premium_api
 from apps.auth.models import User
+from apps.auth.tokens import ApiPrincipal
 from apps.analytics.services import AnalyticsService
+from apps.analytics.rollups import RollupService
+from apps.analytics.aging import AgingService
+from apps.analytics.sketches import RatingSketchService
+from apps.analytics.cache import chart_cache
+from apps.core.responses import cached_json
 
 router = APIRouter(prefix="/analytics", tags=["analytics"])
 templates = Jinja2Templates(directory="templates")
@@ -13,21 +20,75 @@ templates = Jinja2Templates(directory="templates")
 def get_service(session: Session = Depends(get_session)) -> AnalyticsService:
     return AnalyticsService(session)
 
+# Analytics is a premium feature (see templates/billing/pricing.html); open to all with subscriptions off.
+# Dashboard shell: renders immediately, the charts are fetched from /analytics/api/* in parallel
 @router.get("/")
 def dashboard(
     request: Request,
-    service: AnalyticsService = Depends(get_service),
-    user: User = Depends(get_current_user)
+    user: User = Depends(require_premium)
 ):
-    if not user:
-        return RedirectResponse(url="/auth/login")
-
-    stats = service.get_aggregated_stats(user)
-    charts = service.get_charts_data(user)
-    
     return templates.TemplateResponse("analytics/dashboard.html", {
         "request": request,
-        "stats": stats,
-        "charts": charts,
         "user": user
     })
+
+# --- CHART DATA API (one endpoint per chart) ---
+@router.get("/api/stats")
+def stats_api(request: Request, service: AnalyticsService = Depends(get_service), user: ApiPrincipal = Depends(require_premium_api)):
+    return cached_json(request, chart_cache, (user.id, "stats"), lambda: service.get_aggregated_stats(user))
+
+@router.get("/api/origins")
+def origins_api(request: Request, service: AnalyticsService = Depends(get_service), user: ApiPrincipal = Depends(require_premium_api)):
+    return cached_json(request, chart_cache, (user.id, "origins"), lambda: service.get_origins_chart(user))
+
+@router.get("/api/brands")
+def brands_api(request: Request, service: AnalyticsService = Depends(get_service), user: ApiPrincipal = Depends(require_premium_api)):
+    return cached_json(request, chart_cache, (user.id, "brands"), lambda: service.get_brands_chart(user))
+
+@router.get("/api/top-smoked")
+def top_smoked_api(request: Request, service: AnalyticsService = Depends(get_service), user: ApiPrincipal = Depends(require_premium_api)):
+    return cached_json(request, chart_cache, (user.id, "top_smoked"), lambda: service.get_top_smoked_chart(user))
+
+# --- TIME SERIES (backed by the daily rollups) ---
+@router.get("/api/timeseries")
+def timeseries(
+    request: Request,
+    grain: Literal["day", "week", "month", "year"] = "month",
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    window: int = 0,
+    session: Session = Depends(get_session),
+    user: ApiPrincipal = Depends(require_premium_api)
+):
+    # `end` defaults to today, so it is part of the key to roll over at midnight
+    end = end or date.today()
+    return cached_json(
+        request, chart_cache, (user.id, "timeseries", grain, start, end, window),
+        lambda: RollupService(session).get_series(user.id, grain=grain, start=start, end=end, window=window)
+    )
+
+# --- INVENTORY AGING ---
+@router.get("/api/aging")
+def aging_report(
+    request: Request,
+    horizon_months: int = Query(default=12, ge=1, le=120),
+    session: Session = Depends(get_session),
+    user: ApiPrincipal = Depends(require_premium_api)
+):
+    return cached_json(
+        request, chart_cache, (user.id, "aging", horizon_months, date.today()),
+        lambda: AgingService(session).get_aging_report(user.id, horizon_months=horizon_months)
+    )
+
+# --- RATING DISTRIBUTIONS (quantile sketches) ---
+@router.get("/api/ratings")
+def rating_distribution(request: Request, session: Session = Depends(get_session), user: ApiPrincipal = Depends(require_premium_api)):
+    return cached_json(request, chart_cache, (user.id, "ratings"), lambda: RatingSketchService(session).get_user_distribution(user.id))
+
+@router.get("/api/ratings/community")
+def community_rating_distribution(
+    brand: Optional[str] = None,
+    session: Session = Depends(get_session),
+    user: ApiPrincipal = Depends(require_premium_api)
+):
+    return RatingSketchService(session).get_community_distribution(brand)
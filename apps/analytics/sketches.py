@@ -0,0 +1,128 @@
+from typing import Dict, Iterable, Optional
+from sqlmodel import Session, select, delete
+from sqlalchemy import func
+
+from apps.analytics.models import RatingSketch
+from apps.analytics.histogram import RatingHistogram
+from apps.humidor.models import Cigar, SmokingSession
+from apps.humidor.recommendations import catalog_key
+from apps.core.cache import TTLCache
+
+# metric -> (SmokingSession column, histogram bucket width, scale low, scale high)
+METRICS = {
+    "overall": ("rating_overall", 10, 0, 100),
+    "construction": ("rating_construction", 1, 1, 10),
+    "draw": ("rating_draw", 1, 1, 10),
+    "flavor": ("rating_flavor", 1, 1, 10),
+}
+
+community_cache = TTLCache(maxsize=16, ttl=300)
+
+
+def cigar_scope_key(cigar: Cigar) -> str:
+    return "|".join(catalog_key(cigar.brand, cigar.line, cigar.vitola))
+
+
+class RatingSketchService:
+    def __init__(self, session: Session):
+        self.session = session
+
+    # --- MAINTENANCE ---
+
+    def _get_or_create(self, scope: str, scope_key: str) -> RatingSketch:
+        sketch = self.session.exec(
+            select(RatingSketch).where(RatingSketch.scope == scope, RatingSketch.scope_key == scope_key)
+        ).first()
+        return sketch or RatingSketch(scope=scope, scope_key=scope_key)
+
+    def _add(self, sketch: RatingSketch, smoking_session: SmokingSession) -> None:
+        sketch.session_count += 1
+        for metric, (column, *_) in METRICS.items():
+            value = getattr(smoking_session, column)
+            if value is not None:
+                hist = RatingHistogram.decode(getattr(sketch, metric)).add(value)
+                setattr(sketch, metric, hist.encode())
+        self.session.add(sketch)
+
+    def record_session(self, user_id: int, cigar: Cigar, smoking_session: SmokingSession) -> None:
+        """Updates the user's and the catalog entry's sketches (caller commits)."""
+        self._add(self._get_or_create("user", str(user_id)), smoking_session)
+        self._add(self._get_or_create("cigar", cigar_scope_key(cigar)), smoking_session)
+
+    def rebuild_catalog_entry(self, brand: str, line: str, vitola: Optional[str]) -> None:
+        """Recomputes one catalog entry's sketch from its sessions, e.g. after a cigar was renamed (caller commits)."""
+        brand, line, vitola = catalog_key(brand, line, vitola)
+        sketch = self._get_or_create("cigar", "|".join((brand, line, vitola)))
+        stmt = select(SmokingSession).join(Cigar).where(
+            Cigar.brand == brand, Cigar.line == line, func.coalesce(Cigar.vitola, "") == vitola
+        )
+        sessions = self.session.exec(stmt).all()
+        if not sessions:
+            if sketch.id is not None:
+                self.session.delete(sketch)
+            return
+        sketch.session_count = 0
+        for metric in METRICS:
+            setattr(sketch, metric, "")
+        for smoking_session in sessions:
+            self._add(sketch, smoking_session)
+
+    def rebuild(self) -> int:
+        """Recomputes every sketch from the raw sessions. Returns the number of sessions folded in."""
+        self.session.exec(delete(RatingSketch))
+        sketches: Dict[tuple, RatingSketch] = {}
+        stmt = select(SmokingSession, Cigar).join(Cigar)
+        count = 0
+        for smoking_session, cigar in self.session.exec(stmt).all():
+            for key in (("user", str(cigar.user_id)), ("cigar", cigar_scope_key(cigar))):
+                if key not in sketches:
+                    sketches[key] = RatingSketch(scope=key[0], scope_key=key[1])
+                self._add(sketches[key], smoking_session)
+            count += 1
+        self.session.commit()
+        community_cache.clear()
+        return count
+
+    # --- QUERIES ---
+
+    @staticmethod
+    def _describe(sketches: Iterable[RatingSketch]) -> dict:
+        merged = {metric: RatingHistogram() for metric in METRICS}
+        sessions = 0
+        for sketch in sketches:
+            sessions += sketch.session_count
+            for metric in METRICS:
+                merged[metric].merge(RatingHistogram.decode(getattr(sketch, metric)))
+
+        result = {"sessions": sessions}
+        for metric, (_, width, low, high) in METRICS.items():
+            result[metric] = {
+                **merged[metric].summary(),
+                "histogram": merged[metric].to_buckets(width, low, high)
+            }
+        return result
+
+    def get_distribution(self, scope: str, scope_key: str) -> dict:
+        sketch = self.session.exec(
+            select(RatingSketch).where(RatingSketch.scope == scope, RatingSketch.scope_key == scope_key)
+        ).first()
+        return self._describe([sketch] if sketch else [])
+
+    def get_user_distribution(self, user_id: int) -> dict:
+        return self.get_distribution("user", str(user_id))
+
+    def get_cigar_distribution(self, cigar: Cigar) -> dict:
+        return self.get_distribution("cigar", cigar_scope_key(cigar))
+
+    def get_community_distribution(self, brand: Optional[str] = None) -> dict:
+        """Community-wide view: merge of the per-catalog sketches (optionally one brand)."""
+        # Same form as the scope keys (cigar_scope_key), so filter and cache key agree with them
+        brand = catalog_key(brand, "", None)[0] if brand else None
+
+        def build():
+            stmt = select(RatingSketch).where(RatingSketch.scope == "cigar")
+            if brand:
+                # autoescape: "%" or "_" in the brand are literals, not LIKE wildcards
+                stmt = stmt.where(RatingSketch.scope_key.startswith(brand + "|", autoescape=True))
+            return self._describe(self.session.exec(stmt).all())
+        return community_cache.get_or_set(brand, build)
@@ -0,0 +1,155 @@
+from typing import List, Optional
+
+from sqlmodel import Session, select, delete
+from sqlalchemy import func, literal
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from apps.armory.models import Gun, RangeSession, AmmoGunStats, AmmoCaliberStats
+from apps.core.cache import TTLCache
+
+MIN_ROUNDS = 200 # Abaixo disso a taxa ainda é ruído
+
+community_ammo_cache = TTLCache(maxsize=256, ttl=300)
+
+
+def brand_key(brand: str) -> str:
+    return " ".join((brand or "").split()).lower()
+
+def caliber_key(caliber: str) -> str:
+    # "9mm", "9 MM" e "9MM" caem no mesmo calibre
+    return "".join((caliber or "").split()).lower()
+
+
+def _row(brand, grain, sessions, rounds, failures, **extra) -> dict:
+    return {
+        "brand": brand,
+        "grain": grain,
+        "sessions": sessions,
+        "rounds": rounds,
+        "failures": failures,
+        "failures_per_1k": round(failures * 1000 / rounds, 2) if rounds else None,
+        **extra
+    }
+
+
+class AmmoStatsService:
+    """
+    Taxa de falhas por munição (marca/grão) por arma, por calibre e na
+    comunidade. As tabelas agregadas são incrementadas a cada sessão, então
+    nenhuma consulta varre o histórico de sessões.
+    """
+
+    def __init__(self, session: Session):
+        self.session = session
+
+    # --- MANUTENÇÃO ---
+
+    def record_session(self, gun: Gun, ammo_brand: str, ammo_grain: int, rounds: int, failures: int, data=None) -> None:
+        """Soma a sessão nos dois agregados com upserts atômicos (o chamador faz o commit)."""
+        marca = " ".join((ammo_brand or "").split())
+        por_arma = sqlite_insert(AmmoGunStats).values(
+            gun_id=gun.id, brand_key=brand_key(marca), grain=ammo_grain, brand=marca,
+            sessions=1, rounds=rounds, failures=failures, last_used=data
+        )
+        self.session.exec(por_arma.on_conflict_do_update(
+            index_elements=["gun_id", "brand_key", "grain"],
+            set_={
+                "sessions": AmmoGunStats.sessions + 1,
+                "rounds": AmmoGunStats.rounds + por_arma.excluded.rounds,
+                "failures": AmmoGunStats.failures + por_arma.excluded.failures,
+                "last_used": func.max(func.coalesce(AmmoGunStats.last_used, por_arma.excluded.last_used), por_arma.excluded.last_used)
+            }
+        ))
+
+        por_calibre = sqlite_insert(AmmoCaliberStats).values(
+            caliber_key=caliber_key(gun.caliber), brand_key=brand_key(marca), grain=ammo_grain,
+            caliber=gun.caliber.strip(), brand=marca, sessions=1, rounds=rounds, failures=failures
+        )
+        self.session.exec(por_calibre.on_conflict_do_update(
+            index_elements=["caliber_key", "brand_key", "grain"],
+            set_={
+                "sessions": AmmoCaliberStats.sessions + 1,
+                "rounds": AmmoCaliberStats.rounds + por_calibre.excluded.rounds,
+                "failures": AmmoCaliberStats.failures + por_calibre.excluded.failures
+            }
+        ))
+
+    def refresh(self) -> int:
+        """
+        Reconstrução completa a partir das sessões (backfill / job agendado):
+        scripts/refresh_ammo_stats.py
+        """
+        self.session.exec(delete(AmmoGunStats))
+        self.session.exec(delete(AmmoCaliberStats))
+        sessions = self.session.exec(
+            select(Gun, RangeSession.ammo_brand, RangeSession.ammo_grain, RangeSession.rounds_fired,
+                   RangeSession.failure_count, RangeSession.date)
+            .join(RangeSession, RangeSession.gun_id == Gun.id)
+            .order_by(RangeSession.id)
+        ).all()
+        for gun, marca, grao, tiros, falhas, data in sessions:
+            self.record_session(gun, marca, grao, tiros, falhas, data)
+        self.session.commit()
+        community_ammo_cache.clear()
+        return len(sessions)
+
+    # --- CONSULTAS ---
+
+    def for_gun(self, gun: Gun) -> List[dict]:
+        rows = self.session.exec(
+            select(AmmoGunStats).where(AmmoGunStats.gun_id == gun.id).order_by(AmmoGunStats.rounds.desc())
+        ).all()
+        return [
+            _row(r.brand, r.grain, r.sessions, r.rounds, r.failures, last_used=r.last_used.isoformat() if r.last_used else None)
+            for r in rows
+        ]
+
+    def for_user_calibers(self, user_id: int, caliber: Optional[str] = None) -> List[dict]:
+        """Munições do próprio usuário agrupadas por calibre (somando todas as armas dele)."""
+        calibre = func.lower(func.replace(Gun.caliber, " ", "")) # Mesmo critério de caliber_key, no SQL
+        stmt = (
+            select(
+                func.max(Gun.caliber), AmmoGunStats.grain, func.max(AmmoGunStats.brand),
+                func.sum(AmmoGunStats.sessions), func.sum(AmmoGunStats.rounds), func.sum(AmmoGunStats.failures)
+            )
+            .join(Gun, Gun.id == AmmoGunStats.gun_id)
+            .where(Gun.user_id == user_id)
+            .group_by(calibre, AmmoGunStats.brand_key, AmmoGunStats.grain)
+            .order_by(calibre, func.sum(AmmoGunStats.rounds).desc())
+        )
+        if caliber:
+            stmt = stmt.where(calibre == caliber_key(caliber))
+        return [_row(r[2], r[1], r[3], r[4], r[5], caliber=r[0]) for r in self.session.exec(stmt).all()]
+
+    def community(self, caliber: Optional[str] = None, min_rounds: int = MIN_ROUNDS, limit: int = 50) -> List[dict]:
+        """Munições mais confiáveis da comunidade: menor taxa de falhas com volume mínimo de tiros."""
+        return community_ammo_cache.get_or_set(
+            (caliber_key(caliber) if caliber else None, min_rounds, limit),
+            lambda: self._compute_community(caliber, min_rounds, limit)
+        )
+
+    def _compute_community(self, caliber: Optional[str], min_rounds: int, limit: int) -> List[dict]:
+        if caliber:
+            stmt = select(
+                AmmoCaliberStats.caliber.label("caliber"), AmmoCaliberStats.brand.label("brand"),
+                AmmoCaliberStats.grain.label("grain"), AmmoCaliberStats.sessions.label("sessions"),
+                AmmoCaliberStats.rounds.label("rounds"), AmmoCaliberStats.failures.label("failures")
+            ).where(AmmoCaliberStats.caliber_key == caliber_key(caliber))
+        else:
+            # Todos os calibres: soma as linhas de cada marca/grão
+            stmt = select(
+                literal(None).label("caliber"), func.max(AmmoCaliberStats.brand).label("brand"),
+                AmmoCaliberStats.grain.label("grain"), func.sum(AmmoCaliberStats.sessions).label("sessions"),
+                func.sum(AmmoCaliberStats.rounds).label("rounds"), func.sum(AmmoCaliberStats.failures).label("failures")
+            ).group_by(AmmoCaliberStats.brand_key, AmmoCaliberStats.grain)
+        sub = stmt.subquery()
+        ranked = (
+            select(*sub.c)
+            .where(sub.c.rounds >= min_rounds)
+            .order_by(sub.c.failures * 1.0 / sub.c.rounds, sub.c.rounds.desc())
+            .limit(limit)
+        )
+        return [
+            _row(r.brand, r.grain, r.sessions, r.rounds, r.failures, **({"caliber": r.caliber} if caliber else {}))
+            for r in self.session.exec(ranked).all()
+        ]
@@ -0,0 +1,116 @@
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from sqlmodel import Session, select, update
+from sqlalchemy import func, insert, literal
+
+from apps.armory.models import Gun, RangeSession, RoundLedger
+
+# Lançamentos que fixam o ponto de partida da arma; sem um deles o razão não explica o total
+ANCORAS = ("initial", "opening")
+
+
+class RoundLedgerService:
+    """
+    Contagem de disparos à prova de concorrência: cada lançamento vira uma
+    linha no livro-razão e o total da arma é incrementado no próprio SQL
+    (total_rounds = total_rounds + n), sem ler-somar-gravar no Python.
+    """
+
+    def __init__(self, session: Session):
+        self.session = session
+
+    def record(self, gun_id: int, rounds: int, source: str, range_session_id: Optional[int] = None) -> None:
+        """Lança os disparos e incrementa o total (o chamador faz o commit)."""
+        if source not in ANCORAS:
+            self._abrir_saldo(gun_id)
+        self.session.add(RoundLedger(gun_id=gun_id, rounds=rounds, source=source, range_session_id=range_session_id))
+        self.session.exec(
+            update(Gun)
+            .where(Gun.id == gun_id)
+            .values(total_rounds=Gun.total_rounds + rounds)
+            .execution_options(synchronize_session=False)
+        )
+
+    def _ancoradas(self):
+        return select(RoundLedger.gun_id).where(RoundLedger.source.in_(ANCORAS))
+
+    def _abrir_saldo(self, gun_id: int) -> None:
+        """
+        Arma anterior ao livro-razão: antes do primeiro lançamento grava o saldo
+        de abertura (total atual - já lançado). INSERT ... SELECT com NOT EXISTS,
+        então dois lançamentos concorrentes não abrem o saldo duas vezes.
+        """
+        ja_lancado = (
+            select(func.coalesce(func.sum(RoundLedger.rounds), 0))
+            .where(RoundLedger.gun_id == gun_id)
+            .scalar_subquery()
+        )
+        ancorada = select(RoundLedger.id).where(RoundLedger.gun_id == gun_id, RoundLedger.source.in_(ANCORAS)).exists()
+        self.session.exec(
+            insert(RoundLedger).from_select(
+                ["gun_id", "rounds", "source", "created_at"],
+                select(Gun.id, Gun.total_rounds - ja_lancado, literal("opening"), literal(datetime.utcnow()))
+                .where(Gun.id == gun_id, ~ancorada)
+            )
+        )
+
+    def _ledger_totals(self, gun_id: Optional[int] = None):
+        stmt = select(RoundLedger.gun_id, func.sum(RoundLedger.rounds)).group_by(RoundLedger.gun_id)
+        if gun_id is not None:
+            stmt = stmt.where(RoundLedger.gun_id == gun_id)
+        return dict(self.session.exec(stmt).all())
+
+    def seed_missing(self) -> int:
+        """
+        Armas sem lançamento de abertura: lança as sessões que ainda não estão no
+        razão e um saldo de abertura (total atual - razão), para que o total não
+        mude. Vale também para armas que já ganharam lançamentos de sessão.
+        """
+        guns = self.session.exec(select(Gun).where(Gun.id.not_in(self._ancoradas()))).all()
+        for gun in guns:
+            no_razao = select(RoundLedger.range_session_id).where(
+                RoundLedger.gun_id == gun.id, RoundLedger.range_session_id.is_not(None)
+            )
+            sessions = self.session.exec(
+                select(RangeSession.id, RangeSession.rounds_fired)
+                .where(RangeSession.gun_id == gun.id, RangeSession.id.not_in(no_razao))
+            ).all()
+            ja_lancado = self._ledger_totals(gun.id).get(gun.id, 0)
+            self.session.add(RoundLedger(
+                gun_id=gun.id, rounds=gun.total_rounds - ja_lancado - sum(r for _, r in sessions), source="opening"
+            ))
+            self.session.add_all(
+                RoundLedger(gun_id=gun.id, rounds=r, source="session", range_session_id=sid) for sid, r in sessions
+            )
+        self.session.commit()
+        return len(guns)
+
+    def reconcile(self, gun_id: Optional[int] = None, fix: bool = True) -> List[Tuple[int, int, int]]:
+        """
+        Compara total_rounds com o livro-razão. Retorna (gun_id, gravado, razão)
+        das divergentes. Armas sem abertura (initial/opening) são ignoradas: o razão
+        delas não cobre o histórico e "corrigir" apagaria disparos (rode seed_missing).
+        """
+        totais = self._ledger_totals(gun_id)
+        stmt = select(Gun.id, Gun.total_rounds).where(Gun.id.in_(list(totais)), Gun.id.in_(self._ancoradas()))
+        divergentes = [
+            (gid, gravado, totais[gid])
+            for gid, gravado in self.session.exec(stmt).all()
+            if gravado != totais[gid]
+        ]
+        if fix and divergentes:
+            # Recalcula no mesmo UPDATE: um lançamento concorrente não se perde entre a leitura e a escrita
+            soma = (
+                select(func.coalesce(func.sum(RoundLedger.rounds), 0))
+                .where(RoundLedger.gun_id == Gun.id)
+                .scalar_subquery()
+            )
+            self.session.exec(
+                update(Gun)
+                .where(Gun.id.in_([gid for gid, _, _ in divergentes]))
+                .values(total_rounds=soma)
+                .execution_options(synchronize_session=False)
+            )
+            self.session.commit()
+        return divergentes
@@ -1,6 +1,7 @@
 from typing import Optional, List
 from sqlmodel import SQLModel, Field, Relationship
-from datetime import date
+from sqlalchemy import Index
+from datetime import date, datetime
 
 # 1. A Arma (Gun) - AGORA COM INVOICE
 class Gun(SQLModel, table=True):
@@ -20,8 +21,8 @@ class Gun(SQLModel, table=True):
     disposal_date: Optional[date] = None
     sale_price: Optional[float] = None
     # -----------------
-    user_id: Optional[int] = Field(foreign_key="user.id", default=None)
-    user: Optional["User"] = Relationship(back_populates="guns")
+    user_id: Optional[int] = Field(foreign_key="user.id", default=None, index=True)
+    user: Optional["User"] = Relationship() # User has no back-reference (module is optional)
 
     # Relacionamentos
     sessions: List["RangeSession"] = Relationship(back_populates="gun")
@@ -41,6 +42,9 @@ class Accessory(SQLModel, table=True):
 
 # 3. Sessão de Tiro
 class RangeSession(SQLModel, table=True):
+    # Histórico paginado: mais recentes primeiro, direto do índice
+    __table_args__ = (Index("ix_rangesession_gun_date", "gun_id", "date", "id"),)
+
     id: Optional[int] = Field(default=None, primary_key=True)
     date: date
     location: str
@@ -64,4 +68,52 @@ class GunMaintenance(SQLModel, table=True):
     notes: Optional[str] = None
     
     gun_id: int = Field(foreign_key="gun.id")
-    gun: Optional[Gun] = Relationship(back_populates="maintenances")
\ No newline at end of file
+    gun: Optional[Gun] = Relationship(back_populates="maintenances")
+
+# 5. Resumo por arma (mantido em add_session; evita varrer o histórico)
+class GunSummary(SQLModel, table=True):
+    gun_id: int = Field(foreign_key="gun.id", primary_key=True)
+    sessions: int = Field(default=0)
+    rounds: int = Field(default=0)
+    failures: int = Field(default=0)
+    last_used: Optional[date] = None
+
+    @property
+    def failure_rate(self) -> float:
+        # Falhas a cada 1000 tiros
+        return self.failures * 1000 / self.rounds if self.rounds else 0.0
+
+# 6. Livro-razão de disparos (só inserção). Gun.total_rounds é a soma dele.
+class RoundLedger(SQLModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    gun_id: int = Field(foreign_key="gun.id", index=True)
+    rounds: int
+    source: str # initial (cadastro), session, opening (saldo de dados antigos)
+    range_session_id: Optional[int] = Field(default=None, foreign_key="rangesession.id")
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+# 7. Desempenho de munição por arma (marca/grão), mantido em add_session
+class AmmoGunStats(SQLModel, table=True):
+    __table_args__ = {"sqlite_with_rowid": False}
+
+    gun_id: int = Field(foreign_key="gun.id", primary_key=True)
+    brand_key: str = Field(primary_key=True) # Marca normalizada (minúsculas, espaços únicos)
+    grain: int = Field(primary_key=True)
+    brand: str # Como o usuário escreveu na primeira sessão
+    sessions: int = Field(default=0)
+    rounds: int = Field(default=0)
+    failures: int = Field(default=0)
+    last_used: Optional[date] = None
+
+# 8. Desempenho de munição da comunidade, por calibre (todas as armas de todos os usuários)
+class AmmoCaliberStats(SQLModel, table=True):
+    __table_args__ = {"sqlite_with_rowid": False}
+
+    caliber_key: str = Field(primary_key=True)
+    brand_key: str = Field(primary_key=True)
+    grain: int = Field(primary_key=True)
+    caliber: str
+    brand: str
+    sessions: int = Field(default=0)
+    rounds: int = Field(default=0)
+    failures: int = Field(default=0)
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, Request, Form, UploadFile, File
+from fastapi import APIRouter, Depends, Request, Form, UploadFile, File, Query, HTTPException
 from fastapi.responses import RedirectResponse
 from fastapi.templating import Jinja2Templates
 from sqlmodel import Session
@@ -6,8 +6,10 @@ from database import get_session
 from datetime import date
 
 from apps.armory.services import RangeService
+from apps.armory.ammo import AmmoStatsService, MIN_ROUNDS
 from apps.auth.models import User
-from apps.auth.deps import get_current_user, require_user
+from apps.auth.deps import get_current_user, require_user, require_api_user
+from apps.auth.tokens import ApiPrincipal
 
 router = APIRouter(prefix="/armory", tags=["armory"])
 templates = Jinja2Templates(directory="templates")
@@ -56,11 +58,42 @@ def criar_arma(
     )
     return RedirectResponse(url="/armory", status_code=303)
 
+# Desempenho de munição (taxa de falhas por marca/grão)
+@router.get("/api/ammo")
+def municao_calibres_api(
+    caliber: str = Query(default=None),
+    session: Session = Depends(get_session),
+    user: ApiPrincipal = Depends(require_api_user)
+):
+    return AmmoStatsService(session).for_user_calibers(user.id, caliber)
+
+@router.get("/api/ammo/community")
+def municao_comunidade_api(
+    caliber: str = Query(default=None),
+    min_rounds: int = Query(default=MIN_ROUNDS, ge=1),
+    session: Session = Depends(get_session),
+    user: ApiPrincipal = Depends(require_api_user)
+):
+    return AmmoStatsService(session).community(caliber, min_rounds)
+
+@router.get("/api/{gun_id}/ammo")
+def municao_arma_api(
+    gun_id: int,
+    service: RangeService = Depends(get_service),
+    user: ApiPrincipal = Depends(require_api_user)
+):
+    gun = service.get_gun(user, gun_id)
+    if not gun:
+        raise HTTPException(status_code=404, detail="Gun not found")
+    ammo = AmmoStatsService(service.session)
+    return {"gun": ammo.for_gun(gun), "community": ammo.community(gun.caliber)}
+
 # 3. Rota de DETALHE da Arma
 @router.get("/{gun_id}")
 def detalhe_arma(
     gun_id: int, 
     request: Request, 
+    page: int = Query(default=1, ge=1),
     service: RangeService = Depends(get_service),
     user: User = Depends(get_current_user)
 ):
@@ -70,10 +103,18 @@ def detalhe_arma(
     gun = service.get_gun(user, gun_id)
     if not gun:
         return "Gun not found"
+
+    # Consultas limitadas: resumo pré-calculado + uma página do histórico + série mensal
+    sessions, has_next = service.get_sessions_page(gun, page)
     
     return templates.TemplateResponse("armory/detail.html", {
         "request": request,
         "gun": gun,
+        "summary": service.get_summary(gun),
+        "sessions": sessions,
+        "page": page,
+        "has_next": has_next,
+        "series": service.get_monthly_series(gun),
         "user": user
     })
 
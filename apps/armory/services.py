@@ -1,13 +1,21 @@
-from typing import List, Optional
+from typing import List, Optional, Tuple
 from sqlmodel import Session, select
+from sqlalchemy import func
 from sqlalchemy.orm import selectinload
+from sqlalchemy.dialects.sqlite import insert
 from fastapi import UploadFile
 import shutil
 import uuid
 from pathlib import Path
 
-from apps.armory.models import Gun, Accessory, RangeSession
+from apps.armory.models import Gun, Accessory, RangeSession, GunSummary
+from apps.armory.ledger import RoundLedgerService
+from apps.armory.ammo import AmmoStatsService
 from apps.auth.models import User
+from apps.portfolio.cache import invalidate_portfolio
+
+SESSIONS_PER_PAGE = 20
+CHART_MONTHS = 24
 
 class RangeService:
     def __init__(self, session: Session):
@@ -32,6 +40,7 @@ class RangeService:
             
         self.session.add(gun)
         self.session.commit()
+        invalidate_portfolio(user.id)
         return gun
 
     def get_dashboard_stats(self, user: User) -> dict:
@@ -52,14 +61,44 @@ class RangeService:
         }
 
     def get_gun(self, user: User, gun_id: int) -> Optional[Gun]:
-        statement = select(Gun).where(Gun.id == gun_id).options(
-            selectinload(Gun.accessories),
-            selectinload(Gun.sessions)
+        # Sessões NÃO são carregadas aqui: use get_sessions_page / get_summary
+        statement = select(Gun).where(Gun.id == gun_id, Gun.user_id == user.id).options(
+            selectinload(Gun.accessories)
+        )
+        return self.session.exec(statement).first()
+
+    def get_summary(self, gun: Gun) -> GunSummary:
+        return self.session.get(GunSummary, gun.id) or GunSummary(gun_id=gun.id)
+
+    def get_sessions_page(self, gun: Gun, page: int = 1, per_page: int = SESSIONS_PER_PAGE) -> Tuple[List[RangeSession], bool]:
+        """Uma página do histórico (mais recentes primeiro) e se existe próxima página."""
+        page = max(page, 1)
+        statement = (
+            select(RangeSession)
+            .where(RangeSession.gun_id == gun.id)
+            .order_by(RangeSession.date.desc(), RangeSession.id.desc())
+            .offset((page - 1) * per_page)
+            .limit(per_page + 1)
         )
-        gun = self.session.exec(statement).first()
-        if gun and gun.user_id == user.id:
-            return gun
-        return None
+        sessions = self.session.exec(statement).all()
+        return sessions[:per_page], len(sessions) > per_page
+
+    def get_monthly_series(self, gun: Gun, months: int = CHART_MONTHS) -> dict:
+        """Tiros e falhas por mês (últimos `months` meses com atividade) agregados no SQL."""
+        mes = func.strftime("%Y-%m", RangeSession.date)
+        statement = (
+            select(mes, func.sum(RangeSession.rounds_fired), func.sum(RangeSession.failure_count))
+            .where(RangeSession.gun_id == gun.id)
+            .group_by(mes)
+            .order_by(mes.desc())
+            .limit(months)
+        )
+        rows = list(reversed(self.session.exec(statement).all()))
+        return {
+            "labels": [r[0] for r in rows],
+            "rounds": [r[1] for r in rows],
+            "failures": [r[2] for r in rows]
+        }
 
     def create_gun(
         self,
@@ -75,11 +114,15 @@ class RangeService:
         nova_arma = Gun(
             nickname=nickname, make=make, model=model,
             caliber=caliber, base_price=base_price,
-            total_rounds=total_rounds, image=caminho_foto,
+            total_rounds=0, image=caminho_foto,
             invoice=caminho_nf, user_id=user.id
         )
         self.session.add(nova_arma)
+        self.session.flush()
+        # Contagem informada no cadastro também passa pelo livro-razão (mesmo zero: é a abertura da arma)
+        RoundLedgerService(self.session).record(nova_arma.id, total_rounds or 0, "initial")
         self.session.commit()
+        invalidate_portfolio(user.id)
         return nova_arma
 
     def add_accessory(
@@ -97,6 +140,7 @@ class RangeService:
         )
         self.session.add(novo_acessorio)
         self.session.commit()
+        invalidate_portfolio(user.id)
         return novo_acessorio
 
     def add_session(
@@ -111,8 +155,9 @@ class RangeService:
         failure_count: int,
         notes: Optional[str]
     ) -> Optional[RangeSession]:
-        gun = self.session.get(Gun, gun_id) # Simple get for update
-        if not gun or gun.user_id != user.id:
+        # A arma não é alterada aqui: o total é incrementado no SQL pelo livro-razão
+        gun = self.session.exec(select(Gun).where(Gun.id == gun_id, Gun.user_id == user.id)).first()
+        if not gun:
             return None
 
         nova_sessao = RangeSession(
@@ -126,14 +171,33 @@ class RangeService:
             notes=notes
         )
         self.session.add(nova_sessao)
+        self.session.flush()
 
-        # Update Odometer
-        gun.total_rounds += rounds_fired
-        self.session.add(gun)
+        # Update Odometer (atômico: total_rounds = total_rounds + n)
+        RoundLedgerService(self.session).record(gun_id, rounds_fired, "session", nova_sessao.id)
+
+        self._update_summary(gun_id, date_obj, rounds_fired, failure_count)
+        AmmoStatsService(self.session).record_session(gun, ammo_brand, ammo_grain, rounds_fired, failure_count, date_obj)
 
         self.session.commit()
         return nova_sessao
 
+    def _update_summary(self, gun_id: int, date_obj, rounds_fired: int, failure_count: int) -> None:
+        # Upsert incremental: soma no próprio SQL, sem ler o resumo antes
+        stmt = insert(GunSummary).values(
+            gun_id=gun_id, sessions=1, rounds=rounds_fired, failures=failure_count, last_used=date_obj
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["gun_id"],
+            set_={
+                "sessions": GunSummary.sessions + 1,
+                "rounds": GunSummary.rounds + stmt.excluded.rounds,
+                "failures": GunSummary.failures + stmt.excluded.failures,
+                "last_used": func.max(func.coalesce(GunSummary.last_used, stmt.excluded.last_used), stmt.excluded.last_used)
+            }
+        )
+        self.session.exec(stmt)
+
     def _handle_file_upload(self, file: Optional[UploadFile], folder: str, prefix: str) -> Optional[str]:
         if not file or not file.filename:
             return None
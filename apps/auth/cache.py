@@ -0,0 +1,43 @@
+from typing import Optional
+from sqlmodel import Session
+from sqlalchemy.orm import make_transient_to_detached
+
+from apps.core.cache import TTLCache
+from apps.auth.models import User
+
+# Column snapshots of User rows, keyed by user_id.
+# Short TTL: other workers' writes (e.g. a webhook landing elsewhere) only expire here.
+user_cache = TTLCache(maxsize=4096, ttl=60)
+
+# Entitlement per user_id ("free"/"premium"); see apps.auth.entitlements.
+# invalidate_user only reaches this worker, so the TTL bounds how long the others keep a cancelled user premium.
+entitlement_cache = TTLCache(maxsize=8192, ttl=30)
+
+def _snapshot(user: User) -> dict:
+    return {column.name: getattr(user, column.name) for column in User.__table__.columns}
+
+def load_user(session: Session, user_id: int) -> Optional[User]:
+    """
+    session.get(User, user_id) without the round trip when the row is cached.
+    The returned instance is attached to `session` as if it had just been loaded,
+    so it can be modified and committed (and lazy relationships still work).
+    """
+    user = session.identity_map.get(session.identity_key(User, user_id))
+    if user is not None:
+        return user
+
+    data = user_cache.get(user_id)
+    if data is None:
+        user = session.get(User, user_id)
+        if user is not None:
+            user_cache.set(user_id, _snapshot(user))
+        return user
+
+    user = User(**data)
+    make_transient_to_detached(user)
+    session.add(user)
+    return user
+
+def invalidate_user(user_id: int) -> None:
+    user_cache.delete(user_id)
+    entitlement_cache.delete(user_id)
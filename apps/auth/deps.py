@@ -2,14 +2,18 @@ from fastapi import Depends, HTTPException, status, Request
 from sqlmodel import Session
 from database import get_session
 from apps.auth.models import User
+from apps.auth.cache import load_user
+from apps.auth.tokens import ApiPrincipal, TokenError, principal_from_token
+from apps.auth.entitlements import EntitlementService
+from config import settings
 
 def get_current_user(request: Request, session: Session = Depends(get_session)) -> User | None:
     user_id = request.session.get("user_id")
     if not user_id:
         return None
     
-    user = session.get(User, user_id)
-    return user
+    # Cached across requests; FastAPI already reuses the result within one request
+    return load_user(session, user_id)
 
 def require_user(user: User | None = Depends(get_current_user)) -> User:
     if not user:
@@ -18,3 +22,51 @@ def require_user(user: User | None = Depends(get_current_user)) -> User:
             headers={"Location": "/auth/login"}
         )
     return user
+
+def _unauthorized(detail: str = "Not authenticated") -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail=detail,
+        headers={"WWW-Authenticate": "Bearer"}
+    )
+
+def require_api_user(request: Request, session: Session = Depends(get_session)) -> ApiPrincipal:
+    """
+    JSON endpoints: a bearer token is verified from its signed claims alone (no DB hit);
+    without an Authorization header the cookie session is used. Answers 401 instead of redirecting.
+    """
+    authorization = request.headers.get("Authorization")
+    if authorization:
+        scheme, _, token = authorization.partition(" ")
+        if scheme.lower() != "bearer" or not token:
+            raise _unauthorized()
+        try:
+            return principal_from_token(token)
+        except TokenError:
+            raise _unauthorized("Invalid or expired token")
+
+    user = get_current_user(request, session)
+    if not user:
+        raise _unauthorized()
+    return ApiPrincipal.from_user(user)
+
+def _has_premium(session: Session, user_id: int) -> bool:
+    # With subscriptions off (settings.ENABLE_SUBSCRIPTION) every feature is open
+    return not settings.ENABLE_SUBSCRIPTION or EntitlementService(session).is_premium(user_id)
+
+def require_premium(user: User = Depends(require_user), session: Session = Depends(get_session)) -> User:
+    """Page routes: non-premium users are sent to the pricing page (never to a premium page: no redirect loop)."""
+    if not _has_premium(session, user.id):
+        from apps.core.modules import registry
+        raise HTTPException(
+            status_code=status.HTTP_303_SEE_OTHER,
+            headers={"Location": "/billing/" if registry.is_enabled("billing") else "/auth/profile"}
+        )
+    return user
+
+def require_premium_api(principal: ApiPrincipal = Depends(require_api_user), session: Session = Depends(get_session)) -> ApiPrincipal:
+    # Checked against the cached entitlement, not the token claim: a cancellation applies in this
+    # worker as soon as it is processed and in the others once entitlement_cache expires (30s)
+    if not _has_premium(session, principal.id):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Premium subscription required")
+    return principal
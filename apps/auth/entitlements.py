@@ -0,0 +1,31 @@
+from sqlmodel import Session, select
+
+from apps.auth.models import User
+from apps.auth.cache import entitlement_cache
+
+PREMIUM_STATUSES = ("active",)
+
+def entitlement_for_status(subscription_status: str) -> str:
+    return "premium" if subscription_status in PREMIUM_STATUSES else "free"
+
+
+class EntitlementService:
+    """
+    Answers "is this user premium?" from a per-user cache. Entries are dropped by
+    invalidate_user, which every subscription write path (webhook worker, billing,
+    profile, login) calls after committing; other workers see the change when
+    their entry expires (30s TTL, apps.auth.cache).
+    """
+
+    def __init__(self, session: Session):
+        self.session = session
+
+    def get_entitlement(self, user_id: int) -> str:
+        return entitlement_cache.get_or_set(user_id, lambda: self._load(user_id))
+
+    def is_premium(self, user_id: int) -> bool:
+        return self.get_entitlement(user_id) == "premium"
+
+    def _load(self, user_id: int) -> str:
+        status = self.session.exec(select(User.subscription_status).where(User.id == user_id)).first()
+        return entitlement_for_status(status or "free")
@@ -21,8 +21,27 @@ class User(SQLModel, table=True):
     profile_image: Optional[str] = None # URL to uploaded photo
     
     # Monetization
-    stripe_customer_id: Optional[str] = None
+    stripe_customer_id: Optional[str] = Field(default=None, index=True) # Webhooks look users up by it
     subscription_status: str = Field(default="free") # free, active, past_due, canceled
     subscription_end_date: Optional[date] = None
+    subscription_event_at: Optional[int] = None # Stripe `created` of the last applied event; older ones are stale
 
     cigars: List["Cigar"] = Relationship(back_populates="user")
+
+class StripeEvent(SQLModel, table=True):
+    """
+    Webhook inbox: verified Stripe events, keyed on the Stripe event id so a
+    retried delivery is stored once. Applied in order by apps.auth.webhook_worker.
+    """
+    id: str = Field(primary_key=True) # evt_...
+    type: str = Field(index=True)
+    payload: str # Raw verified JSON body
+    created: int = Field(index=True) # Stripe's event timestamp, defines processing order
+    received_at: datetime = Field(default_factory=datetime.utcnow)
+
+    status: str = Field(default="pending", index=True) # pending, processing, done, failed
+    attempts: int = Field(default=0)
+    locked_at: Optional[datetime] = None
+    next_attempt_at: Optional[datetime] = None # Backoff after a failed attempt
+    processed_at: Optional[datetime] = None
+    last_error: Optional[str] = None
@@ -0,0 +1,147 @@
+import asyncio
+import json
+import os
+import random
+import time
+from pathlib import Path
+from typing import Optional
+
+
+class OIDCMetadataCache:
+    """
+    Disk-backed copy of the IdP discovery document and JWKS.
+
+    authlib only hits the network when `server_metadata` lacks `_loaded_at` (and
+    `jwks` for the keys), so priming the client from disk means a fresh worker
+    can complete a login without any remote fetch. The disk copy is loaded at
+    construction, so its age (not the worker's) decides when the background task
+    refreshes; the authlib client, built lazily on first login, gets the current
+    copy when it is attached. When the IdP is slow or down the last good copy
+    keeps being served.
+    """
+
+    def __init__(
+        self,
+        metadata_url: str,
+        cache_path: str,
+        refresh_interval: float = 3600,
+        retry_interval: float = 60,
+        timeout: float = 5.0
+    ):
+        self.metadata_url = metadata_url
+        self.cache_path = Path(cache_path)
+        self.refresh_interval = refresh_interval
+        self.retry_interval = retry_interval
+        self.timeout = timeout
+        self.last_error: Optional[str] = None
+        self._client = None
+        self._task: Optional[asyncio.Task] = None
+        self._data: Optional[dict] = self._read_disk()
+        self.fetched_at: Optional[float] = self._data["fetched_at"] if self._data else None
+
+    # --- Disk ---
+
+    def _read_disk(self) -> Optional[dict]:
+        try:
+            data = json.loads(self.cache_path.read_text())
+        except (OSError, ValueError):
+            return None
+        if data.get("metadata_url") != self.metadata_url or not data.get("metadata"):
+            return None  # Cache belongs to another tenant/IdP
+        return data
+
+    def _write_disk(self, data: dict) -> None:
+        # Write-then-rename so concurrent workers never read a half-written file
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.cache_path.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(data))
+        os.replace(tmp, self.cache_path)
+
+    def _use(self, data: dict) -> None:
+        self._data = data
+        self.fetched_at = data["fetched_at"]
+        if self._client is not None:
+            self._apply(data)
+
+    def _apply(self, data: dict) -> None:
+        metadata = dict(data["metadata"])
+        if data.get("jwks"):
+            metadata["jwks"] = data["jwks"]
+        metadata["_loaded_at"] = data["fetched_at"]
+        self._client.server_metadata.update(metadata)
+
+    def prime(self, client) -> bool:
+        """Attach to an authlib client and load the current copy into it. Returns True on a hit."""
+        self._client = client
+        # Another worker may have refreshed the file since this one started
+        on_disk = self._read_disk()
+        if on_disk and (self._data is None or on_disk["fetched_at"] > self._data["fetched_at"]):
+            self._data = on_disk
+            self.fetched_at = on_disk["fetched_at"]
+        if self._data:
+            self._apply(self._data)
+        return self._data is not None
+
+    @property
+    def age(self) -> Optional[float]:
+        return None if self.fetched_at is None else time.time() - self.fetched_at
+
+    # --- Network ---
+
+    async def refresh(self) -> bool:
+        """Fetches discovery + JWKS. On failure the current copy is kept (stale-on-error)."""
+        import httpx  # Only the background refresh needs it
+
+        try:
+            async with httpx.AsyncClient(timeout=self.timeout) as http:
+                resp = await http.get(self.metadata_url)
+                resp.raise_for_status()
+                metadata = resp.json()
+                jwks = None
+                if metadata.get("jwks_uri"):
+                    resp = await http.get(metadata["jwks_uri"])
+                    resp.raise_for_status()
+                    jwks = resp.json()
+        except (httpx.HTTPError, ValueError) as e:
+            self.last_error = f"{type(e).__name__}: {e}"
+            state = "serving stale copy" if self.fetched_at else "no cached copy"
+            print(f"WARNING: OIDC metadata refresh failed ({self.last_error}); {state}.")
+            return False
+
+        # Keep keys authlib fetched itself after a rotation (or the last copy) if the IdP did not return any
+        if not jwks and self._client is not None:
+            jwks = self._client.server_metadata.get("jwks")
+        if not jwks and self._data:
+            jwks = self._data.get("jwks")
+        data = {"metadata_url": self.metadata_url, "fetched_at": time.time(), "metadata": metadata, "jwks": jwks}
+        try:
+            self._write_disk(data)
+        except OSError as e:
+            print(f"WARNING: could not persist OIDC metadata cache: {e}")
+        self._use(data)
+        self.last_error = None
+        return True
+
+    async def _run(self) -> None:
+        while True:
+            age = self.age
+            if age is None or age >= self.refresh_interval:
+                ok = await self.refresh()
+                delay = self.refresh_interval if ok else self.retry_interval
+            else:
+                delay = self.refresh_interval - age
+            # Jitter so workers started together do not refresh in lockstep
+            await asyncio.sleep(delay * random.uniform(0.9, 1.1))
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
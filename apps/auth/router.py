@@ -1,10 +1,11 @@
-from fastapi import APIRouter, Depends, Form, Request, Response, status, UploadFile, File
+from fastapi import APIRouter, Depends, Form, Request, Response, status, UploadFile, File, HTTPException
 from fastapi.responses import RedirectResponse
 from fastapi.templating import Jinja2Templates
 from sqlmodel import Session
 from database import get_session
 from apps.auth.services import AuthService
 from apps.auth.models import User
+from apps.auth.cache import invalidate_user
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 templates = Jinja2Templates(directory="templates")
@@ -12,23 +13,24 @@ templates = Jinja2Templates(directory="templates")
 def get_service(session: Session = Depends(get_session)) -> AuthService:
     return AuthService(session)
 
-from apps.auth.utils import oauth
+from apps.auth.utils import get_auth0_client
 import os
 
 # --- AUTH0 ROUTES ---
 
 @router.get("/login")
 async def login(request: Request):
-    if not oauth.auth0:
+    auth0 = get_auth0_client()
+    if not auth0:
         return "Authentication service not configured"
     
     # Absolute URL for callback
     redirect_uri = request.url_for('auth_callback')
-    return await oauth.auth0.authorize_redirect(request, redirect_uri)
+    return await auth0.authorize_redirect(request, redirect_uri)
 
 @router.get("/callback", name="auth_callback")
 async def auth_callback(request: Request, service: AuthService = Depends(get_service)):
-    token = await oauth.auth0.authorize_access_token(request)
+    token = await get_auth0_client().authorize_access_token(request)
     user_info = token.get('userinfo')
     
     if not user_info:
@@ -65,6 +67,8 @@ async def auth_callback(request: Request, service: AuthService = Depends(get_ser
         service.session.commit()
         service.session.refresh(user)
     
+    invalidate_user(user.id)
+
     # Set Session
     request.session['user_id'] = user.id
     
@@ -97,6 +101,37 @@ def register():
 
 from apps.auth.subscription_service import SubscriptionService
 from apps.auth.deps import get_current_user, require_user
+from apps.auth.cache import load_user
+from apps.auth.tokens import issue_tokens, decode_token, tokens_enabled, TokenError
+
+# --- API TOKENS ---
+
+def _require_tokens_enabled():
+    # Signed with SECRET_KEY: with the public default anyone could mint tokens, so the API stays off
+    if not tokens_enabled():
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="API tokens are disabled: SECRET_KEY is not configured")
+
+@router.post("/token")
+def issue_api_token(user: User | None = Depends(get_current_user)):
+    # Exchanges a logged-in browser session for a bearer token pair
+    _require_tokens_enabled()
+    if not user:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated")
+    return issue_tokens(user)
+
+@router.post("/token/refresh")
+def refresh_api_token(refresh_token: str = Form(...), session: Session = Depends(get_session)):
+    _require_tokens_enabled()
+    try:
+        claims = decode_token(refresh_token, "refresh")
+    except TokenError:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid or expired token")
+
+    # Refresh is where the entitlement claim is re-read from the user record
+    user = load_user(session, int(claims["sub"]))
+    if not user or not user.is_active:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid or expired token")
+    return issue_tokens(user)
 
 # --- PROFILE ROUTES ---
 
@@ -119,16 +154,17 @@ def update_profile(
     return RedirectResponse(url="/auth/profile", status_code=303)
 
 @router.get("/subscribe")
-def subscribe_premium(
+async def subscribe_premium(
     request: Request,
     user: User = Depends(get_current_user),
     session: Session = Depends(get_session)
 ):
     sub_service = SubscriptionService(session)
-    success_url = str(request.url_for('dashboard')) # Redirect to analytics after success
-    cancel_url = str(request.url_for('dashboard'))
+    # Plain path, not url_for: the analytics router is only mounted once it is first requested
+    success_url = f"{request.base_url}analytics/" # Redirect to analytics after success
+    cancel_url = success_url
     
-    checkout_url = sub_service.create_checkout_session(user, success_url, cancel_url)
+    checkout_url = await sub_service.create_checkout_session(user, success_url, cancel_url)
     
     if checkout_url:
         return RedirectResponse(checkout_url, status_code=303)
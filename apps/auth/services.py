@@ -8,7 +8,7 @@ import uuid
 from pathlib import Path
 
 from apps.auth.models import User
-from apps.auth.models import User
+from apps.auth.cache import invalidate_user
 # from config import settings # Config not needed here anymore for token
 
 from apps.core.base_service import BaseService
@@ -50,5 +50,6 @@ class AuthService(BaseService):
             
         self.session.add(user)
         self.session.commit()
+        invalidate_user(user.id)
         self.session.refresh(user)
         return user
@@ -1,22 +1,24 @@
 from typing import Optional
-import stripe
 from fastapi import Request
 from sqlmodel import Session, select
-from apps.auth.models import User
+from datetime import datetime
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from apps.auth.models import User, StripeEvent
 from config import settings
 
-stripe.api_key = settings.STRIPE_SECRET_KEY
-
 class SubscriptionService:
     def __init__(self, session: Session):
         self.session = session
+        self.changed_user_ids = set() # Cache invalidation once the caller has committed
 
-    def create_checkout_session(self, user: User, success_url: str, cancel_url: str) -> Optional[str]:
+    async def create_checkout_session(self, user: User, success_url: str, cancel_url: str) -> Optional[str]:
         if not settings.ENABLE_SUBSCRIPTION or not settings.STRIPE_PRICE_ID_PREMIUM:
             return None
+        # Deferred: the Stripe SDK is only loaded once subscriptions are actually used
+        from apps.billing.gateway import stripe_gateway
             
         try:
-            checkout_session = stripe.checkout.Session.create(
+            checkout_session = await stripe_gateway.create_checkout_session(
                 customer_email=user.email,
                 payment_method_types=['card'],
                 line_items=[
@@ -30,14 +32,13 @@ class SubscriptionService:
                 cancel_url=cancel_url,
                 client_reference_id=str(user.id)
             )
-            return checkout_session.url
+            return checkout_session["url"]
         except Exception as e:
             print(f"Stripe Error: {e}")
             return None
 
-    def handle_webhook(self, payload: bytes, sig_header: str):
-        if not settings.STRIPE_WEBHOOK_SECRET:
-            return
+    def verify_event(self, payload: bytes, sig_header: str) -> dict:
+        import stripe
 
         try:
             event = stripe.Webhook.construct_event(
@@ -47,26 +48,77 @@ class SubscriptionService:
             raise ValueError("Invalid payload")
         except stripe.error.SignatureVerificationError as e:
             raise ValueError("Invalid signature")
+        return event
+
+    def enqueue_webhook(self, payload: bytes, sig_header: str) -> bool:
+        """
+        Verifies and stores the event in the inbox; the webhook worker applies it later.
+        Returns False when Stripe re-delivered an event we already have.
+        """
+        event = self.verify_event(payload, sig_header)
+        stmt = sqlite_insert(StripeEvent).values(
+            id=event["id"],
+            type=event["type"],
+            payload=payload.decode("utf-8"),
+            created=event["created"],
+            received_at=datetime.utcnow(),
+            status="pending",
+            attempts=0
+        ).on_conflict_do_nothing(index_elements=["id"])
+        inserted = self.session.execute(stmt).rowcount
+        self.session.commit()
+        return inserted > 0
 
+    def apply_event(self, event: dict):
+        """
+        Applies one event. Handlers set absolute state, so re-applying is harmless.
+        An event older than the last one applied to the same user (a Stripe retry
+        arriving late) is skipped, so it cannot undo a newer state. The caller commits.
+        """
+        created = event.get('created')
         if event['type'] == 'checkout.session.completed':
             session = event['data']['object']
-            self._fulfill_checkout(session)
-            
+            self._fulfill_checkout(session, created)
+
         elif event['type'] == 'invoice.payment_succeeded':
-             # Renovação bem sucedida
-             pass
+            # Renovação bem sucedida
+            invoice = event['data']['object']
+            self._update_subscription_status(invoice.get('customer'), 'active', created)
         elif event['type'] == 'invoice.payment_failed':
              # Falha no pagamento
              pass
+        elif event['type'] in ('customer.subscription.updated', 'customer.subscription.deleted'):
+            subscription = event['data']['object']
+            status = 'canceled' if event['type'] == 'customer.subscription.deleted' else subscription.get('status')
+            self._update_subscription_status(subscription.get('customer'), status, created)
+
+    def _is_stale(self, user: User, created: Optional[int]) -> bool:
+        if created is None or user.subscription_event_at is None or created >= user.subscription_event_at:
+            return False
+        print(f"Skipping stale Stripe event for user {user.id} (created {created} < {user.subscription_event_at})")
+        return True
+
+    def _set_status(self, user: User, status: str, created: Optional[int]) -> None:
+        user.subscription_status = status
+        if created is not None:
+            user.subscription_event_at = created
+        self.session.add(user)
+        self.changed_user_ids.add(user.id)
 
-    def _fulfill_checkout(self, session):
-        user_id = session.get('client_reference_id')
+    def _fulfill_checkout(self, session, created: Optional[int] = None):
+        # /auth/subscribe sets client_reference_id; the billing checkout sets metadata.user_id
+        user_id = session.get('client_reference_id') or (session.get('metadata') or {}).get('user_id')
         customer_id = session.get('customer')
         
         if user_id:
             user = self.session.get(User, int(user_id))
-            if user:
+            if user and not self._is_stale(user, created):
                 user.stripe_customer_id = customer_id
-                user.subscription_status = 'active'
-                self.session.add(user)
-                self.session.commit()
+                self._set_status(user, 'active', created)
+
+    def _update_subscription_status(self, customer_id: Optional[str], status: Optional[str], created: Optional[int] = None):
+        if not customer_id or not status:
+            return
+        user = self.session.exec(select(User).where(User.stripe_customer_id == customer_id)).first()
+        if user and not self._is_stale(user, created):
+            self._set_status(user, status, created)
@@ -0,0 +1,87 @@
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+from apps.auth.models import User
+from apps.auth.entitlements import entitlement_for_status
+from config import settings
+
+
+class TokenError(Exception):
+    pass
+
+
+# Public defaults (config.py, main.py): anyone could sign a token with any `sub`/`ent`
+INSECURE_SECRET_KEYS = {"", "fallback-secret-key", "super_secret_dev_key_12345"}
+
+
+def tokens_enabled() -> bool:
+    return settings.SECRET_KEY not in INSECURE_SECRET_KEYS
+
+
+def _signing_key() -> str:
+    """Bearer tokens are neither issued nor accepted until SECRET_KEY is set to a real secret."""
+    if not tokens_enabled():
+        raise TokenError("API tokens are disabled: SECRET_KEY is not configured")
+    return settings.SECRET_KEY
+
+
+@dataclass(frozen=True)
+class ApiPrincipal:
+    """
+    Who is calling the JSON API. Built from verified token claims (no DB hit)
+    or from the cookie session user. Services only need `.id`.
+    """
+    id: int
+    entitlement: str = "free"
+
+    @property
+    def is_premium(self) -> bool:
+        return self.entitlement == "premium"
+
+    @classmethod
+    def from_user(cls, user: User) -> "ApiPrincipal":
+        return cls(id=user.id, entitlement=entitlement_for(user))
+
+
+def entitlement_for(user: User) -> str:
+    return entitlement_for_status(user.subscription_status)
+
+
+def _encode(user: User, token_type: str, minutes: int) -> str:
+    claims = {
+        "sub": str(user.id),
+        "ent": entitlement_for(user),
+        "typ": token_type,
+        "exp": datetime.utcnow() + timedelta(minutes=minutes),
+    }
+    from jose import jwt  # Deferred: pulls in the cryptography backend (~25ms) at import
+    return jwt.encode(claims, _signing_key(), algorithm=settings.ALGORITHM)
+
+
+def issue_tokens(user: User) -> dict:
+    # Access tokens are short-lived because the entitlement claim is only
+    # re-read from the database when the client refreshes.
+    return {
+        "access_token": _encode(user, "access", settings.ACCESS_TOKEN_EXPIRE_MINUTES),
+        "refresh_token": _encode(user, "refresh", settings.REFRESH_TOKEN_EXPIRE_MINUTES),
+        "token_type": "bearer",
+        "expires_in": settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+    }
+
+
+def decode_token(token: str, token_type: str) -> dict:
+    key = _signing_key()
+    from jose import jwt, JWTError
+
+    try:
+        claims = jwt.decode(token, key, algorithms=[settings.ALGORITHM])
+    except JWTError as e:
+        raise TokenError(str(e))
+    if claims.get("typ") != token_type or not str(claims.get("sub", "")).isdigit():
+        raise TokenError("Invalid token type")
+    return claims
+
+
+def principal_from_token(token: str) -> ApiPrincipal:
+    claims = decode_token(token, "access")
+    return ApiPrincipal(id=int(claims["sub"]), entitlement=claims.get("ent", "free"))
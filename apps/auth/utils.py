@@ -1,24 +1,50 @@
 import os
-from authlib.integrations.starlette_client import OAuth
 from dotenv import load_dotenv
+from apps.auth.oidc_cache import OIDCMetadataCache
 
 load_dotenv()
 
-oauth = OAuth()
+oidc_cache = None
+_oauth = None
 
 AUTH0_DOMAIN = os.getenv("AUTH0_DOMAIN", "")
 AUTH0_CLIENT_ID = os.getenv("AUTH0_CLIENT_ID", "")
 AUTH0_CLIENT_SECRET = os.getenv("AUTH0_CLIENT_SECRET", "")
+# Overridable so login can be exercised against scripts/fake_oidc_server.py
+AUTH0_METADATA_URL = os.getenv("AUTH0_METADATA_URL", f"https://{AUTH0_DOMAIN}/.well-known/openid-configuration")
+OIDC_CACHE_PATH = os.getenv("OIDC_CACHE_PATH", ".cache/oidc_metadata.json")
+OIDC_REFRESH_SECONDS = int(os.getenv("OIDC_REFRESH_SECONDS", "3600"))
 
-if AUTH0_DOMAIN and AUTH0_CLIENT_ID and AUTH0_CLIENT_SECRET:
-    oauth.register(
-        "auth0",
-        client_id=AUTH0_CLIENT_ID,
-        client_secret=AUTH0_CLIENT_SECRET,
-        client_kwargs={
-            "scope": "openid profile email",
-        },
-        server_metadata_url=f'https://{AUTH0_DOMAIN}/.well-known/openid-configuration'
-    )
+AUTH0_CONFIGURED = bool(AUTH0_DOMAIN and AUTH0_CLIENT_ID and AUTH0_CLIENT_SECRET)
+
+if AUTH0_CONFIGURED:
+    # Discovery document + JWKS come from disk; refreshed in the background (see main.lifespan)
+    oidc_cache = OIDCMetadataCache(AUTH0_METADATA_URL, OIDC_CACHE_PATH, refresh_interval=OIDC_REFRESH_SECONDS)
 else:
     print("WARNING: Auth0 Environment Variables missing. OAuth will not work.")
+
+
+def get_auth0_client():
+    """
+    The authlib Auth0 client, or None when Auth0 is not configured.
+    Built on the first login: authlib (and its crypto stack) is the heaviest
+    import on the auth path and most requests never need it.
+    """
+    global _oauth
+    if not AUTH0_CONFIGURED:
+        return None
+    if _oauth is None:
+        from authlib.integrations.starlette_client import OAuth
+        oauth = OAuth()
+        oauth.register(
+            "auth0",
+            client_id=AUTH0_CLIENT_ID,
+            client_secret=AUTH0_CLIENT_SECRET,
+            client_kwargs={
+                "scope": "openid profile email",
+            },
+            server_metadata_url=AUTH0_METADATA_URL
+        )
+        oidc_cache.prime(oauth.auth0)
+        _oauth = oauth
+    return _oauth.auth0
@@ -1,22 +1,28 @@
 from fastapi import APIRouter, Request, Header, HTTPException, Depends
+from fastapi.concurrency import run_in_threadpool
 from sqlmodel import Session
 from database import get_session
 from apps.auth.subscription_service import SubscriptionService
+from apps.auth.webhook_worker import webhook_worker
 from config import settings
 
 router = APIRouter(prefix="/webhook", tags=["webhook"])
 
 @router.post("/stripe")
 async def stripe_webhook(request: Request, stripe_signature: str = Header(None), session: Session = Depends(get_session)):
-    if not settings.ENABLE_SUBSCRIPTION:
+    """The one Stripe entry point (/billing/webhook forwards here): verify, store in the inbox, wake the worker."""
+    if not settings.ENABLE_SUBSCRIPTION or not settings.STRIPE_WEBHOOK_SECRET:
         return {"status": "ignored"}
         
     payload = await request.body()
     service = SubscriptionService(session)
     
     try:
-        service.handle_webhook(payload, stripe_signature)
+        # Only verify + store here; the worker applies it (Stripe gets its 2xx right away)
+        queued = await run_in_threadpool(service.enqueue_webhook, payload, stripe_signature)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
         
-    return {"status": "success"}
+    if queued:
+        webhook_worker.notify()
+    return {"status": "queued" if queued else "duplicate"}
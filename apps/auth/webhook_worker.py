@@ -0,0 +1,137 @@
+import asyncio
+import json
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlmodel import Session, select
+from sqlalchemy import update, exists, and_
+
+from database import engine
+from apps.auth.models import StripeEvent
+from apps.auth.cache import invalidate_user
+from apps.auth.subscription_service import SubscriptionService
+
+MAX_ATTEMPTS = 5
+LOCK_TIMEOUT = timedelta(minutes=5) # A claim older than this belongs to a crashed worker
+RETRY_BASE = timedelta(seconds=10) # Doubles per attempt
+
+
+def claim_next(session: Session, now: datetime) -> Optional[str]:
+    """
+    Atomically claims the oldest pending event. Nothing is claimed while another
+    worker holds a live claim, which keeps events applied strictly in order
+    even with several processes polling the same inbox. An event waiting out its
+    retry backoff does not hold back the ones behind it; ordering across
+    deliveries (a late retry of an older event) is enforced per user by
+    SubscriptionService.apply_event.
+    """
+    stale = now - LOCK_TIMEOUT
+    live_claim = exists().where(and_(StripeEvent.status == "processing", StripeEvent.locked_at > stale))
+    oldest = (
+        select(StripeEvent.id)
+        .where(
+            ((StripeEvent.status == "pending") | ((StripeEvent.status == "processing") & (StripeEvent.locked_at <= stale))),
+            (StripeEvent.next_attempt_at == None) | (StripeEvent.next_attempt_at <= now)
+        )
+        .order_by(StripeEvent.created, StripeEvent.received_at)
+        .limit(1)
+        .scalar_subquery()
+    )
+    stmt = (
+        update(StripeEvent)
+        .where(StripeEvent.id == oldest, ~live_claim)
+        .values(status="processing", locked_at=now, attempts=StripeEvent.attempts + 1)
+        .returning(StripeEvent.id)
+    )
+    event_id = session.execute(stmt).scalar()
+    session.commit()
+    return event_id
+
+
+def process_one(session: Session) -> bool:
+    """Claims and applies one event. Returns False when the inbox has nothing claimable."""
+    event_id = claim_next(session, datetime.utcnow())
+    if event_id is None:
+        return False
+
+    record = session.get(StripeEvent, event_id)
+    service = SubscriptionService(session)
+    try:
+        service.apply_event(json.loads(record.payload))
+        # The user change and the "done" mark commit together: an event is applied exactly once
+        record.status = "done"
+        record.processed_at = datetime.utcnow()
+        record.last_error = None
+        session.add(record)
+        session.commit()
+    except Exception as e:
+        session.rollback()
+        record = session.get(StripeEvent, event_id)
+        record.status = "failed" if record.attempts >= MAX_ATTEMPTS else "pending"
+        record.locked_at = None
+        record.next_attempt_at = datetime.utcnow() + RETRY_BASE * 2 ** (record.attempts - 1)
+        record.last_error = f"{type(e).__name__}: {e}"[:500]
+        session.add(record)
+        session.commit()
+        print(f"Stripe event {event_id} failed (attempt {record.attempts}): {record.last_error}")
+        return True
+
+    for user_id in service.changed_user_ids:
+        invalidate_user(user_id)
+    return True
+
+
+def drain(max_events: int = 1000) -> int:
+    """Applies pending events until the inbox is empty (or max_events). Returns how many were handled."""
+    handled = 0
+    with Session(engine) as session:
+        while handled < max_events and process_one(session):
+            handled += 1
+    return handled
+
+
+class WebhookWorker:
+    """
+    Background task applying the inbox. The webhook route calls notify() after
+    storing an event; the poll interval picks up anything enqueued elsewhere
+    (other workers, replays, retries).
+    """
+
+    def __init__(self, poll_interval: float = 5.0):
+        self.poll_interval = poll_interval
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def notify(self) -> None:
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _run(self) -> None:
+        while True:
+            self._wakeup.clear()
+            try:
+                # DB work stays off the event loop
+                await asyncio.to_thread(drain)
+            except Exception as e:
+                print(f"Webhook worker error: {e}")
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+webhook_worker = WebhookWorker()
@@ -0,0 +1,185 @@
+import asyncio
+import random
+import threading
+import time
+import uuid
+from typing import Optional
+
+import stripe
+
+from config import settings
+
+
+class GatewayUnavailable(Exception):
+    """Stripe could not be reached in time (timeout, network, circuit open)."""
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures; while open every call
+    fails fast. After `reset_timeout` seconds one trial call is let through
+    (half-open): success closes the circuit, failure re-opens it.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half-open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.failures >= self.failure_threshold or self.opened_at is not None:
+                self.opened_at = time.monotonic()
+
+
+# --- Backends (blocking; the gateway runs them off the event loop) ---
+
+class StripeSDKBackend:
+    def __init__(self, api_key: Optional[str], timeout: float):
+        stripe.api_key = api_key
+        # Below the gateway's timeout: the SDK gives up first (a retryable APIConnectionError), so a
+        # retry never overlaps an attempt still in flight with the same idempotency key
+        stripe.default_http_client = stripe.new_default_http_client(timeout=timeout)
+        stripe.max_network_retries = 0 # Retries are the gateway's job
+
+    def create_customer(self, idempotency_key: str, **params) -> dict:
+        customer = stripe.Customer.create(idempotency_key=idempotency_key, **params)
+        return {"id": customer.id}
+
+    def create_checkout_session(self, idempotency_key: str, **params) -> dict:
+        session = stripe.checkout.Session.create(idempotency_key=idempotency_key, **params)
+        return {"id": session.id, "url": session.url}
+
+    def create_portal_session(self, idempotency_key: str, **params) -> dict:
+        session = stripe.billing_portal.Session.create(idempotency_key=idempotency_key, **params)
+        return {"id": session.id, "url": session.url}
+
+
+class StubBackend:
+    """
+    Offline stand-in for load tests and local development. Checkout and portal
+    URLs point straight back to the app's success/return URLs.
+    """
+
+    def __init__(self, latency: float = 0.0, failure_rate: float = 0.0):
+        self.latency = latency
+        self.failure_rate = failure_rate
+
+    def _simulate(self) -> None:
+        if self.latency:
+            time.sleep(self.latency)
+        if self.failure_rate and random.random() < self.failure_rate:
+            raise stripe.error.APIConnectionError("Stub backend: simulated network failure")
+
+    def create_customer(self, idempotency_key: str, **params) -> dict:
+        self._simulate()
+        return {"id": f"cus_stub_{idempotency_key.replace('-', '')[:14]}"}
+
+    def create_checkout_session(self, idempotency_key: str, **params) -> dict:
+        self._simulate()
+        session_id = f"cs_stub_{uuid.uuid4().hex[:16]}"
+        separator = "&" if "?" in params["success_url"] else "?"
+        return {"id": session_id, "url": f"{params['success_url']}{separator}session_id={session_id}"}
+
+    def create_portal_session(self, idempotency_key: str, **params) -> dict:
+        self._simulate()
+        return {"id": f"bps_stub_{uuid.uuid4().hex[:16]}", "url": params["return_url"]}
+
+
+# Errors worth retrying: the request may not have reached Stripe or Stripe is struggling.
+# IdempotencyError (409): an earlier attempt with the same key is still being processed
+RETRYABLE = (
+    stripe.error.APIConnectionError, stripe.error.RateLimitError, stripe.error.IdempotencyError, asyncio.TimeoutError
+)
+SDK_TIMEOUT_RATIO = 0.8
+
+
+class StripeGateway:
+    """
+    Async facade over a backend: every call runs in a worker thread under a
+    strict timeout, is retried with full-jitter backoff on transient errors
+    (same idempotency key, so Stripe never creates duplicates) and goes through
+    a circuit breaker so a Stripe outage fails fast instead of piling up requests.
+    """
+
+    def __init__(self, backend, timeout: float = 5.0, max_retries: int = 2, backoff: float = 0.25, breaker: CircuitBreaker = None):
+        self.backend = backend
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.breaker = breaker or CircuitBreaker()
+
+    async def _call(self, method: str, **params) -> dict:
+        idempotency_key = str(uuid.uuid4())
+        fn = getattr(self.backend, method)
+        for attempt in range(self.max_retries + 1):
+            if not self.breaker.allow():
+                raise GatewayUnavailable("Stripe circuit open")
+            try:
+                result = await asyncio.wait_for(
+                    asyncio.to_thread(fn, idempotency_key, **params), timeout=self.timeout
+                )
+            except RETRYABLE as e:
+                self.breaker.record_failure()
+                if attempt == self.max_retries:
+                    raise GatewayUnavailable(f"Stripe {method} failed: {type(e).__name__}") from e
+                await asyncio.sleep(random.uniform(0, self.backoff * 2 ** attempt))
+                continue
+            except stripe.error.APIError as e:
+                # 5xx from Stripe: counts against the breaker, not retried
+                self.breaker.record_failure()
+                raise GatewayUnavailable(f"Stripe {method} failed: {e}") from e
+            except stripe.error.StripeError:
+                # Bad request, auth...: Stripe answered, so this is our bug, not an outage
+                self.breaker.record_success()
+                raise
+            self.breaker.record_success()
+            return result
+
+    async def create_customer(self, email: str, name: Optional[str] = None, metadata: dict = None) -> dict:
+        return await self._call("create_customer", email=email, name=name, metadata=metadata or {})
+
+    async def create_checkout_session(self, **params) -> dict:
+        return await self._call("create_checkout_session", **params)
+
+    async def create_portal_session(self, customer: str, return_url: str) -> dict:
+        return await self._call("create_portal_session", customer=customer, return_url=return_url)
+
+
+def build_gateway() -> StripeGateway:
+    if settings.STRIPE_BACKEND == "stub":
+        backend = StubBackend(latency=settings.STRIPE_STUB_LATENCY)
+    else:
+        backend = StripeSDKBackend(settings.STRIPE_SECRET_KEY, timeout=settings.STRIPE_TIMEOUT_SECONDS * SDK_TIMEOUT_RATIO)
+    return StripeGateway(backend, timeout=settings.STRIPE_TIMEOUT_SECONDS, max_retries=settings.STRIPE_MAX_RETRIES)
+
+stripe_gateway = build_gateway()
@@ -1,9 +1,10 @@
-from fastapi import APIRouter, Request, Depends, HTTPException, Header
+from fastapi import APIRouter, Request, Depends, Header
 from fastapi.responses import RedirectResponse
 from fastapi.templating import Jinja2Templates
 from sqlmodel import Session
-from apps.auth.dependencies import get_current_user
+from apps.auth.deps import get_current_user
 from apps.auth.models import User
+from apps.auth.entitlements import EntitlementService
 from database import get_session
 import os
 from .services import BillingService
@@ -13,13 +14,12 @@ templates = Jinja2Templates(directory="templates")
 
 # Load Config
 PREMIUM_PRICE_ID = os.getenv("STRIPE_PRICE_ID_PREMIUM") 
-STRIPE_WEBHOOK_SECRET = os.getenv("STRIPE_WEBHOOK_SECRET")
 
 def get_service(session: Session = Depends(get_session)):
     return BillingService(session)
 
 @router.get("/")
-def pricing_page(request: Request, user: User = Depends(get_current_user)):
+def pricing_page(request: Request, user: User = Depends(get_current_user), session: Session = Depends(get_session)):
     """Show Pricing or Subscription Status"""
     if not user:
         return RedirectResponse("/auth/login")
@@ -27,11 +27,11 @@ def pricing_page(request: Request, user: User = Depends(get_current_user)):
     return templates.TemplateResponse("billing/pricing.html", {
         "request": request,
         "user": user,
-        "is_premium": user.subscription_status == 'active'
+        "is_premium": EntitlementService(session).is_premium(user.id)
     })
 
 @router.post("/checkout")
-def create_checkout(
+async def create_checkout(
     request: Request, 
     user: User = Depends(get_current_user), 
     service: BillingService = Depends(get_service)
@@ -44,7 +44,7 @@ def create_checkout(
             "error": "Billing not configured (Missing Price ID)"
         })
 
-    checkout_url = service.create_checkout_session(
+    checkout_url = await service.create_checkout_session(
         user=user,
         price_id=PREMIUM_PRICE_ID,
         success_url=str(request.base_url) + "billing/success",
@@ -57,13 +57,13 @@ def create_checkout(
         return RedirectResponse("/billing?error=checkout_failed")
 
 @router.get("/portal")
-def customer_portal(
+async def customer_portal(
     request: Request, 
     user: User = Depends(get_current_user), 
     service: BillingService = Depends(get_service)
 ):
     """Redirect to Stripe Customer Portal"""
-    portal_url = service.create_portal_session(
+    portal_url = await service.create_portal_session(
         user=user,
         return_url=str(request.base_url) + "billing"
     )
@@ -81,16 +81,8 @@ def billing_success(request: Request, user: User = Depends(get_current_user)):
 async def stripe_webhook(
     request: Request, 
     stripe_signature: str = Header(None),
-    service: BillingService = Depends(get_service)
+    session: Session = Depends(get_session)
 ):
-    """Handle Stripe Webhooks securely"""
-    if not STRIPE_WEBHOOK_SECRET:
-        raise HTTPException(status_code=500, detail="Webhook Secret not configured")
-        
-    payload = await request.body()
-    try:
-        service.handle_webhook_event(payload, stripe_signature, STRIPE_WEBHOOK_SECRET)
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
-        
-    return {"status": "ok"}
+    """Legacy URL kept for existing Stripe endpoints: same verified inbox (idempotent, ordered) as /webhook/stripe"""
+    from apps.auth.webhook_router import stripe_webhook as inbox_webhook
+    return await inbox_webhook(request, stripe_signature, session)
@@ -0,0 +1,122 @@
+import asyncio
+import importlib
+import threading
+from typing import Dict, Iterable, NamedTuple, Tuple
+
+from config import settings
+
+
+class AppModule(NamedTuple):
+    name: str
+    prefix: str
+    router: str                     # "package.module:attribute"
+    models: Tuple[str, ...] = ()    # Modules whose import registers the app's tables
+    requires: Tuple[str, ...] = ()  # Other apps that must be enabled with this one
+    home: bool = False              # Can be the landing page for "/"
+
+
+# Always imported: User.cigars points at Cigar, and humidor writes the analytics rollups
+CORE_MODELS = ("apps.auth.models", "apps.humidor.models", "apps.analytics.models")
+
+MODULES: Dict[str, AppModule] = {
+    m.name: m for m in (
+        AppModule("humidor", "/humidor", "apps.humidor.router:router", requires=("analytics",), home=True),
+        AppModule("analytics", "/analytics", "apps.analytics.router:router", requires=("humidor",)),
+        AppModule("garage", "/garage", "apps.garage.router:router", models=("apps.garage.models",), home=True),
+        AppModule("armory", "/armory", "apps.armory.router:router", models=("apps.armory.models",), home=True),
+        AppModule("portfolio", "/portfolio", "apps.portfolio.router:router"),
+        AppModule("billing", "/billing", "apps.billing.router:router"),
+    )
+}
+
+
+def _import(path: str):
+    module, _, attribute = path.partition(":")
+    loaded = importlib.import_module(module)
+    return getattr(loaded, attribute) if attribute else loaded
+
+
+class ModuleRegistry:
+    """
+    Which apps this worker serves (settings.ENABLED_MODULES) and whether their
+    routers have been imported yet. Disabled apps are never imported; enabled
+    ones are imported on the first request to their prefix (see LazyRouterMiddleware)
+    or all at once with load_all().
+    """
+
+    def __init__(self, names: Iterable[str], modules: Dict[str, AppModule] = MODULES):
+        names = {n.strip() for n in names if n.strip()}
+        unknown = names - modules.keys()
+        if unknown:
+            raise ValueError(f"Unknown modules in ENABLED_MODULES: {', '.join(sorted(unknown))}")
+        for name in list(names):
+            names.update(modules[name].requires)
+        self.modules = [m for m in modules.values() if m.name in names]  # Registry order
+        self._all_modules = tuple(modules.values())
+        self._loaded = set()
+        self._lock = threading.Lock()
+
+    def is_enabled(self, name: str) -> bool:
+        return any(m.name == name for m in self.modules)
+
+    @property
+    def pending(self) -> bool:
+        return len(self._loaded) < len(self.modules)
+
+    @property
+    def home(self) -> str:
+        return next((m.prefix for m in self.modules if m.home), "/auth/profile")
+
+    def model_modules(self) -> Tuple[str, ...]:
+        """
+        Every app's models, enabled or not: entry points with different
+        ENABLED_MODULES (main.py, main_garage.py) share one database file, so they
+        must create the same schema and agree on its fingerprint (database.py).
+        Models are cheap to import; routers stay lazy and disabled apps are never mounted.
+        """
+        return CORE_MODELS + tuple(path for m in self._all_modules for path in m.models)
+
+    def import_models(self) -> None:
+        for path in self.model_modules():
+            importlib.import_module(path)
+
+    def module_for(self, path: str):
+        for m in self.modules:
+            if path == m.prefix or path.startswith(m.prefix + "/"):
+                return m
+        return None
+
+    def load(self, app, module: AppModule) -> None:
+        with self._lock:
+            if module.name in self._loaded:
+                return
+            app.include_router(_import(module.router))
+            app.openapi_schema = None  # Rebuilt with the new routes on next /openapi.json
+            self._loaded.add(module.name)
+
+    def load_all(self, app) -> None:
+        for m in self.modules:
+            self.load(app, m)
+
+
+class LazyRouterMiddleware:
+    """
+    Pure ASGI middleware: the first request under an enabled app's prefix
+    imports its router (off the event loop) and includes it in the FastAPI
+    app before routing continues. Once everything is loaded it is a pass-through.
+    """
+
+    def __init__(self, app, registry: ModuleRegistry, target):
+        self.app = app
+        self.registry = registry
+        self.target = target  # The FastAPI app the routers are included in
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] in ("http", "websocket") and self.registry.pending:
+            module = self.registry.module_for(scope["path"])
+            if module is not None:
+                await asyncio.to_thread(self.registry.load, self.target, module)
+        await self.app(scope, receive, send)
+
+
+registry = ModuleRegistry(settings.ENABLED_MODULES.split(","))
@@ -0,0 +1,248 @@
+import asyncio
+import base64
+import ipaddress
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, Counter
+from typing import Callable, Iterable, NamedTuple, Optional
+
+from itsdangerous import TimestampSigner, BadSignature
+
+from apps.auth.tokens import principal_from_token, TokenError
+
+
+class RouteClass(NamedTuple):
+    name: str
+    match: Callable[[str, str, dict], bool]  # (method, path, headers) -> bool
+    rate: float   # tokens per second
+    burst: float  # bucket size
+
+
+def _is_multipart(headers: dict) -> bool:
+    return headers.get(b"content-type", b"").startswith(b"multipart/form-data")
+
+# First match wins; limits are per key (user or IP) and per class
+DEFAULT_ROUTE_CLASSES = (
+    RouteClass("webhook", lambda m, p, h: p.startswith("/webhook/"), rate=20, burst=100),
+    RouteClass("upload", lambda m, p, h: m == "POST" and _is_multipart(h), rate=0.5, burst=10),
+    RouteClass("community", lambda m, p, h: p.startswith("/humidor/community"), rate=2, burst=20),
+    RouteClass("api", lambda m, p, h: "/api/" in p or p.startswith("/auth/token"), rate=10, burst=60),
+    RouteClass("default", lambda m, p, h: True, rate=5, burst=40),
+)
+
+
+class MemoryBucketStore:
+    """Per-process buckets. Evicts least recently used keys (an evicted bucket comes back full)."""
+
+    blocking = False  # Pure memory: cheap enough to call on the event loop
+
+    def __init__(self, maxsize: int = 100_000):
+        self.maxsize = maxsize
+        self._buckets: "OrderedDict[str, list]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key: str, rate: float, burst: float, now: float) -> float:
+        """Consumes one token. Returns 0 when allowed, else seconds until a token is available."""
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = [burst, now]
+                while len(self._buckets) > self.maxsize:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+            tokens = min(burst, bucket[0] + (now - bucket[1]) * rate)
+            bucket[1] = now
+            if tokens >= 1:
+                bucket[0] = tokens - 1
+                return 0.0
+            bucket[0] = tokens
+            return (1 - tokens) / rate
+
+
+class SQLiteBucketStore:
+    """
+    Buckets shared by every worker on the host through one SQLite file.
+    Refill and consume happen in a single UPSERT, so concurrent workers cannot
+    double-spend a token.
+    """
+
+    blocking = True  # File I/O and a busy timeout: the middleware calls take() off the event loop
+
+    def __init__(self, path: str):
+        self._conn = sqlite3.connect(path, timeout=1.0, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=OFF")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS rate_bucket (key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)"
+        )
+        self._lock = threading.Lock()
+
+    def take(self, key: str, rate: float, burst: float, now: float) -> float:
+        refill = "MIN(:burst, tokens + (:now - updated) * :rate)"
+        params = {"key": key, "rate": rate, "burst": burst, "now": now}
+        with self._lock:
+            try:
+                row, tokens = self._take(refill, params)
+            except sqlite3.OperationalError:
+                return 0.0  # Fail open: a locked/unavailable counter file must not take the site down
+        if row is not None:
+            return 0.0
+        return (1 - (tokens[0] if tokens else 0)) / rate
+
+    def _take(self, refill: str, params: dict):
+        row = self._conn.execute(
+            f"""
+            INSERT INTO rate_bucket (key, tokens, updated) VALUES (:key, :burst - 1, :now)
+            ON CONFLICT(key) DO UPDATE SET tokens = {refill} - 1, updated = :now
+            WHERE {refill} >= 1
+            RETURNING tokens
+            """,
+            params
+        ).fetchone()
+        if row is not None:
+            return row, None
+        return None, self._conn.execute(f"SELECT {refill} FROM rate_bucket WHERE key = :key", params).fetchone()
+
+
+def parse_networks(spec: str) -> tuple:
+    """"127.0.0.1,172.16.0.0/12" -> ip networks (settings.TRUSTED_PROXIES)."""
+    return tuple(ipaddress.ip_network(part.strip(), strict=False) for part in spec.split(",") if part.strip())
+
+
+class LimiterStats:
+    """Per-process counters (allowed/rejected per route class, shed) and in-flight requests."""
+
+    def __init__(self):
+        self.counters = Counter()
+        self.inflight = 0
+
+    def snapshot(self, max_inflight: int = None) -> dict:
+        return {"inflight": self.inflight, "max_inflight": max_inflight, "counters": dict(self.counters)}
+
+
+class RateLimitMiddleware:
+    """
+    Pure ASGI middleware (no BaseHTTPMiddleware overhead) that rejects early:
+
+    * load shedding: when more than `max_inflight` requests are already being
+      served by this process, answer 503 before the request reaches the threadpool;
+    * token buckets per (route class, user or client IP): answer 429 with Retry-After.
+
+    The user is read from the bearer token or the signed session cookie without
+    touching the database. Anonymous requests are keyed on the client IP: when
+    the peer is one of `trusted_proxies` (traefik, nginx) it is the right-most
+    X-Forwarded-For address that is not itself a trusted proxy, so clients behind
+    the proxy do not share its bucket. Counters are kept in `stats`.
+    """
+
+    def __init__(
+        self,
+        app,
+        secret_key: str,
+        store=None,
+        stats: LimiterStats = None,
+        route_classes=DEFAULT_ROUTE_CLASSES,
+        max_inflight: int = 64,
+        exempt_prefixes=("/static/",),
+        session_cookie: str = "session",
+        trusted_proxies: Iterable = ()
+    ):
+        self.app = app
+        self.store = store or MemoryBucketStore()
+        self.route_classes = route_classes
+        self.max_inflight = max_inflight
+        self.exempt_prefixes = exempt_prefixes
+        self.session_cookie = session_cookie
+        self._signer = TimestampSigner(secret_key)
+        self.stats = stats or LimiterStats()
+        self.trusted_proxies = tuple(trusted_proxies)
+
+    def _identity(self, scope, headers: dict) -> str:
+        authorization = headers.get(b"authorization", b"").decode("latin-1")
+        if authorization[:7].lower() == "bearer ":
+            try:
+                return f"u:{principal_from_token(authorization[7:]).id}"
+            except TokenError:
+                pass
+        user_id = self._session_user(headers.get(b"cookie", b"").decode("latin-1"))
+        if user_id:
+            return f"u:{user_id}"
+        return f"ip:{self._client_ip(scope, headers)}"
+
+    def _is_trusted(self, address: str) -> bool:
+        try:
+            ip = ipaddress.ip_address(address)
+        except ValueError:
+            return False
+        return any(ip in network for network in self.trusted_proxies)
+
+    def _client_ip(self, scope, headers: dict) -> str:
+        client = scope.get("client")
+        peer = client[0] if client else "unknown"
+        if not self._is_trusted(peer):
+            return peer
+        # Walk the chain from the proxy backwards; the left-most entries are client-supplied and spoofable
+        forwarded = headers.get(b"x-forwarded-for", b"").decode("latin-1")
+        for address in reversed([a.strip() for a in forwarded.split(",") if a.strip()]):
+            if not self._is_trusted(address):
+                return address
+        return peer
+
+    def _session_user(self, cookie_header: str) -> Optional[int]:
+        # Same format as starlette's SessionMiddleware: base64(json) signed with itsdangerous
+        for part in cookie_header.split(";"):
+            name, _, value = part.strip().partition("=")
+            if name == self.session_cookie and value:
+                try:
+                    data = json.loads(base64.b64decode(self._signer.unsign(value.encode())))
+                except (BadSignature, ValueError):
+                    return None
+                return data.get("user_id")
+        return None
+
+    async def _reject(self, send, status: int, detail: str, retry_after: float) -> None:
+        body = json.dumps({"detail": detail}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(max(1, round(retry_after))).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].startswith(self.exempt_prefixes):
+            await self.app(scope, receive, send)
+            return
+
+        stats = self.stats
+        if stats.inflight >= self.max_inflight:
+            stats.counters["shed"] += 1
+            await self._reject(send, 503, "Server busy, try again shortly", 1)
+            return
+
+        method, path = scope["method"], scope["path"]
+        headers = dict(scope["headers"])
+        route_class = next(rc for rc in self.route_classes if rc.match(method, path, headers))
+        key = f"{route_class.name}:{self._identity(scope, headers)}"
+        if self.store.blocking:
+            wait = await asyncio.to_thread(self.store.take, key, route_class.rate, route_class.burst, time.time())
+        else:
+            wait = self.store.take(key, route_class.rate, route_class.burst, time.time())
+        if wait > 0:
+            stats.counters[f"rejected:{route_class.name}"] += 1
+            await self._reject(send, 429, "Too many requests", wait)
+            return
+
+        stats.counters[f"allowed:{route_class.name}"] += 1
+        stats.inflight += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            stats.inflight -= 1
@@ -0,0 +1,22 @@
+import hashlib
+from typing import Callable, Hashable
+import orjson
+from fastapi import Request, Response, status
+
+from apps.core.cache import TTLCache
+
+
+def cached_json(request: Request, cache: TTLCache, key: Hashable, factory: Callable[[], object]) -> Response:
+    """
+    Serializes the payload with orjson once and keeps the bytes in `cache`.
+    The ETag lets the browser revalidate with a cheap 304 instead of re-downloading.
+    """
+    def build():
+        body = orjson.dumps(factory(), option=orjson.OPT_SERIALIZE_NUMPY)
+        return body, '"' + hashlib.md5(body).hexdigest() + '"'
+
+    body, etag = cache.get_or_set(key, build)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -0,0 +1,83 @@
+from datetime import date, datetime, timedelta
+from typing import Optional
+
+import numpy as np
+from sqlmodel import Session, select
+from sqlalchemy import update
+
+from apps.garage.models import Veiculo, Alerta
+
+DIAS_POR_MES = 30.4375
+DUE_DAYS = 30    # "due soon" quando faltam até N dias...
+DUE_MILES = 500  # ...ou até N milhas
+
+
+class AlertEngine:
+    """
+    Avalia todos os alertas ativos de uma vez: uma query, projeção vetorizada
+    (NumPy) da data prevista a partir de km_atual e media_km_mensal, e um
+    UPDATE em lote. As páginas só leem os campos materializados.
+    """
+
+    def __init__(self, session: Session):
+        self.session = session
+
+    def evaluate(
+        self,
+        user_id: Optional[int] = None,
+        vehicle_id: Optional[int] = None,
+        today: Optional[date] = None,
+        due_days: int = DUE_DAYS,
+        due_miles: int = DUE_MILES
+    ) -> dict:
+        today = today or date.today()
+        stmt = (
+            select(Alerta.id, Alerta.km_limite, Veiculo.km_atual, Veiculo.media_km_mensal)
+            .join(Veiculo)
+            .where(Alerta.ativo == True, Veiculo.status == "active")
+        )
+        if user_id is not None:
+            stmt = stmt.where(Veiculo.user_id == user_id)
+        if vehicle_id is not None:
+            stmt = stmt.where(Veiculo.id == vehicle_id)
+
+        rows = self.session.connection().execute(stmt).all()
+        if not rows:
+            return {"evaluated": 0, "overdue": 0, "due_soon": 0}
+
+        data = np.array(list(map(tuple, rows)), dtype=np.float64)
+        ids = data[:, 0].astype(np.int64)
+        km_restante = data[:, 1] - data[:, 2]
+        # Sem média de uso (0/None) a projeção em dias fica indefinida
+        km_por_dia = np.nan_to_num(data[:, 3], nan=0.0) / DIAS_POR_MES
+        with np.errstate(divide="ignore", invalid="ignore"):
+            dias = np.where(km_por_dia > 0, np.ceil(np.maximum(km_restante, 0) / km_por_dia), np.inf)
+
+        overdue = km_restante <= 0
+        due_soon = ~overdue & ((km_restante <= due_miles) | (dias <= due_days))
+        estado = np.where(overdue, "overdue", np.where(due_soon, "due_soon", "ok"))
+
+        base = np.datetime64(today, "D")
+        finito = np.isfinite(dias)
+        previstas = np.where(finito, base + np.where(finito, dias, 0).astype("timedelta64[D]"), np.datetime64("NaT"))
+
+        agora = datetime.utcnow()
+        valores = [
+            {
+                "id": int(i),
+                "estado": str(e),
+                "km_restante": int(k),
+                "dias_restantes": int(d) if f else None,
+                "data_prevista": p.astype(date) if f else None,
+                "avaliado_em": agora,
+            }
+            for i, e, k, d, f, p in zip(ids, estado, km_restante, dias, finito, previstas)
+        ]
+        self.session.execute(update(Alerta), valores)
+        self.session.commit()
+
+        return {
+            "evaluated": len(valores),
+            "overdue": int(overdue.sum()),
+            "due_soon": int(due_soon.sum())
+        }
@@ -0,0 +1,170 @@
+import re
+import unicodedata
+from typing import Optional
+
+import numpy as np
+from sqlmodel import Session, select
+from sqlalchemy import func, cast, Integer
+
+from apps.garage.models import Veiculo, Manutencao, LeituraOdometro
+
+# Palavras-chave -> categoria (a primeira que casar vence)
+CATEGORIAS = [
+    ("Oil Change", ("oil", "oleo", "lube")),
+    ("Tires", ("tire", "tyre", "pneu", "rotation", "rodizio")),
+    ("Brakes", ("brake", "freio", "pad", "rotor")),
+    ("Alignment", ("alignment", "alinhamento", "balance", "balanceamento")),
+    ("Battery", ("battery", "bateria")),
+    ("Filters", ("filter", "filtro")),
+    ("Fluids", ("coolant", "fluid", "arrefecimento", "transmission fluid")),
+    ("Transmission", ("transmission", "cambio", "clutch", "embreagem")),
+    ("Engine", ("engine", "motor", "spark", "vela", "timing", "correia", "belt")),
+    ("Inspection", ("inspection", "revisao", "vistoria", "emissions")),
+    ("Wash & Detail", ("wash", "detail", "lavagem", "polimento")),
+    ("Wipers", ("wiper", "palheta")),
+]
+
+
+# Palavra inteira (com plural opcional): "pad" casa "pads", mas não "padrão"
+_PADROES = [
+    (categoria, re.compile(r"\b(?:" + "|".join(map(re.escape, chaves)) + r")(?:s|es)?\b"))
+    for categoria, chaves in CATEGORIAS
+]
+
+
+def _sem_acentos(texto: str) -> str:
+    return unicodedata.normalize("NFKD", texto).encode("ascii", "ignore").decode("ascii")
+
+
+def normalize_category(descricao: Optional[str]) -> str:
+    texto = re.sub(r"[^\w ]+|_", " ", (descricao or "").lower()).strip()
+    if not texto:
+        return "Other"
+    chave = _sem_acentos(texto) # "Troca de óleo" -> "troca de oleo"
+    for categoria, padrao in _PADROES:
+        if padrao.search(chave):
+            return categoria
+    return " ".join(texto.split()).title() # Fora do mapa: mantém os acentos do original
+
+
+class VehicleCostAnalytics:
+    """
+    Custo por milha, gasto por categoria e por ano e custo total de propriedade.
+    Uma query traz as colunas (veículo x manutenção); o resto é NumPy vetorizado.
+    """
+
+    def __init__(self, session: Session):
+        self.session = session
+
+    def _fetch(self, user_id: int, vehicle_id: Optional[int]):
+        veiculos_do_usuario = select(Veiculo.id).where(Veiculo.user_id == user_id)
+        km_inicial = (
+            select(LeituraOdometro.veiculo_id, func.min(func.coalesce(LeituraOdometro.km_min, LeituraOdometro.km)).label("km_min"))
+            .where(LeituraOdometro.veiculo_id.in_(veiculos_do_usuario))
+            .group_by(LeituraOdometro.veiculo_id)
+            .subquery()
+        )
+        stmt = (
+            select(
+                Veiculo.id,
+                Veiculo.km_atual,
+                func.coalesce(Veiculo.valor_estimado, 0.0),
+                Veiculo.valor_venda,
+                Veiculo.status == "active",
+                km_inicial.c.km_min,
+                Manutencao.valor,
+                Manutencao.km_na_data,
+                cast(func.strftime("%Y", Manutencao.data), Integer),
+                Manutencao.descricao,
+                Veiculo.nome
+            )
+            .select_from(Veiculo)
+            .outerjoin(Manutencao, Manutencao.veiculo_id == Veiculo.id)
+            .outerjoin(km_inicial, km_inicial.c.veiculo_id == Veiculo.id)
+            .where(Veiculo.user_id == user_id)
+        )
+        if vehicle_id is not None:
+            stmt = stmt.where(Veiculo.id == vehicle_id)
+        return self.session.connection().execute(stmt).all()
+
+    def compute(self, user_id: int, vehicle_id: Optional[int] = None) -> dict:
+        rows = self._fetch(user_id, vehicle_id)
+        if not rows:
+            return {"vehicles": [], "totals": None, "by_category": [], "by_year": {"labels": [], "totals": []}}
+
+        numeros = np.array(
+            [(r[0], r[1], r[2], r[3], r[4], r[5], r[6], r[7], r[8]) for r in rows], dtype=np.float64
+        )  # None -> NaN
+        veiculo_ids, primeira_linha, idx = np.unique(numeros[:, 0], return_index=True, return_inverse=True)
+        n = len(veiculo_ids)
+        km_atual, valor_estimado, valor_venda, ativo, km_min_odo = (numeros[primeira_linha, c] for c in range(1, 6))
+        valor, km_servico, ano = numeros[:, 6], numeros[:, 7], numeros[:, 8]
+        tem_servico = ~np.isnan(valor)
+
+        manutencao = np.bincount(idx, weights=np.nan_to_num(valor), minlength=n)
+        qtd_servicos = np.bincount(idx, weights=tem_servico, minlength=n).astype(int)
+
+        # Quilometragem inicial: menor entre a 1ª leitura do odômetro e o menor km de serviço
+        km_inicio = np.where(np.isnan(km_min_odo), np.inf, km_min_odo)
+        np.minimum.at(km_inicio, idx, np.where(np.isnan(km_servico), np.inf, km_servico))
+        rodado = np.where(np.isfinite(km_inicio), np.maximum(km_atual - km_inicio, 0), 0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            custo_milha = np.where(rodado > 0, manutencao / rodado, np.nan)
+
+        # Custo total de propriedade: manutenção menos o que voltou na venda
+        venda = np.where(ativo == 1, 0.0, np.nan_to_num(valor_venda))
+        tco = manutencao - venda
+
+        nomes = {}
+        for r in rows:
+            nomes.setdefault(r[0], r[10])
+        vehicles = [
+            {
+                "vehicle_id": int(vid),
+                "name": nomes[int(vid)],
+                "active": bool(ativo[i]),
+                "maintenance_total": round(float(manutencao[i]), 2),
+                "service_count": int(qtd_servicos[i]),
+                "miles_driven": int(rodado[i]),
+                "cost_per_mile": None if np.isnan(custo_milha[i]) else round(float(custo_milha[i]), 4),
+                "sale_value": round(float(venda[i]), 2),
+                "estimated_value": round(float(valor_estimado[i]), 2),
+                "tco": round(float(tco[i]), 2)
+            }
+            for i, vid in enumerate(veiculo_ids)
+        ]
+
+        # Categorias: normaliza só as descrições distintas e soma com bincount
+        descricoes = np.array([r[9] or "" for r, s in zip(rows, tem_servico) if s], dtype=object)
+        by_category = []
+        if len(descricoes):
+            distintas, inv = np.unique(descricoes, return_inverse=True)
+            categorias, cat_da_distinta = np.unique([normalize_category(d) for d in distintas], return_inverse=True)
+            cat_idx = cat_da_distinta[inv]
+            totais = np.bincount(cat_idx, weights=valor[tem_servico], minlength=len(categorias))
+            contagens = np.bincount(cat_idx, minlength=len(categorias))
+            ordem = np.argsort(-totais)
+            by_category = [
+                {"category": str(categorias[i]), "total": round(float(totais[i]), 2), "count": int(contagens[i])}
+                for i in ordem
+            ]
+
+        anos_validos = tem_servico & ~np.isnan(ano)
+        anos, ano_idx = np.unique(ano[anos_validos].astype(int), return_inverse=True)
+        por_ano = np.bincount(ano_idx, weights=valor[anos_validos], minlength=len(anos))
+
+        total_rodado = int(rodado.sum())
+        total_manutencao = float(manutencao.sum())
+        totals = {
+            "maintenance_total": round(total_manutencao, 2),
+            "miles_driven": total_rodado,
+            "cost_per_mile": round(total_manutencao / total_rodado, 4) if total_rodado else None,
+            "sale_proceeds": round(float(venda.sum()), 2),
+            "tco": round(float(tco.sum()), 2)
+        }
+        return {
+            "vehicles": vehicles,
+            "totals": totals,
+            "by_category": by_category,
+            "by_year": {"labels": anos.tolist(), "totals": np.round(por_ano, 2).tolist()}
+        }
@@ -0,0 +1,11 @@
+from apps.core.cache import TTLCache
+
+# Dashboard aggregates da garagem, por user_id
+garage_cache = TTLCache(maxsize=1024, ttl=300)
+
+# Relatórios de custo serializados, por (user_id, veiculo_id ou None = frota)
+cost_cache = TTLCache(maxsize=4096, ttl=300)
+
+def invalidate_garage(user_id: int) -> None:
+    garage_cache.delete(user_id)
+    cost_cache.delete_where(lambda key: key[0] == user_id)
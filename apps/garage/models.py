@@ -1,6 +1,6 @@
 from typing import Optional, List
 from sqlmodel import SQLModel, Field, Relationship
-from datetime import date
+from datetime import date, datetime
 
 # 1. Tabela de Veículos
 class Veiculo(SQLModel, table=True):
@@ -23,8 +23,8 @@ class Veiculo(SQLModel, table=True):
     valor_venda: Optional[float] = None
     # -----------------
 
-    user_id: Optional[int] = Field(foreign_key="user.id", default=None)
-    user: Optional["User"] = Relationship(back_populates="veiculos")
+    user_id: Optional[int] = Field(foreign_key="user.id", default=None, index=True)
+    user: Optional["User"] = Relationship() # User has no back-reference (module is optional)
 
     manutencoes: List["Manutencao"] = Relationship(back_populates="veiculo")
     alertas: List["Alerta"] = Relationship(back_populates="veiculo")
@@ -37,8 +37,9 @@ class Manutencao(SQLModel, table=True):
     descricao: str
     valor: float
     observacao: Optional[str] = None
+    comprovante: Optional[str] = None # Caminho da nota fiscal (upload)
     
-    veiculo_id: int = Field(foreign_key="veiculo.id")
+    veiculo_id: int = Field(foreign_key="veiculo.id", index=True)
     veiculo: Optional[Veiculo] = Relationship(back_populates="manutencoes")
 
 # 3. Tabela de Alertas
@@ -47,6 +48,23 @@ class Alerta(SQLModel, table=True):
     tipo: str  # Ex: "Oil Change"
     km_limite: int 
     ativo: bool = True 
+
+    # --- PROJEÇÃO (materializada por apps.garage.alerts.AlertEngine) ---
+    estado: Optional[str] = Field(default=None, index=True) # ok, due_soon, overdue
+    km_restante: Optional[int] = None
+    dias_restantes: Optional[int] = None
+    data_prevista: Optional[date] = None
+    avaliado_em: Optional[datetime] = None
     
     veiculo_id: int = Field(foreign_key="veiculo.id")
-    veiculo: Optional[Veiculo] = Relationship(back_populates="alertas")
\ No newline at end of file
+    veiculo: Optional[Veiculo] = Relationship(back_populates="alertas")
+# 4. Leituras do Odômetro (histórico de quilometragem)
+class LeituraOdometro(SQLModel, table=True):
+    # Uma linha por veículo/dia (km = maior leitura, km_min = menor); PK composta sem rowid = tabela compacta e já ordenada
+    __table_args__ = {"sqlite_with_rowid": False}
+
+    veiculo_id: int = Field(foreign_key="veiculo.id", primary_key=True)
+    data: date = Field(primary_key=True)
+    km: int
+    km_min: Optional[int] = None # Menor leitura do dia (início do histórico)
+    custo: float = Field(default=0.0) # Gasto de manutenção lançado nesse dia
@@ -0,0 +1,81 @@
+import math
+from datetime import date
+from typing import Optional
+
+import numpy as np
+from sqlmodel import Session, select
+from sqlalchemy import func
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from apps.garage.models import Veiculo, LeituraOdometro
+
+DIAS_POR_MES = 30.4375
+TAU_DIAS = 90.0 # Meia-vida ~62 dias: leituras antigas perdem peso gradualmente
+
+
+class OdometerService:
+    """
+    Histórico de quilometragem. Cada leitura atualiza media_km_mensal com uma
+    média exponencial ponderada pelo intervalo entre leituras, então nada
+    precisa ser recalculado sobre o histórico inteiro.
+    """
+
+    def __init__(self, session: Session):
+        self.session = session
+
+    def record_reading(self, vehicle: Veiculo, km: int, data: Optional[date] = None, custo: float = 0.0) -> None:
+        """Grava a leitura (o chamador faz o commit)."""
+        data = data or date.today()
+        ultima = self.session.exec(
+            select(LeituraOdometro)
+            .where(LeituraOdometro.veiculo_id == vehicle.id)
+            .order_by(LeituraOdometro.data.desc())
+            .limit(1)
+        ).first()
+
+        # Só leituras novas e crescentes alimentam a média (lançamentos retroativos entram só no histórico)
+        if ultima and data > ultima.data and km >= ultima.km:
+            dias = (data - ultima.data).days
+            taxa_mensal = (km - ultima.km) / dias * DIAS_POR_MES
+            alpha = 1 - math.exp(-dias / TAU_DIAS)
+            vehicle.media_km_mensal = round(alpha * taxa_mensal + (1 - alpha) * vehicle.media_km_mensal)
+            self.session.add(vehicle)
+
+        stmt = sqlite_insert(LeituraOdometro).values(veiculo_id=vehicle.id, data=data, km=km, km_min=km, custo=custo)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["veiculo_id", "data"],
+            set_={
+                "km": func.max(LeituraOdometro.km, stmt.excluded.km), # MAX()/MIN() escalares do SQLite
+                "km_min": func.min(func.coalesce(LeituraOdometro.km_min, LeituraOdometro.km), stmt.excluded.km),
+                "custo": LeituraOdometro.custo + stmt.excluded.custo
+            }
+        )
+        self.session.execute(stmt)
+
+    def get_series(self, vehicle: Veiculo) -> dict:
+        """Quilometragem e custo por milha acumulado, direto da tabela de leituras."""
+        rows = self.session.connection().execute(
+            select(LeituraOdometro.data, LeituraOdometro.km, LeituraOdometro.custo, LeituraOdometro.km_min)
+            .where(LeituraOdometro.veiculo_id == vehicle.id)
+            .order_by(LeituraOdometro.data)
+        ).all()
+        result = {"labels": [], "km": [], "cost_per_mile": [], "media_km_mensal": vehicle.media_km_mensal}
+        if not rows:
+            return result
+
+        km = np.fromiter((r[1] for r in rows), dtype=np.float64, count=len(rows))
+        custo = np.fromiter((r[2] for r in rows), dtype=np.float64, count=len(rows))
+        # Leituras retroativas podem estar abaixo de uma anterior: usa o máximo corrente
+        km = np.maximum.accumulate(km)
+        # Ponto de partida: a menor leitura do primeiro dia (não a maior, que já inclui o que rodou nele)
+        inicio = min(rows[0][3] if rows[0][3] is not None else rows[0][1], km[0])
+        rodado = km - inicio
+        gasto = np.cumsum(custo)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            cpm = np.where(rodado > 0, gasto / rodado, np.nan)
+
+        result["labels"] = [r[0].isoformat() for r in rows]
+        result["km"] = km.astype(int).tolist()
+        result["cost_per_mile"] = [None if math.isnan(v) else round(v, 3) for v in cpm]
+        return result
+
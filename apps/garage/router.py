@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, Request, Form, UploadFile, File
+from fastapi import APIRouter, Depends, Request, Form, UploadFile, File, HTTPException
 from fastapi.responses import RedirectResponse
 from fastapi.templating import Jinja2Templates
 from sqlmodel import Session
@@ -6,8 +6,12 @@ from database import get_session
 from datetime import date
 
 from apps.garage.services import GarageService
-from apps.auth.deps import get_current_user, require_user
+from apps.garage.analytics import VehicleCostAnalytics
+from apps.garage.cache import cost_cache
+from apps.core.responses import cached_json
+from apps.auth.deps import get_current_user, require_user, require_api_user
 from apps.auth.models import User
+from apps.auth.tokens import ApiPrincipal
 
 router = APIRouter(prefix="/garage", tags=["garage"])
 templates = Jinja2Templates(directory="templates")
@@ -88,6 +92,41 @@ def atualizar_odometro(
     service.update_odometer(user, veiculo_id, nova_km)
     return RedirectResponse(url="/garage", status_code=303)
 
+# Analytics de custo (frota e por veículo)
+@router.get("/api/costs")
+def custos_frota_api(
+    request: Request,
+    session: Session = Depends(get_session),
+    user: ApiPrincipal = Depends(require_api_user)
+):
+    return cached_json(request, cost_cache, (user.id, None), lambda: VehicleCostAnalytics(session).compute(user.id))
+
+@router.get("/api/{veiculo_id}/costs")
+def custos_veiculo_api(
+    veiculo_id: int,
+    request: Request,
+    session: Session = Depends(get_session),
+    user: ApiPrincipal = Depends(require_api_user)
+):
+    def build():
+        report = VehicleCostAnalytics(session).compute(user.id, veiculo_id)
+        if not report["vehicles"]:
+            raise HTTPException(status_code=404, detail="Vehicle not found")
+        return report
+    return cached_json(request, cost_cache, (user.id, veiculo_id), build)
+
+# Histórico do odômetro (gráficos de quilometragem e custo por milha)
+@router.get("/api/{veiculo_id}/odometer")
+def odometro_api(
+    veiculo_id: int,
+    service: GarageService = Depends(get_service),
+    user: ApiPrincipal = Depends(require_api_user)
+):
+    series = service.get_odometer_series(user, veiculo_id)
+    if series is None:
+        raise HTTPException(status_code=404, detail="Vehicle not found")
+    return series
+
 # 5. Rota de DETALHES
 @router.get("/{veiculo_id}")
 def detalhe_veiculo(
@@ -1,6 +1,7 @@
 from typing import List, Optional
 from sqlmodel import Session, select
 from sqlalchemy.orm import selectinload
+from sqlalchemy import func, case
 from fastapi import UploadFile
 import shutil
 import uuid
@@ -8,6 +9,10 @@ from pathlib import Path
 
 from apps.garage.models import Veiculo, Manutencao, Alerta
 from apps.auth.models import User
+from apps.portfolio.cache import invalidate_portfolio
+from apps.garage.cache import garage_cache, invalidate_garage
+from apps.garage.alerts import AlertEngine
+from apps.garage.odometer import OdometerService
 
 class GarageService:
     def __init__(self, session: Session):
@@ -31,33 +36,42 @@ class GarageService:
             
         self.session.add(vehicle)
         self.session.commit()
+        self._invalidate(user)
         return vehicle
 
     def get_dashboard_stats(self, user: User) -> dict:
-        vehicles = self.list_vehicles(user)
-        total_value = sum(v.valor_estimado for v in vehicles)
-        total_mileage = sum(v.km_atual for v in vehicles)
-        
-        # Calculate maintenance cost (This is a bit heavier, might want to optimize later)
-        maintenance_cost = 0
-        for v in vehicles:
-            # We need to load maintenances if not loaded.
-            # Ideally list_vehicles should selectinload maintenances too if we use them often.
-            # For now, let's do a separate efficient query for total cost
-            pass 
-        
-        # Optimized query for maintenance cost
-        stmt = select(Manutencao).join(Veiculo).where(Veiculo.user_id == user.id)
-        maintenances = self.session.exec(stmt).all()
-        maintenance_cost = sum(m.valor for m in maintenances)
+        return garage_cache.get_or_set(user.id, lambda: self._compute_dashboard_stats(user.id))
+
+    def _compute_dashboard_stats(self, user_id: int) -> dict:
+        # Uma única query agregada (índices em veiculo.user_id e manutencao.veiculo_id)
+        ativo = Veiculo.status == "active"
+        custo_manutencao = (
+            select(func.coalesce(func.sum(Manutencao.valor), 0.0))
+            .join(Veiculo)
+            .where(Veiculo.user_id == user_id)
+            .scalar_subquery()
+        )
+        stmt = select(
+            func.coalesce(func.sum(case((ativo, Veiculo.valor_estimado), else_=0.0)), 0.0),
+            func.coalesce(func.sum(case((ativo, Veiculo.km_atual), else_=0)), 0),
+            func.count(case((ativo, 1))),
+            custo_manutencao
+        ).where(Veiculo.user_id == user_id)
+        fleet_value, total_mileage, vehicle_count, maintenance_cost = self.session.exec(stmt).one()
 
         return {
-            "fleet_value": total_value,
-            "total_mileage": total_mileage,
-            "maintenance_cost": maintenance_cost,
-            "vehicle_count": len(vehicles)
+            "fleet_value": float(fleet_value),
+            "total_mileage": int(total_mileage),
+            "maintenance_cost": float(maintenance_cost),
+            "vehicle_count": vehicle_count
         }
 
+    def get_odometer_series(self, user: User, vehicle_id: int) -> Optional[dict]:
+        vehicle = self.get_vehicle(user, vehicle_id)
+        if not vehicle:
+            return None
+        return OdometerService(self.session).get_series(vehicle)
+
     def get_vehicle(self, user: User, vehicle_id: int) -> Optional[Veiculo]:
         vehicle = self.session.get(Veiculo, vehicle_id)
         if vehicle and vehicle.user_id == user.id:
@@ -79,7 +93,10 @@ class GarageService:
             km_atual=km_atual, valor_estimado=valor_estimado, foto=caminho_foto
         )
         self.session.add(novo_veiculo)
+        self.session.flush()
+        OdometerService(self.session).record_reading(novo_veiculo, km_atual)
         self.session.commit()
+        self._invalidate(user)
         return novo_veiculo
 
     def update_vehicle(
@@ -99,6 +116,8 @@ class GarageService:
         vehicle.modelo = modelo
         vehicle.ano = ano
         vehicle.placa = placa
+        if km_atual > vehicle.km_atual:
+            OdometerService(self.session).record_reading(vehicle, km_atual)
         vehicle.km_atual = km_atual
         vehicle.valor_estimado = valor_estimado
 
@@ -108,14 +127,20 @@ class GarageService:
 
         self.session.add(vehicle)
         self.session.commit()
+        AlertEngine(self.session).evaluate(vehicle_id=vehicle.id)
+        self._invalidate(user)
         return vehicle
 
     def update_odometer(self, user: User, vehicle_id: int, new_km: int) -> Optional[Veiculo]:
         vehicle = self.get_vehicle(user, vehicle_id)
         if vehicle and new_km > vehicle.km_atual:
+            OdometerService(self.session).record_reading(vehicle, new_km)
             vehicle.km_atual = new_km
             self.session.add(vehicle)
             self.session.commit()
+            # Reprojeta só os alertas deste veículo; a frota inteira roda no job agendado
+            AlertEngine(self.session).evaluate(vehicle_id=vehicle.id)
+            self._invalidate(user)
             return vehicle
         return None
 
@@ -134,13 +159,16 @@ class GarageService:
         if not vehicle:
             return None
 
-        caminho_final = self._handle_file_upload(arquivo_nf, "uploads", "nf_")
+        caminho_final = None
+        if arquivo_nf and arquivo_nf.filename:
+            caminho_final = self._handle_file_upload(arquivo_nf, "uploads", "nf_")
 
         novo_servico = Manutencao(
             veiculo_id=vehicle.id, descricao=descricao, data=data_obj,
             km_na_data=km_na_data, valor=valor, comprovante=caminho_final
         )
         self.session.add(novo_servico)
+        OdometerService(self.session).record_reading(vehicle, km_na_data, data_obj, custo=valor)
 
         # Update Odometer if service km is higher
         if km_na_data > vehicle.km_atual:
@@ -152,6 +180,8 @@ class GarageService:
             self._handle_alerts(vehicle.id, descricao, km_na_data, intervalo_miles)
 
         self.session.commit()
+        AlertEngine(self.session).evaluate(vehicle_id=vehicle.id)
+        self._invalidate(user)
         return novo_servico
 
     def _handle_alerts(self, vehicle_id: int, tipo: str, current_km: int, interval: int):
@@ -176,6 +206,10 @@ class GarageService:
         )
         self.session.add(novo_alerta)
 
+    def _invalidate(self, user: User):
+        invalidate_garage(user.id)
+        invalidate_portfolio(user.id)
+
     def _handle_photo_upload(self, file: Optional[UploadFile]) -> Optional[str]:
         if not file or not file.filename:
             return None
@@ -0,0 +1,145 @@
+from typing import List, Optional
+from datetime import datetime
+from sqlmodel import Session, select, delete
+from sqlalchemy import func, insert, literal
+
+from apps.humidor.models import Cigar, SmokingSession, CommunityCigarStats
+from apps.core.cache import TTLCache
+
+# Bayesian average: every cigar starts with PRIOR_SESSIONS imaginary sessions
+# at the community mean, so a single 100-point session can't top the board.
+PRIOR_SESSIONS = 5
+GROUPINGS = ("origin", "wrapper", "strength")
+
+leaderboard_cache = TTLCache(maxsize=64, ttl=60)
+
+
+class LeaderboardService:
+    def __init__(self, session: Session):
+        self.session = session
+
+    # --- MAINTENANCE ---
+
+    def record_session(self, cigar: Cigar, rating_overall: int) -> CommunityCigarStats:
+        """Adds one session to the catalog entry's aggregate (caller commits)."""
+        vitola = cigar.vitola or ""
+        stats = self.session.exec(
+            select(CommunityCigarStats).where(
+                CommunityCigarStats.brand == cigar.brand,
+                CommunityCigarStats.line == cigar.line,
+                CommunityCigarStats.vitola == vitola
+            )
+        ).first()
+        if not stats:
+            stats = CommunityCigarStats(brand=cigar.brand, line=cigar.line, vitola=vitola)
+
+        # Latest known attributes win
+        stats.origin = cigar.origin or stats.origin
+        stats.wrapper = cigar.wrapper or stats.wrapper
+        stats.strength = cigar.strength or stats.strength
+        stats.session_count += 1
+        stats.rating_sum += rating_overall or 0
+        stats.updated_at = datetime.utcnow()
+
+        self.session.add(stats)
+        return stats
+
+    def rebuild_entry(self, brand: str, line: str, vitola: Optional[str]) -> None:
+        """Recomputes one catalog entry from its sessions, e.g. after a cigar was renamed (caller commits)."""
+        vitola = vitola or ""
+        count, rating_sum, origin, wrapper, strength = self.session.exec(
+            select(
+                func.count(SmokingSession.id), func.sum(SmokingSession.rating_overall),
+                func.max(Cigar.origin), func.max(Cigar.wrapper), func.max(Cigar.strength)
+            ).select_from(Cigar).join(SmokingSession)
+            .where(Cigar.brand == brand, Cigar.line == line, func.coalesce(Cigar.vitola, "") == vitola)
+        ).one()
+        stats = self.session.exec(
+            select(CommunityCigarStats).where(
+                CommunityCigarStats.brand == brand,
+                CommunityCigarStats.line == line,
+                CommunityCigarStats.vitola == vitola
+            )
+        ).first()
+        if not count:
+            if stats:
+                self.session.delete(stats)
+            return
+        stats = stats or CommunityCigarStats(brand=brand, line=line, vitola=vitola)
+        stats.origin, stats.wrapper, stats.strength = origin, wrapper, strength
+        stats.session_count = count
+        stats.rating_sum = rating_sum or 0
+        stats.updated_at = datetime.utcnow()
+        self.session.add(stats)
+
+    def refresh(self) -> int:
+        """
+        Full rebuild from every user's sessions (the only cross-user join).
+        Meant for a scheduled job / backfill: scripts/refresh_leaderboards.py
+        """
+        vitola = func.coalesce(Cigar.vitola, "")
+        aggregated = select(
+            Cigar.brand, Cigar.line, vitola,
+            func.max(Cigar.origin), func.max(Cigar.wrapper), func.max(Cigar.strength),
+            func.count(SmokingSession.id), func.sum(SmokingSession.rating_overall),
+            literal(datetime.utcnow())
+        ).join(SmokingSession).group_by(Cigar.brand, Cigar.line, vitola)
+
+        self.session.exec(delete(CommunityCigarStats))
+        result = self.session.exec(insert(CommunityCigarStats).from_select(
+            ["brand", "line", "vitola", "origin", "wrapper", "strength", "session_count", "rating_sum", "updated_at"],
+            aggregated
+        ))
+        self.session.commit()
+        leaderboard_cache.clear()
+        return result.rowcount
+
+    # --- QUERIES ---
+
+    def get_leaderboard(self, by: Optional[str] = None, limit: int = 10, min_sessions: int = 1) -> List[dict]:
+        """Top cigars by Bayesian average, overall or top `limit` per origin/wrapper/strength."""
+        if by is not None and by not in GROUPINGS:
+            raise ValueError(f"Invalid grouping: {by}")
+        return leaderboard_cache.get_or_set(
+            (by, limit, min_sessions),
+            lambda: self._compute_leaderboard(by, limit, min_sessions)
+        )
+
+    def _compute_leaderboard(self, by: Optional[str], limit: int, min_sessions: int) -> List[dict]:
+        total_sessions, total_rating = self.session.exec(
+            select(func.sum(CommunityCigarStats.session_count), func.sum(CommunityCigarStats.rating_sum))
+        ).one()
+        if not total_sessions:
+            return []
+        mean = total_rating / total_sessions
+
+        score = (PRIOR_SESSIONS * mean + CommunityCigarStats.rating_sum) / (PRIOR_SESSIONS + CommunityCigarStats.session_count)
+        group = getattr(CommunityCigarStats, by) if by else literal(None)
+        rank = func.row_number().over(
+            partition_by=group if by else None,
+            order_by=(score.desc(), CommunityCigarStats.session_count.desc())
+        )
+
+        ranked = select(
+            CommunityCigarStats.brand, CommunityCigarStats.line, CommunityCigarStats.vitola,
+            CommunityCigarStats.origin, CommunityCigarStats.wrapper, CommunityCigarStats.strength,
+            CommunityCigarStats.session_count, CommunityCigarStats.rating_sum,
+            score.label("score"), group.label("grp"), rank.label("rank")
+        ).where(CommunityCigarStats.session_count >= min_sessions)
+        if by:
+            ranked = ranked.where(group.is_not(None))
+        ranked = ranked.subquery()
+
+        stmt = select(*ranked.c).where(ranked.c.rank <= limit).order_by(ranked.c.grp, ranked.c.rank)
+        return [
+            {
+                "brand": r.brand, "line": r.line, "vitola": r.vitola or None,
+                "origin": r.origin, "wrapper": r.wrapper, "strength": r.strength,
+                "group": r.grp,
+                "rank": r.rank,
+                "sessions": r.session_count,
+                "avg_rating": round(r.rating_sum / r.session_count, 1),
+                "score": round(r.score, 1)
+            }
+            for r in self.session.exec(stmt).all()
+        ]
@@ -1,6 +1,7 @@
 from typing import Optional, List
 from sqlmodel import SQLModel, Field, Relationship
-from datetime import date
+from sqlalchemy import UniqueConstraint
+from datetime import date, datetime
 
 # --- Image Tables ---
 class CigarImage(SQLModel, table=True):
@@ -78,4 +79,23 @@ class SmokingSession(SQLModel, table=True):
     cigar_id: int = Field(foreign_key="cigar.id")
     cigar: Optional[Cigar] = Relationship(back_populates="sessions")
     
-    images: List["SessionImage"] = Relationship(back_populates="session")
\ No newline at end of file
+    images: List["SessionImage"] = Relationship(back_populates="session")
+
+# --- Community Aggregates ---
+# One row per catalog entry (Brand/Line/Vitola), summed over every user's sessions.
+# Maintained incrementally on each session so leaderboards never join across users.
+class CommunityCigarStats(SQLModel, table=True):
+    __table_args__ = (UniqueConstraint("brand", "line", "vitola"),)
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    brand: str = Field(index=True)
+    line: str
+    vitola: str = Field(default="") # "" when the cigars have no vitola
+    
+    origin: Optional[str] = Field(default=None, index=True)
+    wrapper: Optional[str] = Field(default=None, index=True)
+    strength: Optional[str] = Field(default=None, index=True)
+    
+    session_count: int = Field(default=0)
+    rating_sum: int = Field(default=0) # Sum of rating_overall
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
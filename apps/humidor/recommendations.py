@@ -0,0 +1,294 @@
+import threading
+import time
+import warnings
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from sqlmodel import Session, select
+from sqlalchemy import func
+
+from apps.humidor.models import Cigar, SmokingSession
+
+CatalogKey = Tuple[str, str, str]
+
+# One-hot attribute weights (how much a shared value pulls two cigars together)
+CATEGORICAL_WEIGHTS = {
+    "wrapper": 1.0,
+    "wrapper_color": 1.0,
+    "origin": 1.0,
+    "format": 0.75,
+    "binder": 0.5,
+    "filler": 0.5,
+}
+STRENGTH_LEVELS = {"mild": 0, "mild-medium": 1, "medium": 2, "medium-full": 3, "full": 4}
+STRENGTH_WEIGHT = 1.0
+# Numeric features are centered on a typical cigar and scaled so 1.0 ~ a noticeable difference
+LENGTH_CENTER, LENGTH_SCALE = 5.75, 1.0
+RING_CENTER, RING_SCALE = 50.0, 6.0
+NUMERIC_WEIGHT = 0.5
+
+NEIGHBOURS_K = 20 # Stored per item; queries return fewer so removed items can be skipped
+REBUILD_SECONDS = 60 * 60 # Full rebuild picks up writes made by other workers
+
+
+def catalog_key(brand: str, line: str, vitola: Optional[str]) -> CatalogKey:
+    """Community catalog identity, same grouping as the Lounge (Brand/Line/Vitola)."""
+    return (brand, line, vitola or "")
+
+
+class CatalogIndex:
+    """
+    Feature matrix over the community catalog plus a precomputed top-k
+    nearest-neighbour table (cosine similarity). "Similar cigars" is a lookup
+    in that table; "you might like" is a single matrix-vector product against
+    the user's taste profile. Writes update single rows incrementally.
+    """
+
+    def __init__(self, k: int = NEIGHBOURS_K):
+        self.k = k
+        self._lock = threading.RLock()
+        self.built_at: Optional[float] = None
+        self._reset()
+
+    def _reset(self):
+        self.keys: List[CatalogKey] = []
+        self.items: List[dict] = []
+        self.positions: Dict[CatalogKey, int] = {}
+        self.vocab: Dict[Tuple[str, str], int] = {}
+        self.X = np.zeros((0, 3), dtype=np.float32) # cols 0-2: strength, length, ring
+        self.alive = np.zeros(0, dtype=bool)
+        self.neighbours = np.zeros((0, self.k), dtype=np.int32)
+        self.scores = np.zeros((0, self.k), dtype=np.float32)
+
+    # --- FEATURES ---
+
+    def _column(self, field: str, value: str) -> int:
+        col = self.vocab.get((field, value))
+        if col is None:
+            col = self.X.shape[1]
+            self.vocab[(field, value)] = col
+            self.X = np.pad(self.X, ((0, 0), (0, 1)))
+        return col
+
+    def _vectorize(self, item: dict) -> np.ndarray:
+        cols, vals = [], []
+        for field, weight in CATEGORICAL_WEIGHTS.items():
+            value = item.get(field)
+            if value:
+                cols.append(self._column(field, value.strip().lower()))
+                vals.append(weight)
+
+        vec = np.zeros(self.X.shape[1], dtype=np.float32)
+        vec[cols] = vals
+        level = STRENGTH_LEVELS.get((item.get("strength") or "").strip().lower())
+        vec[0] = STRENGTH_WEIGHT * ((level - 2) / 2.0) if level is not None else 0.0
+        if item.get("length_in"):
+            vec[1] = NUMERIC_WEIGHT * (item["length_in"] - LENGTH_CENTER) / LENGTH_SCALE
+        if item.get("ring_gauge"):
+            vec[2] = NUMERIC_WEIGHT * (item["ring_gauge"] - RING_CENTER) / RING_SCALE
+
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm else vec
+
+    # --- CATALOG QUERIES ---
+
+    @staticmethod
+    def _catalog_stmt():
+        return select(
+            Cigar.brand, Cigar.line, Cigar.vitola,
+            func.max(Cigar.wrapper), func.max(Cigar.wrapper_color), func.max(Cigar.binder),
+            func.max(Cigar.filler), func.max(Cigar.origin), func.max(Cigar.strength),
+            func.max(Cigar.format), func.avg(Cigar.length_in), func.avg(Cigar.ring_gauge),
+            func.count(Cigar.id)
+        ).group_by(Cigar.brand, Cigar.line, Cigar.vitola)
+
+    @staticmethod
+    def _row_to_item(r) -> dict:
+        return {
+            "brand": r[0], "line": r[1], "vitola": r[2],
+            "wrapper": r[3], "wrapper_color": r[4], "binder": r[5], "filler": r[6],
+            "origin": r[7], "strength": r[8], "format": r[9],
+            "length_in": round(r[10], 1) if r[10] else None,
+            "ring_gauge": int(r[11]) if r[11] else None,
+            "popularity": r[12]
+        }
+
+    # --- BUILD / INCREMENTAL REFRESH ---
+
+    def build(self, session: Session) -> None:
+        rows = session.exec(self._catalog_stmt()).all()
+        with self._lock:
+            self._reset()
+            for r in rows:
+                item = self._row_to_item(r)
+                key = catalog_key(item["brand"], item["line"], item["vitola"])
+                self.positions[key] = len(self.keys)
+                self.keys.append(key)
+                self.items.append(item)
+                # Grow the vocabulary first so every vector has the final width
+                self._vectorize(item)
+            self.X = np.vstack([self._vectorize(item) for item in self.items]) if self.items else self.X
+            self.alive = np.ones(len(self.keys), dtype=bool)
+            self._compute_all_neighbours()
+            self.built_at = time.monotonic()
+
+    def _compute_all_neighbours(self, block: int = 1024) -> None:
+        n = len(self.keys)
+        self.neighbours = np.full((n, self.k), -1, dtype=np.int32)
+        self.scores = np.full((n, self.k), -np.inf, dtype=np.float32)
+        for start in range(0, n, block):
+            sims = self.X[start:start + block] @ self.X.T
+            rows = np.arange(sims.shape[0])
+            sims[rows, rows + start] = -np.inf # never your own neighbour
+            self._store_top_k(start, sims)
+
+    def _store_top_k(self, start: int, sims: np.ndarray) -> None:
+        k = min(self.k, sims.shape[1])
+        if k == 0:
+            return
+        top = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(sims, top, axis=1)
+        order = np.argsort(-top_scores, axis=1)
+        end = start + sims.shape[0]
+        self.neighbours[start:end, :k] = np.take_along_axis(top, order, axis=1)
+        self.scores[start:end, :k] = np.take_along_axis(top_scores, order, axis=1)
+
+    def refresh_item(self, session: Session, brand: str, line: str, vitola: Optional[str]) -> None:
+        """Re-aggregates one catalog entry after a write and patches the index in O(n·d)."""
+        if self.built_at is None:
+            return # Not built yet in this worker; the first query builds it from scratch
+        key = catalog_key(brand, line, vitola)
+        stmt = self._catalog_stmt().where(Cigar.brand == brand, Cigar.line == line)
+        rows = [r for r in session.exec(stmt).all() if catalog_key(r[0], r[1], r[2]) == key]
+
+        with self._lock:
+            pos = self.positions.get(key)
+            if not rows:
+                if pos is not None:
+                    self.alive[pos] = False
+                return
+
+            item = self._row_to_item(rows[0])
+            vec = self._vectorize(item)
+            if pos is None:
+                pos = len(self.keys)
+                self.positions[key] = pos
+                self.keys.append(key)
+                self.items.append(item)
+                self.X = np.vstack([self.X, vec[None, :]])
+                self.alive = np.append(self.alive, True)
+                self.neighbours = np.vstack([self.neighbours, np.full((1, self.k), -1, dtype=np.int32)])
+                self.scores = np.vstack([self.scores, np.full((1, self.k), -np.inf, dtype=np.float32)])
+            else:
+                self.items[pos] = item
+                self.X[pos] = vec
+                self.alive[pos] = True
+
+            sims = self.X @ vec
+            sims[pos] = -np.inf
+            self._store_top_k(pos, sims[None, :])
+
+            # Rows that listed this item, or that now rank it above their k-th neighbour,
+            # get their (single) row recomputed.
+            affected = np.flatnonzero((self.neighbours == pos).any(axis=1) | (sims > self.scores[:, -1]))
+            for row in affected:
+                row_sims = self.X @ self.X[row]
+                row_sims[row] = -np.inf
+                self._store_top_k(int(row), row_sims[None, :])
+
+    def ensure_fresh(self, session: Session) -> "CatalogIndex":
+        if self.built_at is None or time.monotonic() - self.built_at > REBUILD_SECONDS:
+            self.build(session)
+        return self
+
+    # --- QUERIES ---
+
+    def similar(self, key: CatalogKey, limit: int = 6) -> List[dict]:
+        with self._lock:
+            pos = self.positions.get(key)
+            if pos is None:
+                return []
+            results = []
+            for neighbour, score in zip(self.neighbours[pos], self.scores[pos]):
+                if neighbour < 0 or not np.isfinite(score) or score <= 0 or not self.alive[neighbour]:
+                    continue
+                results.append({**self.items[neighbour], "score": round(float(score), 3)})
+                if len(results) == limit:
+                    break
+            return results
+
+    def recommend(self, weights: Dict[CatalogKey, float], exclude: set, limit: int = 6) -> List[dict]:
+        """Ranks the catalog against a taste profile built from rated catalog entries."""
+        with self._lock:
+            rows = [self.positions[k] for k in weights if k in self.positions]
+            if not rows:
+                return []
+            w = np.array([weights[self.keys[r]] for r in rows], dtype=np.float32)
+            profile = w @ self.X[rows]
+            if not profile.any():
+                return []
+
+            scores = self.X @ profile
+            mask = ~self.alive.copy()
+            mask[[self.positions[k] for k in exclude if k in self.positions]] = True
+            scores[mask] = -np.inf
+
+            k = min(limit, int((~mask).sum()))
+            if k == 0:
+                return []
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            return [{**self.items[i], "score": round(float(scores[i]), 3)} for i in top if scores[i] > 0]
+
+
+# One index per worker process
+catalog_index = CatalogIndex()
+
+
+class RecommendationService:
+    def __init__(self, session: Session):
+        self.session = session
+
+    def similar_to(self, cigar: Cigar, limit: int = 6) -> List[dict]:
+        index = catalog_index.ensure_fresh(self.session)
+        return index.similar(catalog_key(cigar.brand, cigar.line, cigar.vitola), limit)
+
+    def you_might_like(self, user_id: int, limit: int = 6) -> List[dict]:
+        """
+        Taste profile = catalog entries the user smoked, weighted by how each
+        session scored relative to the user's own average (z-score across
+        rating_overall/construction/draw/flavor, so the scales don't matter).
+        """
+        index = catalog_index.ensure_fresh(self.session)
+
+        owned = self.session.exec(
+            select(Cigar.brand, Cigar.line, Cigar.vitola).where(Cigar.user_id == user_id).distinct()
+        ).all()
+        exclude = {catalog_key(*r) for r in owned}
+
+        stmt = select(
+            Cigar.brand, Cigar.line, Cigar.vitola,
+            SmokingSession.rating_overall, SmokingSession.rating_construction,
+            SmokingSession.rating_draw, SmokingSession.rating_flavor
+        ).join(SmokingSession).where(Cigar.user_id == user_id)
+        rows = self.session.connection().execute(stmt).all()
+
+        weights: Dict[CatalogKey, float] = {}
+        if rows:
+            ratings = np.array([r[3:] for r in rows], dtype=float)
+            with warnings.catch_warnings():
+                # Columns/sessions with no ratings at all are all-NaN; they just drop out
+                warnings.simplefilter("ignore", category=RuntimeWarning)
+                std = np.nanstd(ratings, axis=0)
+                z = (ratings - np.nanmean(ratings, axis=0)) / np.where(std > 0, std, np.nan)
+                session_weights = np.nan_to_num(np.nanmean(z, axis=1), nan=0.0)
+            for r, w in zip(rows, session_weights):
+                key = catalog_key(r[0], r[1], r[2])
+                weights[key] = weights.get(key, 0.0) + float(w)
+            # No spread in the ratings at all: everything smoked counts as liked
+            if not any(weights.values()):
+                weights = {k: 1.0 for k in weights}
+        else:
+            # Nothing smoked yet: fall back to what is in the humidor
+            weights = {k: 1.0 for k in exclude}
+
+        return index.recommend(weights, exclude, limit)
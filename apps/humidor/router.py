@@ -1,5 +1,5 @@
 from typing import List
-from fastapi import APIRouter, Depends, Request, Form, UploadFile, File
+from fastapi import APIRouter, Depends, Request, Form, UploadFile, File, HTTPException, Query, status
 from fastapi.responses import RedirectResponse
 from fastapi.templating import Jinja2Templates
 from sqlmodel import Session
@@ -7,8 +7,12 @@ from database import get_session
 from datetime import date
 
 from apps.humidor.services import HumidorService
-from apps.auth.deps import get_current_user, require_user
+from apps.humidor.recommendations import RecommendationService
+from apps.humidor.leaderboards import LeaderboardService, GROUPINGS
+from apps.analytics.sketches import RatingSketchService
+from apps.auth.deps import get_current_user, require_user, require_api_user
 from apps.auth.models import User
+from apps.auth.tokens import ApiPrincipal
 
 router = APIRouter(prefix="/humidor", tags=["humidor"])
 templates = Jinja2Templates(directory="templates")
@@ -49,6 +53,67 @@ def community_library(
         "user": user
     })
 
+@router.get("/community/leaderboards")
+def community_leaderboards(
+    request: Request,
+    by: str = None,
+    session: Session = Depends(get_session),
+    user: User = Depends(get_current_user)
+):
+    if not user: return RedirectResponse("/auth/login")
+    if by not in GROUPINGS:
+        by = None
+
+    entries = LeaderboardService(session).get_leaderboard(by=by, limit=10 if by is None else 5)
+    
+    # Group for the template (insertion order = alphabetical groups from the query)
+    boards = {}
+    for entry in entries:
+        boards.setdefault(entry["group"] or "Overall", []).append(entry)
+    
+    return templates.TemplateResponse("humidor/leaderboards.html", {
+        "request": request,
+        "boards": boards,
+        "by": by,
+        "groupings": GROUPINGS,
+        "user": user
+    })
+
+# --- RECOMMENDATIONS (JSON) ---
+@router.get("/api/recommendations")
+def recommendations(
+    limit: int = Query(default=6, ge=1, le=50),
+    session: Session = Depends(get_session),
+    user: ApiPrincipal = Depends(require_api_user)
+):
+    return RecommendationService(session).you_might_like(user.id, limit=limit)
+
+@router.get("/api/{cigar_id}/similar")
+def similar_cigars(
+    cigar_id: int,
+    limit: int = Query(default=6, ge=1, le=50),
+    session: Session = Depends(get_session),
+    service: HumidorService = Depends(get_service),
+    user: ApiPrincipal = Depends(require_api_user)
+):
+    cigar = service.get_cigar(user, cigar_id)
+    if not cigar:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Cigar not found")
+    return RecommendationService(session).similar_to(cigar, limit=limit)
+
+@router.get("/api/{cigar_id}/ratings")
+def cigar_rating_distribution(
+    cigar_id: int,
+    session: Session = Depends(get_session),
+    service: HumidorService = Depends(get_service),
+    user: ApiPrincipal = Depends(require_api_user)
+):
+    # Community-wide distribution for this catalog entry (Brand/Line/Vitola)
+    cigar = service.get_cigar(user, cigar_id)
+    if not cigar:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Cigar not found")
+    return RatingSketchService(session).get_cigar_distribution(cigar)
+
 @router.post("/community/add")
 def add_from_community(
     brand: str = Form(...),
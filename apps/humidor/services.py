@@ -8,6 +8,12 @@ from datetime import date
 
 from apps.humidor.models import Cigar, SmokingSession, CigarImage, SessionImage
 from apps.auth.models import User
+from apps.analytics.rollups import RollupService
+from apps.analytics.sketches import RatingSketchService
+from apps.analytics.cache import invalidate_user_charts
+from apps.portfolio.cache import invalidate_portfolio
+from apps.humidor.recommendations import catalog_index
+from apps.humidor.leaderboards import LeaderboardService
 
 class HumidorService:
     def __init__(self, session: Session):
@@ -129,6 +135,9 @@ class HumidorService:
                     img_type = "main" if i == 0 else "gallery" 
                     self.add_cigar_image(new_cigar.id, url, img_type)
         
+        invalidate_user_charts(user.id)
+        invalidate_portfolio(user.id)
+        catalog_index.refresh_item(self.session, brand, line, vitola)
         self.session.refresh(new_cigar)
         return new_cigar
 
@@ -153,6 +162,7 @@ class HumidorService:
         if not cigar:
             return None
 
+        old_key = (cigar.brand, cigar.line, cigar.vitola)
         cigar.brand = brand
         cigar.line = line
         cigar.vitola = vitola
@@ -169,6 +179,13 @@ class HumidorService:
         cigar.ring_gauge = ring_gauge
 
         self.session.add(cigar)
+        new_key = (brand, line, vitola)
+        if old_key != new_key:
+            # The cigar's sessions now count under the new catalog entry: recompute both, same transaction
+            leaderboards, sketches = LeaderboardService(self.session), RatingSketchService(self.session)
+            for key in (old_key, new_key):
+                leaderboards.rebuild_entry(*key)
+                sketches.rebuild_catalog_entry(*key)
         self.session.commit()
         
         if photos:
@@ -177,6 +194,11 @@ class HumidorService:
                     url = self._handle_file_upload(photo, "uploads/cigars", f"cigar_{cigar.id}_")
                     self.add_cigar_image(cigar.id, url, "gallery")
 
+        invalidate_user_charts(user.id)
+        invalidate_portfolio(user.id)
+        catalog_index.refresh_item(self.session, brand, line, vitola)
+        if old_key != new_key:
+            catalog_index.refresh_item(self.session, *old_key)
         self.session.refresh(cigar)
         return cigar
 
@@ -230,13 +252,21 @@ class HumidorService:
                     url = self._handle_file_upload(photo, "uploads/sessions", f"session_{session.id}_")
                     self.add_session_image(session.id, url)
         
+        # Update Daily Rollups (time-series analytics)
+        RollupService(self.session).record_session(user.id, session, cigar.price_paid or 0.0)
+        # Community aggregates (leaderboards) & rating distributions
+        LeaderboardService(self.session).record_session(cigar, rating_overall)
+        RatingSketchService(self.session).record_session(user.id, cigar, session)
+
         # Decrement Quantity
         if cigar.quantity > 0:
             cigar.quantity -= 1
             if cigar.quantity == 0:
                 cigar.status = "empty"
             self.session.add(cigar)
-            self.session.commit()
+        self.session.commit()
+        invalidate_user_charts(user.id)
+        invalidate_portfolio(user.id)
 
         return session
 
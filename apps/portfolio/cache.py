@@ -0,0 +1,7 @@
+from apps.core.cache import TTLCache
+
+# Serialized portfolio payloads, keyed by user_id
+portfolio_cache = TTLCache(maxsize=1024, ttl=120)
+
+def invalidate_portfolio(user_id: int) -> None:
+    portfolio_cache.delete(user_id)
@@ -0,0 +1,22 @@
+from fastapi import APIRouter, Depends, Request
+from sqlmodel import Session
+from database import get_session
+from apps.auth.deps import require_api_user
+from apps.auth.tokens import ApiPrincipal
+from apps.core.responses import cached_json
+from apps.portfolio.services import PortfolioService
+from apps.portfolio.cache import portfolio_cache
+
+router = APIRouter(prefix="/portfolio", tags=["portfolio"])
+
+def get_service(session: Session = Depends(get_session)) -> PortfolioService:
+    return PortfolioService(session)
+
+@router.get("/api/summary")
+def portfolio_summary(
+    request: Request,
+    service: PortfolioService = Depends(get_service),
+    user: ApiPrincipal = Depends(require_api_user)
+):
+    """Collection value, spend and disposal proceeds across humidor, garage and armory"""
+    return cached_json(request, portfolio_cache, user.id, lambda: service.get_portfolio(user.id))
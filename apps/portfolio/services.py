@@ -0,0 +1,76 @@
+from sqlmodel import Session, select
+from sqlalchemy import func
+
+from apps.humidor.models import Cigar
+from apps.analytics.models import DailySessionRollup
+from apps.core.modules import registry
+
+
+class PortfolioService:
+    def __init__(self, session: Session):
+        self.session = session
+
+    def get_portfolio(self, user_id: int) -> dict:
+        """
+        Net-worth view across humidor and, when enabled, garage and armory.
+        Every figure is a scalar subquery of a single SELECT: one round trip,
+        no rows loaded into Python.
+        """
+        def total(expr, *where, join=None):
+            stmt = select(func.coalesce(func.sum(expr), 0.0))
+            if join is not None:
+                stmt = stmt.join(join)
+            return stmt.where(*where).scalar_subquery()
+
+        figures = {}
+        modules = {}
+        # Humidor: what is held + what was smoked (spend from the daily rollups)
+        cigar_value = func.coalesce(Cigar.price_paid, 0.0) * Cigar.quantity
+        figures["humidor_value"] = total(cigar_value, Cigar.user_id == user_id)
+        figures["humidor_consumed"] = total(DailySessionRollup.spend, DailySessionRollup.user_id == user_id)
+
+        # Disabled apps are left out entirely (their models are never imported)
+        if registry.is_enabled("garage"):
+            from apps.garage.models import Veiculo, Manutencao
+            # Garage: estimated value of the active fleet, maintenance spend, sale proceeds
+            figures["garage_value"] = total(Veiculo.valor_estimado, Veiculo.user_id == user_id, Veiculo.status == "active")
+            figures["garage_spend"] = total(Manutencao.valor, Veiculo.user_id == user_id, join=Veiculo)
+            figures["garage_proceeds"] = total(Veiculo.valor_venda, Veiculo.user_id == user_id, Veiculo.status != "active")
+        if registry.is_enabled("armory"):
+            from apps.armory.models import Gun, Accessory
+            active_gun = Gun.status == "active"
+            # Armory: guns + accessories (all ever bought = spend, active ones = value), sale proceeds
+            figures["armory_guns_value"] = total(Gun.base_price, Gun.user_id == user_id, active_gun)
+            figures["armory_accessories_value"] = total(Accessory.cost, Gun.user_id == user_id, active_gun, join=Gun)
+            figures["armory_guns_spend"] = total(Gun.base_price, Gun.user_id == user_id)
+            figures["armory_accessories_spend"] = total(Accessory.cost, Gun.user_id == user_id, join=Gun)
+            figures["armory_proceeds"] = total(Gun.sale_price, Gun.user_id == user_id, Gun.status != "active")
+
+        row = self.session.exec(select(*[expr.label(name) for name, expr in figures.items()])).one()
+        f = {name: float(getattr(row, name) or 0.0) for name in figures}
+
+        modules["humidor"] = {
+            "value": f["humidor_value"],
+            "spend": f["humidor_value"] + f["humidor_consumed"],
+            "proceeds": 0.0
+        }
+        if "garage_value" in f:
+            modules["garage"] = {
+                "value": f["garage_value"],
+                "spend": f["garage_spend"],
+                "proceeds": f["garage_proceeds"]
+            }
+        if "armory_guns_value" in f:
+            modules["armory"] = {
+                "value": f["armory_guns_value"] + f["armory_accessories_value"],
+                "spend": f["armory_guns_spend"] + f["armory_accessories_spend"],
+                "proceeds": f["armory_proceeds"]
+            }
+        totals = {key: sum(m[key] for m in modules.values()) for key in ("value", "spend", "proceeds")}
+        totals["net"] = totals["value"] + totals["proceeds"] - totals["spend"]
+
+        round2 = lambda d: {k: round(v, 2) for k, v in d.items()}
+        return {
+            "modules": {name: round2(m) for name, m in modules.items()},
+            "totals": round2(totals)
+        }
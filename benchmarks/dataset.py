@@ -0,0 +1,168 @@
+"""
+Seeded, reproducible humidor datasets for the load tests.
+
+Same arguments, same rows: users, cigars and smoking sessions are drawn from
+a fixed random seed, with a skewed activity curve (a few heavy smokers, a long
+tail of occasional ones) and catalog entries shared across users so the
+community pages have something to aggregate. Rollups, rating sketches and
+leaderboards are rebuilt afterwards, as scripts/backfill_rollups.py would.
+
+Ids are assigned in order, so user N owns cigars (N-1)*cigars+1 .. N*cigars;
+the load drivers rely on that instead of reading the database back.
+
+    python -m benchmarks.dataset --db tib_bench.db
+    python -m benchmarks.dataset --db tib_bench.db --users 200 --cigars 60 --sessions 6
+"""
+import argparse
+import os
+import random
+from datetime import date, datetime, timedelta
+from typing import NamedTuple
+
+# brand, line, vitola, origin, wrapper, wrapper_color, format, length_in, ring_gauge
+CATALOG = [
+    ("Cohiba", "Behike 52", "Laguito No. 4", "Cuba", "Cuban", "Colorado", "Parejo With Pigtail", 4.7, 52),
+    ("Montecristo", "No. 2", "Pirámides", "Cuba", "Cuban", "Colorado Claro", "Torpedo", 6.1, 52),
+    ("Arturo Fuente", "Opus X", "Robusto", "Dominican Republic", "Dominican Sun Grown", "Colorado", "Parejo", 5.2, 50),
+    ("Padron", "1964 Anniversary", "Exclusivo", "Nicaragua", "Nicaraguan", "Maduro", "Box Pressed", 5.5, 50),
+    ("Davidoff", "Winston Churchill", "The Late Hour", "Dominican Republic", "Ecuadorian Habano", "Oscuro", "Churchill", 7.0, 48),
+    ("Partagas", "Serie D No. 4", "Robusto", "Cuba", "Cuban", "Colorado Red", "Parejo", 4.9, 50),
+    ("Romeo y Julieta", "Churchill", "Julieta No. 2", "Cuba", "Cuban", "Claro", "Churchill", 7.0, 47),
+    ("Hoyo de Monterrey", "Epicure No. 2", "Robusto", "Cuba", "Cuban", "Claro", "Parejo", 4.9, 50),
+    ("Oliva", "Serie V Melanio", "Figurado", "Nicaragua", "Ecuadorian Sumatra", "Colorado", "Figurado", 6.5, 52),
+    ("Liga Privada", "No. 9", "Toro", "Nicaragua", "Connecticut Broadleaf", "Oscuro", "Parejo", 6.0, 52),
+    ("My Father", "Le Bijou 1922", "Torpedo", "Nicaragua", "Nicaraguan Habano", "Oscuro", "Torpedo", 6.1, 52),
+    ("Bolivar", "Belicosos Finos", "Campana", "Cuba", "Cuban", "Colorado", "Belicoso", 5.5, 52),
+    ("Alec Bradley", "Prensado", "Churchill", "Honduras", "Trojes", "Colorado Maduro", "Box Pressed", 7.0, 48),
+    ("Rocky Patel", "Decade", "Robusto", "Honduras", "Ecuadorian Sumatra", "Colorado", "Box Pressed", 5.0, 50),
+    ("Tatuaje", "Brown Label", "Noella", "USA", "Ecuadorian Habano", "Colorado", "Parejo", 5.1, 42),
+    ("Plasencia", "Alma Fuerte", "Nestor IV", "Nicaragua", "Nicaraguan Jalapa", "Oscuro", "Box Pressed", 6.2, 54),
+    ("Ashton", "VSG", "Sorcerer", "Dominican Republic", "Ecuadorian Sumatra", "Colorado", "Parejo", 7.0, 49),
+    ("Perdomo", "Reserve 10th Anniversary", "Epicure", "Nicaragua", "Champagne (Connecticut)", "Claro", "Parejo", 6.0, 54),
+]
+STRENGTHS = ("Mild", "Medium", "Medium-Full", "Full")
+PAIRINGS = ("Espresso", "Bourbon", "Rum", "Port", "Scotch", "Water", None)
+NOTES = ("Cedar and leather", "Cocoa, pepper finish", "Creamy, nutty", "Earthy, coffee", "Sweet spice", None)
+
+
+class DatasetSpec(NamedTuple):
+    users: int = 20
+    cigars: int = 40       # Per user
+    sessions: int = 5      # Average per cigar; spread unevenly across users
+    seed: int = 42
+
+    @property
+    def key(self) -> str:
+        return f"u{self.users}-c{self.cigars}-s{self.sessions}-r{self.seed}"
+
+    def cigar_ids(self, user_id: int) -> range:
+        return range((user_id - 1) * self.cigars + 1, user_id * self.cigars + 1)
+
+
+def generate(spec: DatasetSpec, today: date):
+    """Rows for the user, cigar and smokingsession tables (plain dicts, explicit ids)."""
+    rnd = random.Random(spec.seed)
+    quality = {entry: min(97.0, rnd.gauss(88, 3)) for entry in CATALOG}
+    activity = [rnd.paretovariate(1.5) for _ in range(spec.users)]
+    scale = spec.users * spec.cigars * spec.sessions / sum(activity)
+
+    users, cigars, sessions = [], [], []
+    session_id = 0
+    for user_id in range(1, spec.users + 1):
+        users.append({
+            "id": user_id, "email": f"bench{user_id}@example.com", "is_active": True,
+            "created_at": datetime(2023, 1, 1), "subscription_status": "free"
+        })
+        owned = list(spec.cigar_ids(user_id))
+        cigar_quality = {}
+        for cigar_id in owned:
+            brand, line, vitola, origin, wrapper, color, fmt, length, ring = entry = rnd.choice(CATALOG)
+            purchased = today - timedelta(days=rnd.randint(30, 3 * 365))
+            cigars.append({
+                "id": cigar_id, "user_id": user_id, "brand": brand, "line": line, "vitola": vitola,
+                "origin": origin, "wrapper": wrapper, "wrapper_color": color, "format": fmt,
+                "length_in": length, "ring_gauge": ring, "strength": rnd.choice(STRENGTHS),
+                # Large stock so the write scenarios never run a cigar out mid-test
+                "quantity": rnd.randint(50, 200), "price_paid": round(rnd.uniform(8, 45), 2),
+                "purchase_date": purchased, "aging_since": purchased, "status": "active"
+            })
+            cigar_quality[cigar_id] = quality[entry]
+
+        for _ in range(round(activity[user_id - 1] * scale)):
+            cigar = cigars[rnd.choice(owned) - 1]
+            session_id += 1
+            overall = int(max(60, min(100, rnd.gauss(cigar_quality[cigar["id"]], 4))))
+            sub = lambda: max(1, min(10, round(overall / 10) + rnd.randint(-1, 1)))
+            sessions.append({
+                "id": session_id, "cigar_id": cigar["id"],
+                "date": cigar["purchase_date"] + timedelta(days=rnd.randint(0, (today - cigar["purchase_date"]).days)),
+                "duration_minutes": rnd.randint(35, 120), "pairing": rnd.choice(PAIRINGS),
+                "rating_overall": overall, "rating_construction": sub(), "rating_draw": sub(), "rating_flavor": sub(),
+                "strength_profile": cigar["strength"], "tasting_notes": rnd.choice(NOTES)
+            })
+
+    return users, cigars, sessions
+
+
+def seed(engine, spec: DatasetSpec, today: date = None) -> dict:
+    """Bulk-inserts the dataset into an empty schema and rebuilds the aggregates. Returns row counts."""
+    from sqlalchemy import insert
+    from sqlmodel import Session, select, func
+
+    from apps.auth.models import User
+    from apps.humidor.models import Cigar, SmokingSession
+    from apps.analytics.rollups import RollupService
+    from apps.analytics.sketches import RatingSketchService
+    from apps.humidor.leaderboards import LeaderboardService
+
+    with Session(engine) as session:
+        if session.exec(select(func.count()).select_from(User)).one():
+            raise RuntimeError("Dataset seeding needs an empty database (ids are assigned in order)")
+
+    users, cigars, sessions = generate(spec, today or date.today())
+    with engine.begin() as conn:
+        conn.execute(insert(User), users)
+        conn.execute(insert(Cigar), cigars)
+        for start in range(0, len(sessions), 10_000):
+            conn.execute(insert(SmokingSession), sessions[start:start + 10_000])
+
+    with Session(engine) as session:
+        rollups = RollupService(session)
+        for user_id in range(1, spec.users + 1):
+            rollups.rebuild(user_id)
+        RatingSketchService(session).rebuild()
+        LeaderboardService(session).refresh()
+    return {"users": len(users), "cigars": len(cigars), "sessions": len(sessions)}
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    defaults = DatasetSpec()
+    parser.add_argument("--users", type=int, default=defaults.users)
+    parser.add_argument("--cigars", type=int, default=defaults.cigars, help="Cigars per user")
+    parser.add_argument("--sessions", type=int, default=defaults.sessions, help="Average sessions per cigar")
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+
+
+def spec_from_args(args) -> DatasetSpec:
+    return DatasetSpec(args.users, args.cigars, args.sessions, args.seed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Seed a reproducible humidor dataset")
+    parser.add_argument("--db", required=True, help="SQLite file to create (must not exist)")
+    add_arguments(parser)
+    args = parser.parse_args()
+    if os.path.exists(args.db):
+        parser.error(f"{args.db} already exists")
+
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.abspath(args.db)}"
+    from database import engine, create_db_and_tables
+    create_db_and_tables()
+    spec = spec_from_args(args)
+    counts = seed(engine, spec)
+    print(f"Seeded {args.db} ({spec.key}): {counts['users']} users, {counts['cigars']} cigars, {counts['sessions']} sessions")
+    print(f"Locust: LOADTEST_USERS={spec.users} LOADTEST_CIGARS={spec.cigars} locust -f benchmarks/locustfile.py")
+
+
+if __name__ == "__main__":
+    main()
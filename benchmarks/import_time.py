@@ -0,0 +1,121 @@
+"""
+Cold import-time report for a worker (`python -X importtime`), checked against
+benchmarks/import_budget.json:
+
+* budget_ms: cumulative import time of the app module, best of N runs
+  (the minimum is the stable figure on a noisy machine; the median is reported too);
+* deferred: packages that must NOT be imported at startup (loaded on first use).
+
+    python -m benchmarks.import_time
+    python -m benchmarks.import_time --runs 9 --top 30
+    python -m benchmarks.import_time --module main_garage --json /tmp/imports.json
+
+Exits 1 when the budget is exceeded or a deferred package is imported eagerly.
+Every run is a fresh interpreter, so numbers include the .pyc cache being warm
+but nothing already in memory.
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+from pathlib import Path
+
+BUDGET_FILE = Path(__file__).with_name("import_budget.json")
+LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+
+def parse(stderr: str, root: str) -> list:
+    """(name, self_us, cumulative_us, depth) for `root` and everything it imported."""
+    entries = []
+    for line in stderr.splitlines():
+        m = LINE.match(line)
+        if m:
+            entries.append((m.group(4), int(m.group(1)), int(m.group(2)), (len(m.group(3)) - 1) // 2))
+    # Children are printed before their parent: walk back from the root entry while depth > 0
+    for i, (name, _, _, depth) in enumerate(entries):
+        if name == root and depth == 0:
+            subtree = [entries[i]]
+            for entry in reversed(entries[:i]):
+                if entry[3] == 0:
+                    break
+                subtree.append(entry)
+            return subtree
+    raise RuntimeError(f"{root} not found in -X importtime output")
+
+
+def measure(module: str, env: dict) -> list:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        env=env, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr[-2000:])
+    return parse(result.stderr, module)
+
+
+def main():
+    budget = json.loads(BUDGET_FILE.read_text())
+    parser = argparse.ArgumentParser(description="Import-time profile and budget check")
+    parser.add_argument("--module", default=budget["module"])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15, help="Slowest modules to list (self time)")
+    parser.add_argument("--budget-ms", type=float, default=budget["budget_ms"])
+    parser.add_argument("--json", help="Also write the report to this file")
+    args = parser.parse_args()
+
+    env = {**os.environ, "PYTHONWARNINGS": "ignore"}
+    runs = [measure(args.module, env) for _ in range(args.runs)]
+    totals_ms = [run[0][2] / 1000 for run in runs]
+    median_ms = statistics.median(totals_ms)
+    best_ms = min(totals_ms)
+
+    # Median run for the breakdown
+    sample = sorted(runs, key=lambda r: r[0][2])[len(runs) // 2]
+    by_package = defaultdict(int)
+    for name, self_us, _, _ in sample:
+        top = name.split(".")[0]
+        by_package[".".join(name.split(".")[:2]) if top == "apps" else top] += self_us
+    imported = {name for name, _, _, _ in sample}
+    eager = sorted(
+        d for d in budget["deferred"]
+        if any(n == d or n.startswith(d + ".") for n in imported)
+    )
+
+    print(f"import {args.module}: best {best_ms:.0f}ms, median {median_ms:.0f}ms, max {max(totals_ms):.0f}ms "
+          f"over {args.runs} runs; budget {args.budget_ms:.0f}ms")
+    print(f"\n{'package':<32}{'self ms':>10}")
+    for package, us in sorted(by_package.items(), key=lambda kv: -kv[1])[:args.top]:
+        print(f"{package:<32}{us / 1000:>10.1f}")
+    print(f"\n{'module':<48}{'self ms':>10}{'cum ms':>10}")
+    for name, self_us, cum_us, _ in sorted(sample, key=lambda e: -e[1])[:args.top]:
+        print(f"{name:<48}{self_us / 1000:>10.1f}{cum_us / 1000:>10.1f}")
+
+    if args.json:
+        Path(args.json).write_text(json.dumps({
+            "module": args.module,
+            "best_ms": best_ms,
+            "median_ms": median_ms,
+            "runs_ms": totals_ms,
+            "budget_ms": args.budget_ms,
+            "by_package_ms": {k: v / 1000 for k, v in by_package.items()},
+            "eager_deferred": eager,
+        }, indent=2))
+
+    failed = False
+    if eager:
+        print(f"\nFAIL: imported at startup but should be deferred: {', '.join(eager)}")
+        failed = True
+    if best_ms > args.budget_ms:
+        print(f"\nFAIL: {best_ms:.0f}ms is over the {args.budget_ms:.0f}ms budget")
+        failed = True
+    if not failed:
+        print("\nOK: within budget, nothing deferred was imported eagerly")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,377 @@
+"""
+In-process load test of the humidor and analytics pages.
+
+Seeds a dataset (benchmarks/dataset.py) into a throwaway SQLite file, then
+drives the ASGI app directly through httpx (no sockets, no server) with a
+fixed number of concurrent virtual users, each logged in as a random seeded
+user. The mix covers the pages people actually hit plus the two write paths:
+
+    list        GET  /humidor/
+    detail      GET  /humidor/{id}
+    community   GET  /humidor/community
+    dashboard   GET  /analytics/
+    session     POST /humidor/{id}/session
+    photo       POST /humidor/{id}/session with a JPEG attached
+
+Reports requests, throughput and p50/p95/p99 latency per scenario and writes
+them to benchmarks/results/<commit>.json, so two commits can be compared:
+
+    python -m benchmarks.loadtest
+    python -m benchmarks.loadtest --users 200 --cigars 60 --duration 30 --concurrency 16
+    python -m benchmarks.loadtest --only list,detail --compare a0f1833
+    python -m benchmarks.loadtest --compare benchmarks/results/a0f1833.json --fail-over 20
+
+Seeded databases are cached under benchmarks/.data per dataset and schema
+fingerprint, so repeated runs skip the seeding. Uploaded photos land in the
+run's temp directory, not in static/.
+
+Against a running server (several workers, real network) use the locust
+scenario in benchmarks/locustfile.py instead.
+"""
+import argparse
+import asyncio
+import base64
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date
+from pathlib import Path
+
+from benchmarks.dataset import DatasetSpec, add_arguments, seed, spec_from_args
+
+ROOT = Path(__file__).resolve().parent.parent
+RESULTS_DIR = ROOT / "benchmarks" / "results"
+CACHE_DIR = ROOT / "benchmarks" / ".data"
+SECRET_KEY = "loadtest"
+
+# name -> (weight, method, route label, expected status); anything else counts as an error,
+# so a lost session cookie (redirect to login) cannot pass for a fast page
+SCENARIOS = {
+    "list": (30, "GET", "/humidor/", 200),
+    "detail": (30, "GET", "/humidor/{id}", 200),
+    "community": (10, "GET", "/humidor/community", 200),
+    "dashboard": (15, "GET", "/analytics/", 200),
+    "session": (10, "POST", "/humidor/{id}/session", 303),
+    "photo": (5, "POST", "/humidor/{id}/session +photo", 303),
+}
+# Smallest valid-looking JPEG body: the app stores uploads as-is, size is what matters
+PHOTO_HEADER = b"\xff\xd8\xff\xe0\x00\x10JFIF\x00\x01\x01\x00\x00\x01\x00\x01\x00\x00"
+
+
+def prepare_environment(workdir: Path) -> Path:
+    """
+    Env and cwd must be set before the app is imported: settings are read at
+    import and templates/static/uploads are resolved relative to the cwd.
+    """
+    db_path = workdir / "loadtest.db"
+    os.environ.update({
+        "DATABASE_URL": f"sqlite:///{db_path}",
+        "SECRET_KEY": SECRET_KEY,
+        "RATE_LIMIT_ENABLED": "false",
+        "STRIPE_BACKEND": "stub",
+    })
+    (workdir / "templates").symlink_to(ROOT / "templates")
+    (workdir / "static").mkdir()
+    sys.path.insert(0, str(ROOT))
+    os.chdir(workdir)
+    return db_path
+
+
+def load_dataset(spec: DatasetSpec, db_path: Path, use_cache: bool) -> str:
+    from database import engine, create_db_and_tables, schema_fingerprint
+    from apps.core.modules import registry
+
+    registry.import_models()
+    cached = CACHE_DIR / f"{spec.key}-{date.today().isoformat()}-{schema_fingerprint():08x}.db"
+    if use_cache and cached.exists():
+        shutil.copyfile(cached, db_path)
+        create_db_and_tables()  # Fingerprint matches: no DDL
+        return f"cached {cached.name}"
+
+    create_db_and_tables()
+    started = time.perf_counter()
+    counts = seed(engine, spec)
+    engine.dispose()
+    if use_cache:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        for stale in CACHE_DIR.glob(f"{spec.key}-*.db"):
+            stale.unlink()
+        shutil.copyfile(db_path, cached)
+    return (
+        f"seeded {counts['users']} users, {counts['cigars']} cigars, {counts['sessions']} sessions "
+        f"in {time.perf_counter() - started:.1f}s"
+    )
+
+
+def session_cookie(user_id: int) -> str:
+    """Same format SessionMiddleware writes: base64 JSON signed with SECRET_KEY."""
+    import itsdangerous
+    data = base64.b64encode(json.dumps({"user_id": user_id}).encode())
+    return itsdangerous.TimestampSigner(SECRET_KEY).sign(data).decode()
+
+
+class VirtualUser:
+    def __init__(self, spec: DatasetSpec, rnd: random.Random, photo_bytes: bytes):
+        self.spec = spec
+        self.rnd = rnd
+        self.photo_bytes = photo_bytes
+        self.user_id = rnd.randint(1, spec.users)
+        self.headers = {"Cookie": f"session={session_cookie(self.user_id)}"}
+
+    def cigar_id(self) -> int:
+        return self.rnd.choice(self.spec.cigar_ids(self.user_id))
+
+    def session_form(self) -> dict:
+        return {
+            "date": date.today().isoformat(),
+            "rating_overall": str(self.rnd.randint(80, 96)),
+            "rating_flavor": str(self.rnd.randint(7, 10)),
+            "duration": str(self.rnd.randint(40, 90)),
+            "pairing": "Espresso",
+            "notes": "Load test session"
+        }
+
+    async def run(self, client, name: str):
+        if name == "list":
+            return await client.get("/humidor/", headers=self.headers)
+        if name == "detail":
+            return await client.get(f"/humidor/{self.cigar_id()}", headers=self.headers)
+        if name == "community":
+            return await client.get("/humidor/community", headers=self.headers)
+        if name == "dashboard":
+            return await client.get("/analytics/", headers=self.headers)
+        if name == "session":
+            return await client.post(f"/humidor/{self.cigar_id()}/session", data=self.session_form(), headers=self.headers)
+        files = {"photos": ("ash.jpg", self.photo_bytes, "image/jpeg")}
+        return await client.post(
+            f"/humidor/{self.cigar_id()}/session", data=self.session_form(), files=files, headers=self.headers
+        )
+
+
+async def drive(app, spec: DatasetSpec, names: list, concurrency: int, duration: float,
+                requests: int, warmup: int, photo_kb: int, seed_value: int) -> tuple:
+    import httpx
+
+    rnd = random.Random(seed_value)
+    photo_bytes = PHOTO_HEADER + rnd.randbytes(photo_kb * 1024)
+    weights = [SCENARIOS[n][0] for n in names]
+    samples = {n: [] for n in names}
+    errors = {n: 0 for n in names}
+    budget = {"left": requests}
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=60.0) as client:
+        # Warm-up: lazy routers, template compilation, recommendation index; not recorded
+        warm_user = VirtualUser(spec, random.Random(seed_value - 1), photo_bytes)
+        for name in names:
+            for _ in range(warmup):
+                resp = await warm_user.run(client, name)
+                if resp.status_code != SCENARIOS[name][3]:
+                    raise RuntimeError(f"{name}: expected {SCENARIOS[name][3]}, got {resp.status_code}")
+
+        deadline = time.perf_counter() + duration if duration else None
+
+        async def worker(index: int):
+            user = VirtualUser(spec, random.Random(seed_value + index), photo_bytes)
+            while True:
+                if deadline is not None and time.perf_counter() >= deadline:
+                    return
+                if deadline is None:
+                    if budget["left"] <= 0:
+                        return
+                    budget["left"] -= 1
+                name = user.rnd.choices(names, weights)[0]
+                started = time.perf_counter()
+                try:
+                    resp = await user.run(client, name)
+                    ok = resp.status_code == SCENARIOS[name][3]
+                except Exception:
+                    ok = False
+                samples[name].append(time.perf_counter() - started)
+                if not ok:
+                    errors[name] += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(i) for i in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    return samples, errors, elapsed
+
+
+def percentile(sorted_ms: list, q: float) -> float:
+    if not sorted_ms:
+        return 0.0
+    k = (len(sorted_ms) - 1) * q
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_ms) - 1)
+    return sorted_ms[lo] + (sorted_ms[hi] - sorted_ms[lo]) * (k - lo)
+
+
+def summarize(samples: dict, errors: dict, elapsed: float) -> dict:
+    routes = {}
+    for name, values in samples.items():
+        ms = sorted(v * 1000 for v in values)
+        routes[name] = {
+            "route": f"{SCENARIOS[name][1]} {SCENARIOS[name][2]}",
+            "requests": len(ms),
+            "errors": errors[name],
+            "rps": round(len(ms) / elapsed, 2) if elapsed else 0.0,
+            "p50_ms": round(percentile(ms, 0.50), 2),
+            "p95_ms": round(percentile(ms, 0.95), 2),
+            "p99_ms": round(percentile(ms, 0.99), 2),
+            "max_ms": round(ms[-1], 2) if ms else 0.0,
+        }
+    total = sum(r["requests"] for r in routes.values())
+    return {
+        "elapsed_s": round(elapsed, 2),
+        "requests": total,
+        "errors": sum(errors.values()),
+        "rps": round(total / elapsed, 2) if elapsed else 0.0,
+        "routes": routes,
+    }
+
+
+def git_commit() -> tuple:
+    def git(*args):
+        return subprocess.run(["git", *args], cwd=ROOT, capture_output=True, text=True).stdout.strip()
+    commit = git("rev-parse", "--short", "HEAD") or "unknown"
+    dirty = bool(git("status", "--porcelain", "--untracked-files=no"))
+    return commit, dirty
+
+
+def resolve_baseline(ref: str) -> Path:
+    path = Path(ref)
+    if path.suffix == ".json":
+        return path if path.is_absolute() else ROOT / path
+    if ref == "previous":
+        runs = sorted(RESULTS_DIR.glob("*.json"), key=lambda p: p.stat().st_mtime)
+        if not runs:
+            raise FileNotFoundError("No stored results to compare against")
+        return runs[-1]
+    return RESULTS_DIR / f"{ref}.json"
+
+
+def print_report(result: dict, baseline: dict = None) -> None:
+    summary = result["summary"]
+    print(
+        f"\n{summary['requests']} requests in {summary['elapsed_s']}s "
+        f"({summary['rps']} req/s, {summary['errors']} errors), concurrency {result['config']['concurrency']}"
+    )
+    header = f"{'scenario':<10} {'route':<36} {'reqs':>6} {'err':>4} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8}"
+    print(header)
+    print("-" * len(header))
+    base_routes = (baseline or {}).get("summary", {}).get("routes", {})
+    shape = ("dataset", "scenarios", "concurrency", "photo_kb")  # Run length does not change latency
+    if baseline and any(baseline["config"].get(k) != result["config"][k] for k in shape):
+        print(f"(baseline {baseline['commit']} ran a different dataset/mix/concurrency; deltas are indicative only)")
+    for name, r in summary["routes"].items():
+        print(
+            f"{name:<10} {r['route']:<36} {r['requests']:>6} {r['errors']:>4} {r['rps']:>8.1f} "
+            f"{r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} {r['p99_ms']:>8.1f}"
+        )
+        base = base_routes.get(name)
+        if base:
+            print(
+                f"{'':<10} {'vs ' + baseline['commit']:<36} {'':>6} {'':>4} {delta(r['rps'], base['rps']):>8} "
+                f"{delta(r['p50_ms'], base['p50_ms']):>8} {delta(r['p95_ms'], base['p95_ms']):>8} "
+                f"{delta(r['p99_ms'], base['p99_ms']):>8}"
+            )
+
+
+def delta(current: float, base: float) -> str:
+    if not base:
+        return "n/a"
+    return f"{(current - base) / base * 100:+.0f}%"
+
+
+def regressions(result: dict, baseline: dict, threshold: float) -> list:
+    """Scenarios whose p95 grew by more than `threshold` percent over the baseline."""
+    found = []
+    base_routes = baseline["summary"]["routes"]
+    for name, r in result["summary"]["routes"].items():
+        base = base_routes.get(name)
+        if base and base["p95_ms"] and (r["p95_ms"] - base["p95_ms"]) / base["p95_ms"] * 100 > threshold:
+            found.append(f"{name}: p95 {base['p95_ms']}ms -> {r['p95_ms']}ms")
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description="In-process load test with a seeded dataset")
+    add_arguments(parser)
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds to run (0: use --requests)")
+    parser.add_argument("--requests", type=int, default=2000, help="Total requests when --duration is 0")
+    parser.add_argument("--warmup", type=int, default=3, help="Unrecorded requests per scenario before timing")
+    parser.add_argument("--only", help=f"Comma-separated scenarios ({','.join(SCENARIOS)})")
+    parser.add_argument("--photo-kb", type=int, default=256, help="Size of the uploaded photo")
+    parser.add_argument("--no-cache", action="store_true", help="Always seed a fresh dataset")
+    parser.add_argument("--no-save", action="store_true", help="Do not store the result")
+    parser.add_argument("--compare", help="Baseline: a commit with stored results, a JSON file or 'previous'")
+    parser.add_argument("--fail-over", type=float, help="Exit 1 if any p95 regressed by more than this percent")
+    parser.add_argument("--modules", help="ENABLED_MODULES for the app (humidor,analytics are always needed)")
+    args = parser.parse_args()
+
+    names = [n.strip() for n in args.only.split(",")] if args.only else list(SCENARIOS)
+    unknown = set(names) - SCENARIOS.keys()
+    if unknown:
+        parser.error(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+
+    baseline = None
+    if args.compare:
+        baseline_path = resolve_baseline(args.compare)
+        if not baseline_path.exists():
+            parser.error(f"No stored results at {baseline_path}")
+        baseline = json.loads(baseline_path.read_text())
+
+    commit, dirty = git_commit()
+    spec = spec_from_args(args)
+    if args.modules:
+        os.environ["ENABLED_MODULES"] = args.modules
+    workdir = Path(tempfile.mkdtemp(prefix="tib-loadtest-"))
+    try:
+        db_path = prepare_environment(workdir)
+        print(f"Dataset {spec.key}: {load_dataset(spec, db_path, not args.no_cache)}")
+
+        import main as app_main
+        samples, errors, elapsed = asyncio.run(drive(
+            app_main.app, spec, names, args.concurrency, args.duration, args.requests,
+            args.warmup, args.photo_kb, args.seed
+        ))
+    finally:
+        os.chdir(ROOT)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    result = {
+        "commit": commit + ("-dirty" if dirty else ""),
+        "recorded_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": sys.version.split()[0],
+        "config": {
+            "dataset": spec._asdict(), "scenarios": names, "concurrency": args.concurrency,
+            "duration": args.duration, "requests": args.requests if not args.duration else None,
+            "photo_kb": args.photo_kb,
+        },
+        "summary": summarize(samples, errors, elapsed),
+    }
+    print_report(result, baseline)
+
+    if not args.no_save:
+        RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+        out = RESULTS_DIR / f"{result['commit']}.json"
+        out.write_text(json.dumps(result, indent=2))
+        print(f"\nSaved {out.relative_to(ROOT)}")
+
+    if baseline and args.fail_over is not None:
+        found = regressions(result, baseline, args.fail_over)
+        if found:
+            print(f"\np95 regressions over {args.fail_over:.0f}% vs {baseline['commit']}:")
+            for line in found:
+                print(f"  {line}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
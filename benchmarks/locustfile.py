@@ -0,0 +1,90 @@
+"""
+Locust scenario for a running server: same mix and weights as
+benchmarks/loadtest.py, but over the network and across real workers.
+
+Locust is not a dependency of the app; install it separately. Seed a
+database first and start the server on it with the same SECRET_KEY, so the
+session cookies minted here are accepted:
+
+    python -m benchmarks.dataset --db tib_bench.db --users 50
+    DATABASE_URL=sqlite:///tib_bench.db SECRET_KEY=loadtest RATE_LIMIT_ENABLED=false \\
+        uvicorn main:app --workers 4
+    SECRET_KEY=loadtest LOADTEST_USERS=50 LOADTEST_CIGARS=40 \\
+        locust -f benchmarks/locustfile.py --host http://127.0.0.1:8000 --headless -u 32 -r 8 -t 1m --csv bench
+
+LOADTEST_USERS / LOADTEST_CIGARS must match the dataset (user N owns cigars
+(N-1)*cigars+1 .. N*cigars). Requests are grouped by route template, so the
+CSV/UI stats line up with the in-process report.
+"""
+import base64
+import json
+import os
+import random
+from datetime import date
+
+import itsdangerous
+from locust import HttpUser, between, task
+
+SECRET_KEY = os.getenv("SECRET_KEY", "loadtest")
+USERS = int(os.getenv("LOADTEST_USERS", "20"))
+CIGARS = int(os.getenv("LOADTEST_CIGARS", "40"))
+PHOTO = b"\xff\xd8\xff\xe0\x00\x10JFIF\x00\x01\x01\x00\x00\x01\x00\x01\x00\x00" + os.urandom(
+    int(os.getenv("LOADTEST_PHOTO_KB", "256")) * 1024
+)
+
+
+def session_cookie(user_id: int) -> str:
+    data = base64.b64encode(json.dumps({"user_id": user_id}).encode())
+    return itsdangerous.TimestampSigner(SECRET_KEY).sign(data).decode()
+
+
+class HumidorUser(HttpUser):
+    wait_time = between(0.5, 2.0)
+
+    def on_start(self):
+        self.user_id = random.randint(1, USERS)
+        self.client.cookies.set("session", session_cookie(self.user_id))
+
+    def cigar_id(self) -> int:
+        return random.randint((self.user_id - 1) * CIGARS + 1, self.user_id * CIGARS)
+
+    def session_form(self) -> dict:
+        return {
+            "date": date.today().isoformat(),
+            "rating_overall": str(random.randint(80, 96)),
+            "rating_flavor": str(random.randint(7, 10)),
+            "duration": str(random.randint(40, 90)),
+            "pairing": "Espresso",
+            "notes": "Load test session"
+        }
+
+    def expect(self, method: str, path: str, name: str, status: int, **kwargs):
+        with self.client.request(method, path, name=name, allow_redirects=False, catch_response=True, **kwargs) as resp:
+            if resp.status_code != status:
+                resp.failure(f"expected {status}, got {resp.status_code}")
+
+    @task(30)
+    def humidor_list(self):
+        self.expect("GET", "/humidor/", "GET /humidor/", 200)
+
+    @task(30)
+    def cigar_detail(self):
+        self.expect("GET", f"/humidor/{self.cigar_id()}", "GET /humidor/{id}", 200)
+
+    @task(10)
+    def community(self):
+        self.expect("GET", "/humidor/community", "GET /humidor/community", 200)
+
+    @task(15)
+    def dashboard(self):
+        self.expect("GET", "/analytics/", "GET /analytics/", 200)
+
+    @task(10)
+    def log_session(self):
+        self.expect("POST", f"/humidor/{self.cigar_id()}/session", "POST /humidor/{id}/session", 303,
+                    data=self.session_form())
+
+    @task(5)
+    def log_session_with_photo(self):
+        self.expect("POST", f"/humidor/{self.cigar_id()}/session", "POST /humidor/{id}/session +photo", 303,
+                    data=self.session_form(), files={"photos": ("ash.jpg", PHOTO, "image/jpeg")})
@@ -0,0 +1,104 @@
+"""
+Time-to-first-request per worker.
+
+Starts N uvicorn workers at the same time (like a deploy or an autoscale
+burst), each on its own port and all on the same SQLite file, and measures
+how long each takes from process spawn until it answers its first request.
+Runs once against an empty database (cold: one worker applies the schema
+while the others wait on the migration lock) and once more against the
+same file (warm: schema fingerprint matches, no DDL).
+
+    python -m benchmarks.startup_bench
+    python -m benchmarks.startup_bench --workers 8 --path /humidor/ --runs 3
+    python -m benchmarks.startup_bench --modules garage,armory
+"""
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_workers(count: int, env: dict) -> list:
+    workers = []
+    for _ in range(count):
+        port = _free_port()
+        proc = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+            env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE
+        )
+        workers.append((proc, port, time.perf_counter()))
+    return workers
+
+
+def wait_first_response(proc, port: int, started: float, path: str, timeout: float) -> float:
+    deadline = started + timeout
+    with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=1.0) as client:
+        while time.perf_counter() < deadline:
+            if proc.poll() is not None:
+                raise RuntimeError(f"worker on :{port} exited: {proc.stderr.read().decode()[-500:]}")
+            try:
+                if client.get(path, follow_redirects=False).status_code < 500:
+                    return time.perf_counter() - started
+            except httpx.TransportError:
+                time.sleep(0.01)
+    raise TimeoutError(f"worker on :{port} did not answer in {timeout}s")
+
+
+def run(count: int, env: dict, path: str, timeout: float) -> list:
+    workers = start_workers(count, env)
+    try:
+        return [wait_first_response(proc, port, started, path, timeout) for proc, port, started in workers]
+    finally:
+        for proc, _, _ in workers:
+            proc.terminate()
+        for proc, _, _ in workers:
+            proc.wait()
+
+
+def report(label: str, samples: list) -> None:
+    ms = sorted(s * 1000 for s in samples)
+    print(
+        f"{label:<5} n={len(ms):<3} min={ms[0]:7.0f}ms  median={statistics.median(ms):7.0f}ms  max={ms[-1]:7.0f}ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure worker time-to-first-request")
+    parser.add_argument("--workers", type=int, default=4, help="Workers started together")
+    parser.add_argument("--runs", type=int, default=1, help="Warm runs after the cold one")
+    parser.add_argument("--path", default="/", help="First request (use an app prefix to include its lazy import)")
+    parser.add_argument("--modules", help="ENABLED_MODULES for the workers")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(), "startup.db")
+    env = {
+        **os.environ,
+        "DATABASE_URL": f"sqlite:///{db_path}",
+        "RATE_LIMIT_ENABLED": "false",
+    }
+    if args.modules:
+        env["ENABLED_MODULES"] = args.modules
+
+    print(f"{args.workers} workers, first request GET {args.path}, db {db_path}")
+    report("cold", run(args.workers, env, args.path, args.timeout))
+    warm = []
+    for _ in range(args.runs):
+        warm.extend(run(args.workers, env, args.path, args.timeout))
+    report("warm", warm)
+
+
+if __name__ == "__main__":
+    main()
@@ -8,7 +8,8 @@ load_dotenv()
 class Settings(BaseSettings):
     SECRET_KEY: str = os.getenv("SECRET_KEY", "fallback-secret-key")
     ALGORITHM: str = os.getenv("ALGORITHM", "HS256")
-    ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 7 # 7 days
+    ACCESS_TOKEN_EXPIRE_MINUTES: int = 15 # API bearer tokens; carry the entitlement claim
+    REFRESH_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 7 # 7 days
     
     # Monetization
     ENABLE_SUBSCRIPTION: bool = False
@@ -16,6 +17,22 @@ class Settings(BaseSettings):
     STRIPE_PUBLISHABLE_KEY: Optional[str] = None
     STRIPE_WEBHOOK_SECRET: Optional[str] = None
     STRIPE_PRICE_ID_PREMIUM: Optional[str] = None
+    STRIPE_BACKEND: str = "stripe" # stripe | stub (offline checkout for dev/load tests)
+    STRIPE_STUB_LATENCY: float = 0.0
+    STRIPE_TIMEOUT_SECONDS: float = 5.0
+    STRIPE_MAX_RETRIES: int = 2
+
+    # Rate limiting / load shedding (apps.core.ratelimit)
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_BACKEND: str = "memory" # memory (per worker) | sqlite (shared by workers on the host)
+    RATE_LIMIT_SQLITE_PATH: str = "ratelimit.db"
+    MAX_INFLIGHT_REQUESTS: int = 64
+    TRUSTED_PROXIES: str = "127.0.0.1" # IPs/CIDRs whose X-Forwarded-For is believed (anonymous clients are keyed on it)
+    METRICS_TOKEN: Optional[str] = None # Bearer token for /metrics/ratelimit; unset = endpoint not mounted
+
+    # Apps served by this worker (apps.core.modules); routers load on first request unless LAZY_MODULES=false
+    ENABLED_MODULES: str = "humidor,analytics,garage,armory,portfolio,billing"
+    LAZY_MODULES: bool = True
 
     DATABASE_URL: str = os.getenv("DATABASE_URL", "sqlite:///tib_saas.db")
     
@@ -1,7 +1,16 @@
 from sqlmodel import SQLModel, create_engine, Session
+from sqlalchemy.schema import CreateTable, CreateIndex
+from contextlib import contextmanager
+import hashlib
+import importlib
 
 import os
 
+try:
+    import fcntl
+except ImportError: # Windows: sem lock entre workers (dev local)
+    fcntl = None
+
 # Configuração do Banco de Dados
 sqlite_file_name = "tib_saas.db"
 sqlite_url = os.getenv("DATABASE_URL", f"sqlite:///{sqlite_file_name}")
@@ -15,11 +24,62 @@ def get_session():
     with Session(engine) as session:
         yield session
 
+# Migrações ad-hoc (scripts migrate_*.py na raiz), rodadas após o create_all
+MIGRATIONS = ("migrate_user", "migrate_lifecycle", "migrate_garage", "migrate_armory")
+
+def schema_fingerprint() -> int:
+    """
+    Hash do DDL de todas as tabelas registradas + lista de migrações (cabe no PRAGMA user_version).
+    Independe de ENABLED_MODULES (registry.model_modules importa todos os apps), então
+    entry points diferentes no mesmo arquivo não sobrescrevem o fingerprint um do outro.
+    """
+    ddl = []
+    for table in SQLModel.metadata.sorted_tables:
+        ddl.append(str(CreateTable(table).compile(engine)))
+        ddl.extend(str(CreateIndex(index).compile(engine)) for index in sorted(table.indexes, key=lambda i: i.name))
+    ddl.extend(MIGRATIONS)
+    digest = hashlib.sha256("\n".join(ddl).encode()).hexdigest()
+    return int(digest[:8], 16) & 0x7FFFFFFF
+
+def _stored_fingerprint() -> int:
+    with engine.connect() as conn:
+        return conn.exec_driver_sql("PRAGMA user_version").scalar()
+
+@contextmanager
+def _migration_lock(path: str):
+    if fcntl is None:
+        yield
+        return
+    with open(path, "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX) # Os outros workers esperam aqui
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
 # --- A FUNÇÃO QUE FALTOU ---
 # Essa função cria o arquivo .db e as tabelas se elas não existirem
 def create_db_and_tables():
-    # ATUALME ESTA LINHA:
-    from apps.humidor.models import Cigar, SmokingSession, CigarImage, SessionImage
-    from apps.auth.models import User
-    
-    SQLModel.metadata.create_all(engine)
\ No newline at end of file
+    # Registra as tabelas de todos os apps, habilitados ou não: main.py e main_garage.py dividem o mesmo arquivo
+    from apps.core.modules import registry
+    registry.import_models()
+
+    db_path = engine.url.database
+    if engine.url.get_backend_name() != "sqlite" or not db_path or db_path == ":memory:":
+        SQLModel.metadata.create_all(engine)
+        return
+
+    # Caminho rápido: schema já aplicado, nenhum DDL no boot
+    fingerprint = schema_fingerprint()
+    if _stored_fingerprint() == fingerprint:
+        return
+
+    # Um worker aplica; quem esperou no lock reconfere e sai sem refazer
+    with _migration_lock(f"{db_path}.lock"):
+        if _stored_fingerprint() == fingerprint:
+            return
+        SQLModel.metadata.create_all(engine)
+        for name in MIGRATIONS:
+            importlib.import_module(name).migrate(db_path)
+        with engine.begin() as conn:
+            conn.exec_driver_sql(f"PRAGMA user_version = {fingerprint}")
@@ -1,28 +1,63 @@
 from fastapi import FastAPI
 from fastapi.staticfiles import StaticFiles
 from contextlib import asynccontextmanager
-import uvicorn
 
 # 1. Imports do Banco e dos Módulos
 from database import create_db_and_tables 
-from apps.humidor.router import router as humidor_router
 from apps.auth.router import router as auth_router
+from apps.core.modules import registry, LazyRouterMiddleware
+from apps.auth.utils import oidc_cache
+from apps.auth.webhook_worker import webhook_worker
+from config import settings
 
 # Ciclo de vida (Cria tabelas ao iniciar)
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     create_db_and_tables()
+    # Mantém o discovery/JWKS do Auth0 em cache (login sem fetch remoto)
+    if oidc_cache:
+        oidc_cache.start()
+    # Aplica os eventos do Stripe guardados pelo webhook
+    if settings.ENABLE_SUBSCRIPTION:
+        webhook_worker.start()
     yield
+    if oidc_cache:
+        await oidc_cache.stop()
+    await webhook_worker.stop()
 
 from starlette.middleware.sessions import SessionMiddleware
 import os
 
 app = FastAPI(lifespan=lifespan)
 
+# Apps habilitados (ENABLED_MODULES): importados no primeiro acesso ao prefixo, ou todos já no boot
+if settings.LAZY_MODULES:
+    app.add_middleware(LazyRouterMiddleware, registry=registry, target=app)
+else:
+    registry.load_all(app)
+
 # Secret Key for Session (Should be env var in prod)
 SECRET_KEY = os.getenv("SECRET_KEY", "super_secret_dev_key_12345")
 app.add_middleware(SessionMiddleware, secret_key=SECRET_KEY)
 
+# Rate limiting + load shedding (outermost: rejeita antes de qualquer trabalho)
+from apps.core.ratelimit import RateLimitMiddleware, LimiterStats, MemoryBucketStore, SQLiteBucketStore, parse_networks
+
+ratelimit_stats = LimiterStats()
+if settings.RATE_LIMIT_ENABLED:
+    bucket_store = (
+        SQLiteBucketStore(settings.RATE_LIMIT_SQLITE_PATH)
+        if settings.RATE_LIMIT_BACKEND == "sqlite" else MemoryBucketStore()
+    )
+    app.add_middleware(
+        RateLimitMiddleware,
+        secret_key=SECRET_KEY,
+        store=bucket_store,
+        stats=ratelimit_stats,
+        max_inflight=settings.MAX_INFLIGHT_REQUESTS,
+        trusted_proxies=parse_networks(settings.TRUSTED_PROXIES)
+    )
+
 from fastapi import Request, HTTPException, Depends
 from fastapi.responses import RedirectResponse
 from fastapi.templating import Jinja2Templates
@@ -42,22 +77,28 @@ async def http_exception_handler(request: Request, exc: HTTPException):
 # Monta a pasta de arquivos estáticos (Imagens/CSS)
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
-# 2. Inclui as Rotas (Os "Apps")
-from apps.analytics.router import router as analytics_router
+# 2. Inclui as Rotas do núcleo (os apps vêm do registry em apps.core.modules)
 from apps.auth.webhook_router import router as webhook_router
 
 app.include_router(auth_router)
-app.include_router(humidor_router)
-app.include_router(analytics_router)
-
 app.include_router(webhook_router)
-# from apps.billing.router import router as billing_router
-# app.include_router(billing_router)
+
+# Métricas internas: só existem com METRICS_TOKEN e exigem o token (nunca públicas)
+if settings.METRICS_TOKEN:
+    import hmac
+
+    @app.get("/metrics/ratelimit", include_in_schema=False)
+    def ratelimit_metrics(request: Request):
+        expected = f"Bearer {settings.METRICS_TOKEN}"
+        if not hmac.compare_digest(request.headers.get("authorization", ""), expected):
+            raise HTTPException(status_code=404, detail="Not Found")
+        return ratelimit_stats.snapshot(settings.MAX_INFLIGHT_REQUESTS)
 
 # Rota raiz (Portal)
 @app.get("/")
 def home(request: Request):
-    return RedirectResponse(url="/humidor")
+    return RedirectResponse(url=registry.home)
 
 if __name__ == "__main__":
+    import uvicorn
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
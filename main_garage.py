@@ -1,36 +1,10 @@
-from fastapi import FastAPI
-from fastapi.staticfiles import StaticFiles
-from contextlib import asynccontextmanager
-import uvicorn
+import os
 
-# 1. Imports do Banco e dos Módulos
-from database import create_db_and_tables 
-from apps.garage.router import router as garage_router
-from apps.range.router import router as range_router # <--- NOVO IMPORT
+# Garagem + armaria sem o humidor: mesmo app, só muda o ENABLED_MODULES (apps.core.modules)
+os.environ.setdefault("ENABLED_MODULES", "garage,armory")
 
-# --- CORREÇÃO AQUI: Importar direto de 'database', sem 'core.' ---
-from database import create_db_and_tables 
-from apps.garage.router import router as garage_router
-
-# Ciclo de vida da aplicação (cria as tabelas ao iniciar)
-@asynccontextmanager
-async def lifespan(app: FastAPI):
-    create_db_and_tables()
-    yield
-
-app = FastAPI(lifespan=lifespan)
-
-# Monta a pasta de arquivos estáticos (CSS, Imagens, Uploads)
-app.mount("/static", StaticFiles(directory="static"), name="static")
-
-# Inclui as rotas da Garagem
-app.include_router(garage_router)
-
-# Rota raiz (redireciona para a garagem)
-@app.get("/")
-def home():
-    from fastapi.responses import RedirectResponse
-    return RedirectResponse(url="/garage")
+from main import app
 
 if __name__ == "__main__":
-    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
+    import uvicorn
+    uvicorn.run("main_garage:app", host="0.0.0.0", port=8000, reload=True)
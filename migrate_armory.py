@@ -0,0 +1,19 @@
+import sqlite3
+
+def migrate(db_path: str = "tib_saas.db"):
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+
+    # Índices do histórico paginado e da listagem por usuário
+    try:
+        cursor.execute("CREATE INDEX IF NOT EXISTS ix_gun_user_id ON gun (user_id)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS ix_rangesession_gun_date ON rangesession (gun_id, date, id)")
+        print("Indices de gun/rangesession garantidos")
+    except sqlite3.OperationalError:
+        print("Tabelas da armaria nao existem (app desabilitado)")
+
+    conn.commit()
+    conn.close()
+
+if __name__ == "__main__":
+    migrate()
@@ -0,0 +1,54 @@
+import sqlite3
+
+def migrate(db_path: str = "tib_saas.db"):
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+
+    # Índices usados pelo dashboard agregado da garagem
+    try:
+        cursor.execute("CREATE INDEX IF NOT EXISTS ix_veiculo_user_id ON veiculo (user_id)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS ix_manutencao_veiculo_id ON manutencao (veiculo_id)")
+        print("Indices de veiculo/manutencao garantidos")
+    except sqlite3.OperationalError:
+        print("Tabelas da garagem nao existem (app desabilitado)")
+
+    try:
+        cursor.execute("ALTER TABLE manutencao ADD COLUMN comprovante VARCHAR")
+        print("Adicionado comprovante em manutencao")
+    except sqlite3.OperationalError:
+        print("Coluna comprovante ja existe em manutencao")
+
+    # Menor leitura do dia no histórico do odômetro (linhas antigas: só o máximo foi guardado)
+    try:
+        cursor.execute("ALTER TABLE leituraodometro ADD COLUMN km_min INTEGER")
+        print("Adicionado km_min em leituraodometro")
+    except sqlite3.OperationalError:
+        print("Coluna km_min ja existe em leituraodometro")
+    try:
+        cursor.execute("UPDATE leituraodometro SET km_min = km WHERE km_min IS NULL")
+    except sqlite3.OperationalError:
+        print("Tabela leituraodometro nao existe")
+
+    # Projeção dos alertas (AlertEngine)
+    for coluna, tipo in [
+        ("estado", "VARCHAR"),
+        ("km_restante", "INTEGER"),
+        ("dias_restantes", "INTEGER"),
+        ("data_prevista", "DATE"),
+        ("avaliado_em", "DATETIME"),
+    ]:
+        try:
+            cursor.execute(f"ALTER TABLE alerta ADD COLUMN {coluna} {tipo}")
+            print(f"Adicionado {coluna} em alerta")
+        except sqlite3.OperationalError:
+            print(f"Coluna {coluna} ja existe em alerta")
+    try:
+        cursor.execute("CREATE INDEX IF NOT EXISTS ix_alerta_estado ON alerta (estado)")
+    except sqlite3.OperationalError:
+        print("Tabela alerta nao existe")
+
+    conn.commit()
+    conn.close()
+
+if __name__ == "__main__":
+    migrate()
@@ -1,7 +1,7 @@
 import sqlite3
 
-def migrate():
-    conn = sqlite3.connect("tib_saas.db")
+def migrate(db_path: str = "tib_saas.db"):
+    conn = sqlite3.connect(db_path)
     cursor = conn.cursor()
     
     # Garage Migration
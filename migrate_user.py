@@ -1,7 +1,7 @@
 import sqlite3
 
-def migrate():
-    conn = sqlite3.connect("tib_saas.db")
+def migrate(db_path: str = "tib_saas.db"):
+    conn = sqlite3.connect(db_path)
     cursor = conn.cursor()
     
     try:
@@ -22,6 +22,16 @@ def migrate():
     except sqlite3.OperationalError:
         print("Coluna subscription_end_date ja existe")
 
+    try:
+        cursor.execute("ALTER TABLE user ADD COLUMN subscription_event_at INTEGER")
+        print("Adicionado subscription_event_at em user")
+    except sqlite3.OperationalError:
+        print("Coluna subscription_event_at ja existe")
+
+    # Webhooks look users up by stripe_customer_id
+    cursor.execute("CREATE INDEX IF NOT EXISTS ix_user_stripe_customer_id ON user (stripe_customer_id)")
+    print("Indice ix_user_stripe_customer_id garantido")
+
     conn.commit()
     conn.close()
 
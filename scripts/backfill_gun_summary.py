@@ -0,0 +1,26 @@
+from sqlmodel import Session, select
+from sqlalchemy import func
+from database import engine, create_db_and_tables
+from apps.armory.models import RangeSession, GunSummary
+
+def backfill():
+    """Rebuilds the per-gun summaries (sessions, rounds, failures, last used) from the session log."""
+    create_db_and_tables()
+    with Session(engine) as session:
+        rows = session.exec(
+            select(
+                RangeSession.gun_id,
+                func.count(RangeSession.id),
+                func.sum(RangeSession.rounds_fired),
+                func.sum(RangeSession.failure_count),
+                func.max(RangeSession.date)
+            ).group_by(RangeSession.gun_id)
+        ).all()
+        session.exec(GunSummary.__table__.delete())
+        for gun_id, sessions, rounds, failures, last_used in rows:
+            session.add(GunSummary(gun_id=gun_id, sessions=sessions, rounds=rounds, failures=failures, last_used=last_used))
+        session.commit()
+        print(f"Summaries rebuilt for {len(rows)} guns")
+
+if __name__ == "__main__":
+    backfill()
@@ -0,0 +1,24 @@
+from sqlmodel import Session, select
+from database import engine, create_db_and_tables
+from apps.garage.models import Veiculo, Manutencao, LeituraOdometro
+from apps.garage.odometer import OdometerService
+
+def backfill():
+    """Rebuilds odometer history (and media_km_mensal) from service logs + current odometer."""
+    create_db_and_tables()
+    with Session(engine) as session:
+        service = OdometerService(session)
+        vehicles = session.exec(select(Veiculo)).all()
+        for vehicle in vehicles:
+            session.exec(LeituraOdometro.__table__.delete().where(LeituraOdometro.veiculo_id == vehicle.id))
+            services = session.exec(
+                select(Manutencao).where(Manutencao.veiculo_id == vehicle.id).order_by(Manutencao.data)
+            ).all()
+            for item in services:
+                service.record_reading(vehicle, item.km_na_data, item.data, custo=item.valor)
+            service.record_reading(vehicle, vehicle.km_atual)
+            session.commit()
+        print(f"Odometer history rebuilt for {len(vehicles)} vehicles")
+
+if __name__ == "__main__":
+    backfill()
@@ -0,0 +1,20 @@
+from sqlmodel import Session, select
+from database import engine, create_db_and_tables
+from apps.auth.models import User
+from apps.analytics.rollups import RollupService
+from apps.analytics.sketches import RatingSketchService
+
+def backfill():
+    """Rebuilds the daily session rollups and rating sketches from the raw sessions."""
+    create_db_and_tables()
+    with Session(engine) as session:
+        users = session.exec(select(User)).all()
+        service = RollupService(session)
+        for user in users:
+            days = service.rebuild(user.id)
+            print(f"{user.email}: {days} days rolled up")
+        sessions = RatingSketchService(session).rebuild()
+        print(f"Rating sketches rebuilt from {sessions} sessions")
+
+if __name__ == "__main__":
+    backfill()
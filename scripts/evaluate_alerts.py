@@ -0,0 +1,13 @@
+from sqlmodel import Session
+from database import engine, create_db_and_tables
+from apps.garage.alerts import AlertEngine
+
+def evaluate():
+    """Reprojects every active maintenance alert (run daily from cron)."""
+    create_db_and_tables()
+    with Session(engine) as session:
+        result = AlertEngine(session).evaluate()
+        print(f"Alerts evaluated: {result['evaluated']} ({result['overdue']} overdue, {result['due_soon']} due soon)")
+
+if __name__ == "__main__":
+    evaluate()
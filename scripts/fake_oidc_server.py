@@ -0,0 +1,119 @@
+"""
+Minimal local OIDC provider for exercising the Auth0 login flow offline.
+
+    python -m scripts.fake_oidc_server --port 9400
+
+then start the app with
+    AUTH0_DOMAIN=127.0.0.1:9400 AUTH0_CLIENT_ID=local AUTH0_CLIENT_SECRET=local \
+    AUTH0_METADATA_URL=http://127.0.0.1:9400/.well-known/openid-configuration
+
+Every /authorize logs in the same fake user. Discovery/JWKS latency and failures
+can be flipped at runtime to check the metadata cache (stale-on-error):
+    curl -X POST 'http://127.0.0.1:9400/_control?delay=3&fail=1'
+"""
+import argparse
+import asyncio
+import secrets
+import time
+from urllib.parse import urlencode
+
+import uvicorn
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from fastapi import FastAPI, Form, HTTPException, Request
+from fastapi.responses import RedirectResponse
+from jose import jwk, jwt
+
+KID = "fake-oidc-1"
+USER = {"sub": "fake|1", "email": "fake.user@example.com", "name": "Fake User", "picture": None}
+
+_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+PRIVATE_PEM = _key.private_bytes(
+    serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+).decode()
+PUBLIC_JWK = {
+    **jwk.construct(PRIVATE_PEM, "RS256").public_key().to_dict(),
+    "kid": KID, "use": "sig", "alg": "RS256"
+}
+
+app = FastAPI()
+control = {"delay": 0.0, "fail": False, "hits": 0}
+codes: dict = {}  # code -> (nonce, client_id)
+
+def issuer(request: Request) -> str:
+    return str(request.base_url)
+
+async def _discovery_guard():
+    control["hits"] += 1
+    if control["delay"]:
+        await asyncio.sleep(control["delay"])
+    if control["fail"]:
+        raise HTTPException(status_code=503, detail="IdP unavailable")
+
+@app.get("/.well-known/openid-configuration")
+async def discovery(request: Request):
+    await _discovery_guard()
+    base = issuer(request)
+    return {
+        "issuer": base,
+        "authorization_endpoint": f"{base}authorize",
+        "token_endpoint": f"{base}oauth/token",
+        "userinfo_endpoint": f"{base}userinfo",
+        "jwks_uri": f"{base}.well-known/jwks.json",
+        "response_types_supported": ["code"],
+        "id_token_signing_alg_values_supported": ["RS256"],
+        "token_endpoint_auth_methods_supported": ["client_secret_basic", "client_secret_post"],
+    }
+
+@app.get("/.well-known/jwks.json")
+async def jwks():
+    await _discovery_guard()
+    return {"keys": [PUBLIC_JWK]}
+
+@app.get("/authorize")
+def authorize(redirect_uri: str, client_id: str, state: str = "", nonce: str = ""):
+    code = secrets.token_urlsafe(16)
+    codes[code] = (nonce, client_id)
+    return RedirectResponse(f"{redirect_uri}?{urlencode({'code': code, 'state': state})}")
+
+@app.post("/oauth/token")
+def token(request: Request, code: str = Form(...)):
+    if code not in codes:
+        raise HTTPException(status_code=400, detail="invalid_grant")
+    nonce, client_id = codes.pop(code)
+    now = int(time.time())
+    claims = {**USER, "iss": issuer(request), "aud": client_id, "iat": now, "exp": now + 3600}
+    if nonce:
+        claims["nonce"] = nonce
+    id_token = jwt.encode(claims, PRIVATE_PEM, algorithm="RS256", headers={"kid": KID})
+    return {
+        "access_token": secrets.token_urlsafe(24),
+        "id_token": id_token,
+        "token_type": "Bearer",
+        "expires_in": 3600,
+    }
+
+@app.get("/userinfo")
+def userinfo():
+    return USER
+
+@app.get("/v2/logout")
+def logout(returnTo: str = "/"):
+    return RedirectResponse(returnTo)
+
+@app.post("/_control")
+def set_control(delay: float = None, fail: int = None):
+    if delay is not None:
+        control["delay"] = delay
+    if fail is not None:
+        control["fail"] = bool(fail)
+    return control
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local fake OIDC provider")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9400)
+    parser.add_argument("--delay", type=float, default=0.0, help="Seconds added to discovery/JWKS responses")
+    args = parser.parse_args()
+    control["delay"] = args.delay
+    uvicorn.run(app, host=args.host, port=args.port)
@@ -0,0 +1,24 @@
+import argparse
+
+from sqlmodel import Session
+from database import engine, create_db_and_tables
+from apps.armory.ledger import RoundLedgerService
+
+def reconcile(gun_id: int = None, dry_run: bool = False):
+    """Seeds the round ledger for legacy guns, then rebuilds Gun.total_rounds from it."""
+    create_db_and_tables()
+    with Session(engine) as session:
+        service = RoundLedgerService(session)
+        if not dry_run:
+            print(f"Ledger seeded for {service.seed_missing()} legacy guns")
+        drift = service.reconcile(gun_id, fix=not dry_run)
+        for gid, stored, ledger in drift:
+            print(f"gun {gid}: total_rounds={stored} ledger={ledger}")
+        print(f"{len(drift)} guns {'out of sync' if dry_run else 'corrected'}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild gun round counts from the round ledger")
+    parser.add_argument("--gun-id", type=int)
+    parser.add_argument("--dry-run", action="store_true", help="Only report drift")
+    args = parser.parse_args()
+    reconcile(args.gun_id, args.dry_run)
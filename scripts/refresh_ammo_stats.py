@@ -0,0 +1,13 @@
+from sqlmodel import Session
+from database import engine, create_db_and_tables
+from apps.armory.ammo import AmmoStatsService
+
+def refresh():
+    """Rebuilds the per-gun and community ammo aggregates from every range session."""
+    create_db_and_tables()
+    with Session(engine) as session:
+        count = AmmoStatsService(session).refresh()
+        print(f"Ammo stats rebuilt from {count} range sessions")
+
+if __name__ == "__main__":
+    refresh()
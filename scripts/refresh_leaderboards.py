@@ -0,0 +1,13 @@
+from sqlmodel import Session
+from database import engine, create_db_and_tables
+from apps.humidor.leaderboards import LeaderboardService
+
+def refresh():
+    """Rebuilds the community aggregates from every session (run from cron/backfill)."""
+    create_db_and_tables()
+    with Session(engine) as session:
+        rows = LeaderboardService(session).refresh()
+        print(f"Community stats rebuilt: {rows} cigars")
+
+if __name__ == "__main__":
+    refresh()
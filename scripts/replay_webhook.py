@@ -0,0 +1,100 @@
+"""
+Replays Stripe webhook events against the app without Stripe or the network.
+
+Events are signed locally with STRIPE_WEBHOOK_SECRET (same scheme as Stripe's
+Stripe-Signature header) and posted in-process to /webhook/stripe, then the
+inbox is drained synchronously.
+
+    python -m scripts.replay_webhook checkout --user-id 1 --customer cus_123
+    python -m scripts.replay_webhook subscription-deleted --customer cus_123 --repeat 3
+    python -m scripts.replay_webhook file events.json        # one event or a list of events
+    python -m scripts.replay_webhook checkout --user-id 1 --url http://localhost:8000
+"""
+import argparse
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import time
+
+os.environ.setdefault("ENABLE_SUBSCRIPTION", "true")
+os.environ.setdefault("STRIPE_WEBHOOK_SECRET", "whsec_local_replay")
+
+from config import settings
+
+
+def sign(payload: bytes, secret: str, timestamp: int = None) -> str:
+    timestamp = timestamp or int(time.time())
+    signed = f"{timestamp}.".encode() + payload
+    signature = hmac.new(secret.encode(), signed, hashlib.sha256).hexdigest()
+    return f"t={timestamp},v1={signature}"
+
+
+def make_event(event_type: str, obj: dict, created: int = None) -> dict:
+    return {
+        "id": f"evt_replay_{secrets.token_hex(8)}",
+        "object": "event",
+        "type": event_type,
+        "created": created or int(time.time()),
+        "data": {"object": obj},
+    }
+
+
+def canned_events(kind: str, args) -> list:
+    if kind == "checkout":
+        return [make_event("checkout.session.completed", {
+            "object": "checkout.session", "client_reference_id": str(args.user_id), "customer": args.customer
+        })]
+    if kind == "subscription-updated":
+        return [make_event("customer.subscription.updated", {
+            "object": "subscription", "customer": args.customer, "status": args.status
+        })]
+    if kind == "subscription-deleted":
+        return [make_event("customer.subscription.deleted", {
+            "object": "subscription", "customer": args.customer, "status": "canceled"
+        })]
+    with open(args.path) as f:
+        data = json.load(f)
+    return data if isinstance(data, list) else [data]
+
+
+def replay(events: list, repeat: int = 1, url: str = None) -> None:
+    if url:
+        import httpx
+        client = httpx.Client(base_url=url)
+    else:
+        from fastapi.testclient import TestClient
+        from database import create_db_and_tables
+        import main
+        create_db_and_tables()
+        client = TestClient(main.app)
+
+    for event in events:
+        payload = json.dumps(event).encode()
+        for _ in range(repeat):
+            resp = client.post(
+                "/webhook/stripe",
+                content=payload,
+                headers={"Stripe-Signature": sign(payload, settings.STRIPE_WEBHOOK_SECRET), "Content-Type": "application/json"}
+            )
+            print(f"{event['id']} {event['type']}: {resp.status_code} {resp.text}")
+
+    if not url:
+        from apps.auth.webhook_worker import drain
+        print(f"Applied {drain()} event(s) from the inbox")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sign and replay Stripe webhook events locally")
+    parser.add_argument("kind", choices=["checkout", "subscription-updated", "subscription-deleted", "file"])
+    parser.add_argument("path", nargs="?", help="JSON file with an event or a list of events (kind=file)")
+    parser.add_argument("--user-id", type=int, default=1)
+    parser.add_argument("--customer", default="cus_replay")
+    parser.add_argument("--status", default="past_due", help="Status for subscription-updated")
+    parser.add_argument("--repeat", type=int, default=1, help="Deliver each event N times (duplicate delivery)")
+    parser.add_argument("--url", help="Post to a running server instead of in-process")
+    args = parser.parse_args()
+    if args.kind == "file" and not args.path:
+        parser.error("kind=file needs a path")
+    replay(canned_events(args.kind, args), repeat=args.repeat, url=args.url)
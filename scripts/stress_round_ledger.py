@@ -0,0 +1,120 @@
+"""
+Concurrency stress check for range-session logging: N parallel writers log
+sessions against the same guns and the script asserts that no increment was
+lost (Gun.total_rounds == initial + logged == ledger sum).
+
+    python -m scripts.stress_round_ledger --workers 8 --sessions 200
+    python -m scripts.stress_round_ledger --mode process
+    python -m scripts.stress_round_ledger --legacy   # old read-modify-write, for comparison
+
+Runs against a throwaway SQLite file, never the app database.
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from datetime import date
+
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'stress.db')}"
+
+from sqlmodel import Session, select
+from sqlalchemy import func
+from database import engine, create_db_and_tables
+from apps.auth.models import User
+from apps.armory.models import Gun, RangeSession, RoundLedger
+from apps.armory.services import RangeService
+
+INITIAL_ROUNDS = 500
+
+
+def setup(guns: int) -> tuple:
+    create_db_and_tables()
+    with Session(engine) as session:
+        user = User(email="stress@example.com")
+        session.add(user)
+        session.commit()
+        service = RangeService(session)
+        return [
+            service.create_gun(
+                user=user, nickname=f"Stress {i}", make="Test", model="T", caliber="9mm",
+                base_price=0, total_rounds=INITIAL_ROUNDS, foto_arma=None, arquivo_nf=None
+            ).id
+            for i in range(guns)
+        ], user.id
+
+
+def _legacy_add(session: Session, gun_id: int, rounds: int) -> None:
+    # What add_session used to do: read, add in Python, write back
+    gun = session.get(Gun, gun_id)
+    session.add(RangeSession(gun_id=gun_id, date=date.today(), location="stress", rounds_fired=rounds, ammo_brand="x", ammo_grain=115))
+    gun.total_rounds += rounds
+    session.add(gun)
+    time.sleep(0.001)  # Widen the window the way a slow request would
+    session.commit()
+
+
+def writer(args) -> int:
+    worker, user_id, gun_ids, sessions, legacy = args
+    engine.dispose()  # Fresh connections in forked workers
+    rng = random.Random(worker)
+    logged = 0
+    with Session(engine) as session:
+        user = session.get(User, user_id)
+        service = RangeService(session)
+        for _ in range(sessions):
+            gun_id, rounds = rng.choice(gun_ids), rng.randint(1, 200)
+            for attempt in range(20):
+                try:
+                    if legacy:
+                        _legacy_add(session, gun_id, rounds)
+                    else:
+                        service.add_session(
+                            user=user, gun_id=gun_id, date_obj=date.today(), location="stress",
+                            rounds_fired=rounds, ammo_brand="x", ammo_grain=115, failure_count=0, notes=None
+                        )
+                    logged += rounds
+                    break
+                except Exception as e:  # SQLite busy: retry the whole unit of work
+                    session.rollback()
+                    if "locked" not in str(e) or attempt == 19:
+                        raise
+                    time.sleep(rng.uniform(0, 0.01 * (attempt + 1)))
+    return logged
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parallel writers against the round counter")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--sessions", type=int, default=200, help="Sessions logged per worker")
+    parser.add_argument("--guns", type=int, default=2)
+    parser.add_argument("--mode", choices=["thread", "process"], default="thread")
+    parser.add_argument("--legacy", action="store_true", help="Use the old read-modify-write update")
+    args = parser.parse_args()
+
+    gun_ids, user_id = setup(args.guns)
+    pool = ThreadPoolExecutor if args.mode == "thread" else ProcessPoolExecutor
+    started = time.perf_counter()
+    with pool(max_workers=args.workers) as executor:
+        logged = sum(executor.map(writer, [(w, user_id, gun_ids, args.sessions, args.legacy) for w in range(args.workers)]))
+    elapsed = time.perf_counter() - started
+
+    with Session(engine) as session:
+        stored = session.exec(select(func.sum(Gun.total_rounds))).one()
+        in_ledger = session.exec(select(func.coalesce(func.sum(RoundLedger.rounds), 0))).one()
+        in_sessions = session.exec(select(func.sum(RangeSession.rounds_fired))).one()
+
+    expected = INITIAL_ROUNDS * args.guns + logged
+    total_sessions = args.workers * args.sessions
+    print(f"{total_sessions} sessions by {args.workers} {args.mode} workers in {elapsed:.2f}s ({total_sessions / elapsed:.0f}/s)")
+    print(f"expected={expected} total_rounds={stored} ledger={in_ledger} sessions={in_sessions}")
+    assert in_sessions == logged, "session rows missing"
+    if not args.legacy:
+        assert in_ledger == expected, "ledger does not match logged rounds"
+    assert stored == expected, f"lost updates: {expected - stored} rounds"
+    print("OK: no lost updates")
+
+
+if __name__ == "__main__":
+    main()